@@ -1,33 +1,21 @@
+import os
 import streamlit as st
-import pandas as pd
-import scan
+import scan_service
+import history_store
 import datetime
 
+# pandas and requests are imported where results are rendered, after the
+# page shell is on screen; the scanner itself is only imported by a scan job.
+
+# Live signals from the watch daemon (backend/watch.py), if one is running
+WATCH_URL = os.environ.get("WATCH_URL", "http://127.0.0.1:8765")
+LIVE_REFRESH_SECONDS = 5
+
 st.set_page_config(page_title="Camarilla Stock Scanner", layout="wide")
 
 st.title("📈 Camarilla & CPR Stock Scanner")
 st.markdown("Identify swing trading setups with **Doji/Hammer** patterns and **Inside Camarilla** setups.")
 
-# Initialize session state for data
-if 'scan_data' not in st.session_state:
-    st.session_state.scan_data = None
-if 'last_updated' not in st.session_state:
-    st.session_state.last_updated = "Never"
-
-def run_scan():
-    with st.spinner('Scanning Nifty Total/500 stocks... This may take a minute.'):
-        try:
-            result = scan.scan_stocks()
-            if result and 'stocks' in result:
-                st.session_state.scan_data = result['stocks']
-                st.session_state.last_updated = result.get('last_updated', 'Just now')
-                st.session_state.total_scanned = result.get('total_scanned', 0)
-                st.success(f"Scan Complete! Found {len(result['stocks'])} stocks.")
-            else:
-                 st.error("Scan returned no data. Check logs or temporary API issues.")
-        except Exception as e:
-            st.error(f"Error during scan: {e}")
-
 # Sidebar controls
 st.sidebar.header("Scanner Controls")
 
@@ -36,19 +24,26 @@ scanner_mode = st.sidebar.radio(
     "Select Scanner Mode:",
     ("Doji / CPR (Daily)", "Inside Camarilla (Monthly)")
 )
+strategy = "Doji_Setup" if scanner_mode == "Doji / CPR (Daily)" else "Inside_Camarilla"
 
+# Every session shares one scan job per trading day; the button joins today's
+# scan or starts it if there is none yet (or its results went stale)
 if st.sidebar.button("Run Daily Scan", type="primary"):
-    run_scan()
+    scan_service.get_job(start=True)
+
+live = st.sidebar.toggle("Live signals", help=f"Stream signals from the watch daemon at {WATCH_URL}")
+
+# Latest in-progress or persisted results; opening the app never starts a scan
+job = scan_service.get_job()
+snapshot = job.snapshot() if job else None
 
 st.sidebar.markdown("---")
-st.sidebar.info(f"Last Updated: {st.session_state.last_updated}")
-if 'total_scanned' in st.session_state:
-    st.sidebar.text(f"Stocks Scanned: {st.session_state.total_scanned}")
-
-# Main Display
-if st.session_state.scan_data:
-    stocks = st.session_state.scan_data
-    
+st.sidebar.info(f"Last Updated: {snapshot['last_updated'] if snapshot else 'Never'}")
+if snapshot:
+    st.sidebar.text(f"Stocks Scanned: {snapshot['total_scanned']}")
+
+def render_results(stocks):
+    import pandas as pd
     if len(stocks) == 0:
         st.warning("No stocks matched any criteria today.")
     else:
@@ -60,10 +55,14 @@ if st.session_state.scan_data:
             data = []
             for s in filtered:
                 tv_url = f"https://in.tradingview.com/chart/?symbol=NSE:{s['ticker']}"
+                c = s.get('confluence') or {}
                 row = {
                     "Ticker": s['ticker'],
                     "Price": s['price'],
                     "Range %": s.get('range_pct', 0),
+                    "Confluence": c.get('score'),
+                    "Nearest Level": c.get('nearest'),
+                    "Patterns": ", ".join(s.get('patterns', [])),
                     "Chart": tv_url
                 }
                 
@@ -133,8 +132,73 @@ if st.session_state.scan_data:
                     hide_index=True
                 )
 
+
+def render_job():
+    # Reads the shared job each run, so partial results stream in batch by batch
+    snap = scan_service.get_job().snapshot()
+    if snap['status'] == "running":
+        total = snap['total'] or 1
+        st.progress(snap['done'] / total,
+                    text=f"Scanning... {snap['done']}/{snap['total']} tickers ({snap['tickers_per_sec']:.1f} tickers/s)")
+    elif snap['status'] == "error":
+        st.error(f"Error during scan: {snap['error']}")
+    elif st.session_state.get('was_running'):
+        st.session_state.was_running = False
+        st.rerun()
+    st.session_state.was_running = snap['status'] == "running"
+    if snap['stocks'] or snap['status'] == "done":
+        render_results(snap['stocks'])
+
+def render_live():
+    import requests
+    try:
+        snap = requests.get(f"{WATCH_URL}/signals", timeout=2).json()
+    except Exception as e:
+        st.error(f"Watch daemon not reachable at {WATCH_URL}: {e}")
+        return
+    st.caption(f"Live: {snap['last_updated']} ({snap['polls']} polls, {snap['total_scanned']} tickers)")
+    render_results(snap['stocks'])
+
+def render_history():
+    # Indexed lookups in the scan history database (filled by every scan)
+    if not os.path.exists(history_store.DB_FILE):
+        st.caption("No scan history recorded yet.")
+        return
+    days = history_store.sessions()
+    if not days:
+        st.caption("No scan history recorded yet.")
+        return
+    import pandas as pd
+    day = st.selectbox("Session", days[::-1])
+    change = history_store.changes(day, strategy).get(strategy, {"added": [], "dropped": []})
+    new_col, dropped_col = st.columns(2)
+    new_col.markdown(f"**New today ({len(change['added'])})**")
+    new_col.dataframe(pd.DataFrame(change['added'], columns=["ticker", "price", "range_pct"]), hide_index=True)
+    dropped_col.markdown(f"**Dropped today ({len(change['dropped'])})**")
+    dropped_col.dataframe(pd.DataFrame(change['dropped'], columns=["ticker", "price", "range_pct"]), hide_index=True)
+
+    min_days = st.slider("Minimum streak (sessions)", 1, 20, 3)
+    runs = history_store.streaks(strategy, day, min_days)
+    st.markdown(f"**Streaks of {min_days}+ sessions ({len(runs)})**")
+    st.dataframe(pd.DataFrame(runs, columns=["ticker", "days", "since"]), hide_index=True)
+
+    ticker = st.text_input("Ticker timeline", placeholder="e.g. RELIANCE").strip().upper()
+    if ticker:
+        rows = history_store.timeline(ticker)
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        else:
+            st.info(f"No recorded signals for {ticker}.")
+
+if live:
+    st.fragment(render_live, run_every=LIVE_REFRESH_SECONDS)()
+elif job:
+    st.fragment(render_job, run_every=1.0 if snapshot['status'] == "running" else None)()
 else:
     st.info("Click 'Run Daily Scan' to start searching for potential trades.")
 
+with st.expander("📅 Signal History"):
+    render_history()
+
 st.markdown("---")
 st.markdown("Automated by Streamlit & Yahoo Finance")
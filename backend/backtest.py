@@ -0,0 +1,145 @@
+import json
+import time
+import argparse
+import numpy as np
+import engine
+import panel_store
+from pipeline import Downloader
+from rules import load_strategies
+from providers import YFinanceProvider, SnapshotProvider, SyntheticProvider
+from universes import load_universes, merge_universes, DEFAULT_UNIVERSES
+
+# Historical backtest: every strategy evaluated on every bar of the history in
+# one vectorized pass. engine.compute_features only ever looks backwards (daily
+# pivots from T-1, monthly pivots from the prior completed month, EMAs up to T),
+# so a signal on bar T uses exactly what a live scan on day T would have seen.
+
+OUTPUT_FILE = "backtest_report.json"
+HISTORY_PERIOD = "10y"
+HORIZONS = [1, 5, 10, 20]
+
+
+def forward_returns(panel, horizon):
+    """
+    Return (in %) from each bar's close to the close `horizon` sessions later.
+    Sessions a ticker did not trade carry its last close; bars without a
+    full horizon ahead are NaN.
+    """
+    close = np.where(panel['valid'], panel['close'], np.nan)
+    rows = engine.last_valid_row(panel['valid'])
+    held = engine.take_rows(close, rows)
+    out = np.full(close.shape, np.nan)
+    if horizon < close.shape[0]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[:-horizon] = (held[horizon:] / close[:-horizon] - 1) * 100
+    return out
+
+
+def summarize(returns):
+    returns = returns[~np.isnan(returns)]
+    if len(returns) == 0:
+        return {"trades": 0, "mean_return_pct": None, "median_return_pct": None, "hit_rate_pct": None}
+    return {
+        "trades": int(len(returns)),
+        "mean_return_pct": round(float(returns.mean()), 3),
+        "median_return_pct": round(float(np.median(returns)), 3),
+        "hit_rate_pct": round(float((returns > 0).mean() * 100), 2),
+    }
+
+
+def backtest(frames, tickers=None, horizons=HORIZONS, strategies=None):
+    """Evaluates every strategy on every bar of `frames` and reports forward-return stats."""
+    return backtest_panel(engine.align(frames, tickers), horizons, strategies)
+
+
+def backtest_panel(panel, horizons=HORIZONS, strategies=None):
+    """backtest() on an already aligned panel (e.g. a panel_store view)."""
+    if not panel['tickers']:
+        return {"tickers": 0, "strategies": {}}
+
+    features = engine.compute_features(panel)
+    masks = engine.evaluate(features, strategies)
+    returns = {h: forward_returns(panel, h) for h in horizons}
+    names = [t.replace(".NS", "") for t in panel['tickers']]
+
+    report = {
+        "start": panel['dates'][0].strftime("%Y-%m-%d"),
+        "end": panel['dates'][-1].strftime("%Y-%m-%d"),
+        "tickers": len(names),
+        "bars": int(panel['valid'].sum()),
+        "baseline": {str(h): summarize(returns[h][features['eligible']]) for h in horizons},
+        "strategies": {},
+    }
+    for strategy, mask in masks.items():
+        per_ticker = mask.sum(axis=0)
+        report["strategies"][strategy] = {
+            "signals": int(mask.sum()),
+            "horizons": {str(h): summarize(returns[h][mask]) for h in horizons},
+            "per_ticker": {names[j]: int(per_ticker[j]) for j in np.flatnonzero(per_ticker)},
+        }
+    return report
+
+
+def run_backtest(provider, tickers, period=HISTORY_PERIOD, horizons=HORIZONS, output_file=OUTPUT_FILE,
+                 strategies=None, panel_dir=None):
+    """Backtests `tickers` over `period`, downloaded from `provider` or read from the panel at panel_dir."""
+    start = time.perf_counter()
+    if panel_dir:
+        store = panel_store.load_panel(panel_dir)
+        cols, _ = panel_store.columns(store, store['tickers'] if tickers is None else tickers)
+        print(f"Backtesting {len(cols)} tickers over {period} from {panel_dir}...")
+        # One batch of every column: a zero-copy slice when the tickers are contiguous
+        cols = next(panel_store.batches(cols, max(1, len(cols))), slice(0, 0))
+        panel = panel_store.view(store, panel_store.window(store, period), cols)
+    else:
+        print(f"Backtesting {len(tickers)} tickers over {period}...")
+        frames = {}
+        downloader = Downloader(lambda chunk: provider.fetch(chunk, period=period))
+        for chunk, batch in downloader.run(tickers):
+            frames.update(batch)
+        panel = engine.align(frames, tickers)
+    loaded = time.perf_counter()
+
+    report = backtest_panel(panel, horizons, strategies)
+    done = time.perf_counter()
+    print(f"Loaded data in {loaded - start:.1f}s, evaluated in {done - loaded:.2f}s.")
+
+    for strategy, stats in report["strategies"].items():
+        print(f"{strategy}: {stats['signals']} signals")
+        for h, s in stats["horizons"].items():
+            print(f"  {h:>3}d: trades={s['trades']} mean={s['mean_return_pct']}% hit={s['hit_rate_pct']}%")
+
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output_file}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest scanner strategies over history")
+    parser.add_argument("--provider", choices=["yfinance", "snapshot", "synthetic"], default="yfinance")
+    parser.add_argument("--snapshot-dir", help="Directory of recorded bars (snapshot provider)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic provider")
+    parser.add_argument("--universe", action="append", help="nifty500, total_market, fno or a watchlist file (repeatable)")
+    parser.add_argument("--period", default=HISTORY_PERIOD, help="History to evaluate, e.g. 2y, 10y")
+    parser.add_argument("--horizon", type=int, action="append", help="Forward-return horizon in sessions (repeatable)")
+    parser.add_argument("--strategies", help="JSON/YAML file of strategy rules (default: built-in strategies)")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--panel", metavar="DIR", help="Read bars from a panel built by panel_store.py")
+    args = parser.parse_args()
+
+    provider = None
+    if args.panel:
+        universe = merge_universes(load_universes(args.universe))[0] if args.universe else None
+    elif args.provider == "snapshot":
+        provider = SnapshotProvider(args.snapshot_dir)
+        universe = provider.tickers()
+    else:
+        if args.provider == "synthetic":
+            provider = SyntheticProvider(seed=args.seed, history_days=2600)
+        else:
+            provider = YFinanceProvider()
+        universe, _ = merge_universes(load_universes(args.universe or DEFAULT_UNIVERSES))
+
+    strategies = load_strategies(args.strategies) if args.strategies else None
+    run_backtest(provider, universe, args.period, args.horizon or HORIZONS, args.output, strategies, args.panel)
@@ -0,0 +1,118 @@
+import os
+import pandas as pd
+import telemetry
+from providers import period_start
+
+# Local OHLCV store: one Parquet file per ticker, topped up incrementally each run
+STORE_DIR = os.path.join(os.path.dirname(__file__), "data", "bars")
+HISTORY_PERIOD = "6mo"
+# Already-stored sessions re-requested on every top-up so restatements can be detected
+OVERLAP_BARS = 5
+# Relative change on an overlapping bar that counts as a restatement (split / dividend adjust)
+RESTATE_TOLERANCE = 1e-4
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+def _path(ticker):
+    return os.path.join(STORE_DIR, f"{ticker}.parquet")
+
+
+def load_bars(ticker):
+    path = _path(ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+        return df if not df.empty else None
+    except Exception as e:
+        print(f"Warning: Could not read stored bars for {ticker}: {e}")
+        return None
+
+
+def save_bars(ticker, df):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    path = _path(ticker)
+    tmp = path + ".tmp"
+    df.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def merge_bars(stored, fresh):
+    """
+    Merges freshly downloaded bars into the stored history.
+    Returns (merged, restated). `restated` is True when a bar both frames
+    share changed, i.e. the provider re-adjusted history and the stored
+    copy can no longer be trusted.
+    """
+    fresh = fresh.dropna(how='all')
+    if stored is None or stored.empty:
+        return fresh.sort_index(), False
+
+    # The last stored bar may have been captured before the session closed,
+    # so only bars before it are checked for restatement.
+    overlap = stored.index[:-1].intersection(fresh.index)
+    restated = False
+    if len(overlap) > 0:
+        old = stored.loc[overlap, PRICE_COLUMNS]
+        new = fresh.loc[overlap, PRICE_COLUMNS]
+        diff = ((new - old).abs() / old.abs()).fillna(0)
+        restated = bool((diff > RESTATE_TOLERANCE).any().any())
+
+    merged = pd.concat([stored, fresh])
+    merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+    return merged, restated
+
+
+def _window(df, now):
+    # Same look-back the scanner used when it downloaded period="6mo" every run
+    start = period_start(now, HISTORY_PERIOD)
+    return df[df.index >= start]
+
+
+def get_bars(tickers, provider):
+    """
+    Returns {ticker: DataFrame} with the last HISTORY_PERIOD of daily bars.
+    Priority:
+    1. Local store, topped up with only the missing date range.
+    2. Full re-download for new tickers and for tickers whose history was restated.
+    """
+    stored = {t: load_bars(t) for t in tickers}
+    full = [t for t in tickers if stored[t] is None or len(stored[t]) <= OVERLAP_BARS]
+
+    # Group tickers needing a top-up by their start date so each group is one request
+    starts = {}
+    for ticker in tickers:
+        if ticker in full:
+            continue
+        start = stored[ticker].index[-OVERLAP_BARS]
+        starts.setdefault(start, []).append(ticker)
+
+    result = {}
+    for start, group in starts.items():
+        fresh = provider.fetch(group, start=start.strftime("%Y-%m-%d"))
+        for ticker in group:
+            if ticker not in fresh:
+                # Nothing new returned; serve what we have
+                result[ticker] = stored[ticker]
+                continue
+            merged, restated = merge_bars(stored[ticker], fresh[ticker])
+            if restated:
+                print(f"History restated for {ticker}, re-downloading.")
+                telemetry.count("bars_restated")
+                full.append(ticker)
+                continue
+            save_bars(ticker, merged)
+            result[ticker] = merged
+            telemetry.count("bars_topped_up")
+
+    if full:
+        print(f"Full download for {len(full)} tickers.")
+        telemetry.count("bars_full_download", len(full))
+        fresh = provider.fetch(full, period=HISTORY_PERIOD)
+        for ticker, df in fresh.items():
+            df = df.dropna(how='all').sort_index()
+            save_bars(ticker, df)
+            result[ticker] = df
+
+    now = provider.now()
+    return {t: _window(df, now) for t, df in result.items()}
@@ -0,0 +1,327 @@
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import timeframes
+from providers import SyntheticProvider
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Benchmark harness: the full scan path (scan.scan_stocks) on deterministic
+# synthetic universes of increasing size, recording throughput, per-stage
+# latency and peak memory into a JSON history that can be compared between
+# commits. Some tickers get a planted doji, small-candle or inside-Camarilla
+# configuration on their last bar, so every run also checks that the scan
+# finds them. Each size runs in a fresh process so peak RSS is its own.
+
+BENCH_FILE = os.path.join(os.path.dirname(__file__), "data", "benchmark_history.json")
+SIZES = [50, 500, 5000, 50000]
+# One ticker in PLANT_EVERY gets a planted pattern (cycling through PATTERNS)
+PLANT_EVERY = 10
+PATTERNS = ["doji", "small", "inside"]
+PATTERN_STRATEGY = {"doji": "Doji_Setup", "small": "Doji_Setup", "inside": "Inside_Camarilla"}
+# Throughput change versus the previous run that is reported as a regression / speed-up
+CHANGE_PCT = 10
+# Cold-start check (--startup): modules whose import cost is reported, and the
+# time the dashboard's first script run (the page shell) must stay under
+STARTUP_MODULES = ["streamlit", "scan_service", "history_store", "tickers", "engine", "scan"]
+SHELL_BUDGET_SECONDS = 1.0
+# Startup changes smaller than this are noise, whatever their percentage
+STARTUP_NOISE_MS = 10
+# Fresh interpreters per measurement; the fastest is kept
+STARTUP_REPEAT = 3
+
+
+def plant(df, pattern, rng):
+    """
+    Rewrites the last three calendar months of `df` so the final bar has
+    `pattern`. The tail trades quietly around the close before it, so the
+    EMAs and the last month's CPR sit at the price (Doji_Setup); for
+    "inside" the month before last swings wide and the last one narrow
+    around the same close, so its Camarilla levels fall inside.
+    """
+    keys = timeframes.period_keys(df.index, "monthly")
+    start = int(np.searchsorted(keys, keys[-1] - 2))
+    n = len(df) - start
+    base = float(df['Close'].iloc[start - 1]) if start > 0 else float(df['Close'].iloc[0])
+    close = base * (1 + rng.normal(0, 0.002, n))
+    if pattern == "inside":
+        for month, swing in ((keys[-1] - 2, 0.04), (keys[-1] - 1, 0.01)):
+            rows = keys[start:] == month
+            # Whole sine periods, so both months close at the base price
+            close[rows] = base * (1 + swing * np.sin(np.linspace(0, 2 * np.pi, rows.sum())))
+    open_p = close * (1 + rng.normal(0, 0.001, n))
+    high = np.maximum(open_p, close) * 1.002
+    low = np.minimum(open_p, close) * 0.998
+
+    last = close[-1]
+    if pattern == "doji":
+        open_p[-1], close[-1], high[-1], low[-1] = last * 0.9999, last * 1.0001, last * 1.004, last * 0.996
+    elif pattern == "small":
+        # Body 23% of the range, wicks too short for a hammer
+        open_p[-1], close[-1], high[-1], low[-1] = last * 0.9992, last * 1.0008, last * 1.0035, last * 0.9965
+    for column, values in (('Open', open_p), ('High', high), ('Low', low), ('Close', close)):
+        df.iloc[start:, df.columns.get_loc(column)] = values
+    return df
+
+
+class PlantedProvider(SyntheticProvider):
+    """SyntheticProvider whose `plants` tickers ({ticker: pattern}) end on a planted pattern."""
+    name = "planted"
+
+    def __init__(self, plants, seed=0, **kwargs):
+        super().__init__(seed=seed, **kwargs)
+        self.plants = plants
+
+    def bars(self, ticker):
+        df = super().bars(ticker)
+        pattern = self.plants.get(ticker)
+        if pattern:
+            rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode()), 1])
+            df = plant(df, pattern, rng)
+        return df
+
+
+def universe(size):
+    """`size` synthetic tickers and the patterns planted in them."""
+    tickers = [f"SYN{k:05d}.NS" for k in range(size)]
+    plants = {t: PATTERNS[k // PLANT_EVERY % len(PATTERNS)] for k, t in enumerate(tickers) if k % PLANT_EVERY == 0}
+    return tickers, plants
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak * scale / 2 ** 20, 1)
+
+
+def run_size(size, seed=0, processes=1, verbose=False):
+    """Scans a synthetic universe of `size` tickers end to end and measures it (run in its own process)."""
+    import scan
+    tickers, plants = universe(size)
+    provider = PlantedProvider(plants, seed=seed)
+    if not verbose:
+        # This is a dedicated process: silence the scan and its worker processes at the fd level
+        sys.stdout.flush()
+        os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        report_file = os.path.join(tmp, "report.json")
+        start = time.perf_counter()
+        result = scan.scan_stocks(provider, tickers, os.path.join(tmp, "data.json"), processes=processes,
+                                  output_dir=os.path.join(tmp, "scan"), report_file=report_file,
+                                  metrics_file=None, history_file=None, rate=None)
+        wall = time.perf_counter() - start
+        with open(report_file, 'r') as f:
+            report = json.load(f)
+
+    found = {(s['ticker'] + ".NS", name) for s in result['stocks'] for name in s['strategies']}
+    missed = sorted(t for t, pattern in plants.items() if (t, PATTERN_STRATEGY[pattern]) not in found)
+    batches = [b["seconds"] for b in report["batches"]]
+    return {
+        "tickers": size,
+        "wall_seconds": round(wall, 3),
+        "tickers_per_sec": round(size / wall, 1),
+        "stages": {name: s["wall_seconds"] for name, s in report["stages"].items()},
+        "batch_p50_seconds": round(float(np.percentile(batches, 50)), 4) if batches else None,
+        "batch_p95_seconds": round(float(np.percentile(batches, 95)), 4) if batches else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "hits": len(result['stocks']),
+        "planted": len(plants),
+        "missed": missed,
+    }
+
+
+def import_cost(module):
+    """
+    Cold import of `module` in a fresh interpreter (python -X importtime):
+    {"ms": cumulative import time, "heaviest": its three costliest direct imports}.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True,
+                         text=True, cwd=os.path.dirname(os.path.abspath(__file__)), timeout=120)
+    total, children = None, []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                total = int(cumulative)
+                break
+            children = []
+    if total is None:
+        raise RuntimeError(f"Could not import {module}: {out.stderr.strip().splitlines()[-1:]}")
+    heaviest = sorted(children, reverse=True)[:3]
+    return {"ms": round(total / 1000, 1), "heaviest": {name: round(us / 1000, 1) for us, name in heaviest}}
+
+
+# Child process for shell_seconds: the dashboard's first script run under streamlit's AppTest
+_SHELL_SCRIPT = """
+import json, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=60).run()
+print(json.dumps({"seconds": time.perf_counter() - start, "errors": len(at.exception)}))
+"""
+
+
+def shell_seconds():
+    """Time of the dashboard's first run in a fresh interpreter, Streamlit itself already loaded."""
+    out = subprocess.run([sys.executable, "-c", _SHELL_SCRIPT], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), timeout=300)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    if result["errors"]:
+        print(f"Warning: the dashboard raised {result['errors']} exception(s) on its first run")
+    return round(result["seconds"], 3)
+
+
+def run_startup(modules=STARTUP_MODULES, repeat=STARTUP_REPEAT):
+    """Import cost of `modules` and the dashboard's first-run time, best of `repeat` cold starts."""
+    imports = {}
+    for module in modules:
+        imports[module] = min((import_cost(module) for _ in range(repeat)), key=lambda r: r["ms"])
+        heaviest = ", ".join(f"{name} {ms} ms" for name, ms in imports[module]["heaviest"].items())
+        print(f"  import {module}: {imports[module]['ms']} ms ({heaviest or 'no imports'})")
+    startup = {"imports": imports}
+    try:
+        startup["shell_seconds"] = min(shell_seconds() for _ in range(repeat))
+        status = "ok" if startup["shell_seconds"] < SHELL_BUDGET_SECONDS else f"OVER {SHELL_BUDGET_SECONDS}s BUDGET"
+        print(f"  dashboard first run: {startup['shell_seconds']}s {status}")
+    except Exception as e:
+        print(f"Warning: Could not time the dashboard's first run: {e}")
+        startup["shell_seconds"] = None
+    return startup
+
+
+def _commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def load_history(path=BENCH_FILE):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read benchmark history: {e}")
+        return []
+
+
+def compare(entry, previous):
+    """Prints the throughput change of each size against `previous` (an earlier history entry)."""
+    before = {r["tickers"]: r for r in previous["results"]}
+    if not any(r["tickers"] in before for r in entry["results"]):
+        return
+    print(f"Compared with {previous.get('commit') or '?'} ({previous['time']}):")
+    for r in entry["results"]:
+        old = before.get(r["tickers"])
+        if old is None:
+            continue
+        change = (r["tickers_per_sec"] / old["tickers_per_sec"] - 1) * 100
+        note = " REGRESSION" if change <= -CHANGE_PCT else " faster" if change >= CHANGE_PCT else ""
+        print(f"  {r['tickers']:>6} tickers: {old['tickers_per_sec']} -> {r['tickers_per_sec']} tickers/s "
+              f"({change:+.1f}%){note}")
+
+
+def compare_startup(startup, previous):
+    """Prints the import and first-run time changes against `previous` (an earlier startup record)."""
+    print("Startup compared with the previous measurement:")
+    pairs = [(f"import {m}", r["ms"], previous["imports"][m]["ms"], "ms", 1)
+             for m, r in startup["imports"].items() if m in previous.get("imports", {})]
+    if startup.get("shell_seconds") and previous.get("shell_seconds"):
+        pairs.append(("dashboard first run", startup["shell_seconds"], previous["shell_seconds"], "s", 1000))
+    for label, new, old, unit, to_ms in pairs:
+        change = (new / old - 1) * 100 if old else 0.0
+        noise = abs(new - old) * to_ms < STARTUP_NOISE_MS
+        note = "" if noise else " REGRESSION" if change >= CHANGE_PCT else " faster" if change <= -CHANGE_PCT else ""
+        print(f"  {label}: {old} -> {new} {unit} ({change:+.1f}%){note}")
+
+
+def run_benchmark(sizes=SIZES, seed=0, processes=1, output_file=BENCH_FILE, verbose=False, startup=False):
+    entry = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "processes": processes,
+        "results": [],
+    }
+    # A fresh process per size: peak RSS is a high-water mark
+    context = multiprocessing.get_context("spawn")
+    for size in sizes:
+        print(f"Benchmarking {size} tickers...")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            r = pool.submit(run_size, size, seed, processes, verbose).result()
+        entry["results"].append(r)
+        stages = ", ".join(f"{name} {s:.2f}s" for name, s in r["stages"].items())
+        status = "ok" if not r["missed"] else f"MISSED {len(r['missed'])}: {', '.join(r['missed'][:5])}"
+        print(f"  {r['tickers_per_sec']} tickers/s, {r['wall_seconds']}s, peak {r['peak_rss_mb']} MB, "
+              f"planted {r['planted'] - len(r['missed'])}/{r['planted']} {status}")
+        print(f"  {stages}")
+
+    if startup:
+        print("Measuring cold start...")
+        entry["startup"] = run_startup()
+
+    history = load_history(output_file)
+    # Only runs with the same process count are comparable
+    previous = next((e for e in reversed(history) if e.get("processes") == processes), None)
+    if previous:
+        compare(entry, previous)
+    previous = next((e["startup"] for e in reversed(history) if e.get("startup")), None)
+    if startup and previous:
+        compare_startup(entry["startup"], previous)
+    history.append(entry)
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(history, f, indent=2)
+    print(f"Results appended to {output_file}")
+    return entry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the full scan on synthetic universes")
+    parser.add_argument("--size", type=int, action="append", help=f"Universe size (repeatable, default {SIZES})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=1, help="Scan processes (0 = all cores)")
+    parser.add_argument("--output", default=BENCH_FILE, help="JSON history the run is appended to")
+    parser.add_argument("--verbose", action="store_true", help="Show the scan's own output")
+    parser.add_argument("--startup", action="store_true",
+                        help="Measure import cost and the dashboard's first run (alone unless --size is given)")
+    args = parser.parse_args()
+
+    sizes = args.size or ([] if args.startup else SIZES)
+    entry = run_benchmark(sizes, args.seed, args.processes or os.cpu_count(), args.output, args.verbose, args.startup)
+    if any(r["missed"] for r in entry["results"]):
+        sys.exit(1)
+    if args.startup and (entry["startup"]["shell_seconds"] or 0) >= SHELL_BUDGET_SECONDS:
+        sys.exit(1)
@@ -0,0 +1,93 @@
+import numpy as np
+
+# Multi-level confluence: how many pivot levels and EMAs sit within a band
+# around the price, and which one is nearest.
+#
+# Each row's levels are turned into % distances from its price and sorted, so
+# the in-band count is the gap between two searchsorted positions and the
+# nearest level is a neighbour of the price's own position. Rows are searched
+# in one flat call by giving every row a disjoint value range (row offset +
+# distance), so 30+ levels per ticker cost a sort and three searchsorted
+# calls over the universe instead of a Python loop over levels.
+
+# Levels checked, by feature path (names in output are dotted: "cam_weekly.h3")
+LEVELS = [
+    (tf, level)
+    for tf in ("cpr_daily", "cpr_weekly", "cpr_monthly")
+    for level in ("pivot", "tc", "bc")
+] + [
+    (tf, level)
+    for tf in ("cam_daily", "cam_weekly", "cam_monthly")
+    for level in ("h3", "h4", "l3", "l4")
+] + [("ema8",), ("ema20",)]
+LEVEL_NAMES = [".".join(path) for path in LEVELS]
+# Band (in % of price) a level must be within to count
+CONFLUENCE_PCT = 1.0
+# Distances are clipped to ±FAR_PCT; unknown levels sort after every known one
+FAR_PCT = 999
+UNKNOWN = FAR_PCT + 1
+SPAN = 4 * FAR_PCT
+# Rows per flat search; small chunks keep the row offsets from rounding distances (< 1e-8 %)
+CHUNK_ROWS = 8192
+
+
+FIELDS = ["count", "nearest", "nearest_pct"]
+
+
+def _level(f, path):
+    value = f
+    for key in path:
+        value = value[key]
+    return np.ravel(value)
+
+
+def searchsorted_rows(rows, values):
+    """
+    np.searchsorted(rows[i], values[i], side='left') for every row of a
+    row-sorted n × L array and n × k values, in one flat call.
+    """
+    n, width = rows.shape
+    offset = np.arange(n) * float(SPAN)
+    flat = (rows + offset[:, None]).ravel()
+    return np.searchsorted(flat, values + offset[:, None]) - (np.arange(n) * width)[:, None]
+
+
+def confluence(price, levels, pct=CONFLUENCE_PCT):
+    """
+    (count, nearest, nearest_pct) for 1D `price` and an n × L `levels`
+    array: levels within `pct` % of the price, index of the nearest level
+    (-1 if none is known) and its signed % distance (NaN if none).
+    """
+    n = len(price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distance = (levels - price[:, None]) / price[:, None] * 100
+    np.clip(distance, -FAR_PCT, FAR_PCT, out=distance)
+    distance[np.isnan(distance)] = UNKNOWN
+    ranked = np.sort(distance, axis=1)
+
+    # Per row: first level >= -pct, first level > pct, first level >= 0 (the price)
+    bounds = np.array([-pct, np.nextafter(pct, np.inf), 0.0])
+    found = np.empty((n, 3), dtype=np.int64)
+    for start in range(0, n, CHUNK_ROWS):
+        chunk = ranked[start:start + CHUNK_ROWS]
+        found[start:start + len(chunk)] = searchsorted_rows(chunk, np.broadcast_to(bounds, (len(chunk), 3)))
+    count = found[:, 1] - found[:, 0]
+
+    # Nearest is the last level below the price or the first at / above it
+    rows = np.arange(n)
+    width = ranked.shape[1]
+    below, above = np.clip(found[:, 2] - 1, 0, width - 1), np.clip(found[:, 2], 0, width - 1)
+    nearest_pct = np.where(np.abs(ranked[rows, below]) <= np.abs(ranked[rows, above]),
+                           ranked[rows, below], ranked[rows, above])
+    # Which level that is (the first in LEVELS order on ties)
+    nearest = np.argmax(distance == nearest_pct[:, None], axis=1)
+    known = nearest_pct != UNKNOWN
+    return count, np.where(known, nearest, -1), np.where(known, nearest_pct, np.nan)
+
+
+def features(f, rows=None, pct=CONFLUENCE_PCT):
+    """confluence count / nearest / nearest_pct of engine features (flattened), for `rows` or all rows."""
+    select = (lambda v: v) if rows is None else (lambda v: v[rows])
+    price = select(np.ravel(f['price'])).astype(np.float64)
+    levels = np.stack([select(_level(f, path)) for path in LEVELS], axis=1)
+    return dict(zip(FIELDS, confluence(price, levels, pct)))
@@ -1,53 +1,45 @@
-import yfinance as yf
-import pandas as pd
-
-def check_candle_pattern(open_p, high_p, low_p, close_p):
-    body = abs(close_p - open_p)
-    total_range = high_p - low_p
-    
-    print(f"  O:{open_p} H:{high_p} L:{low_p} C:{close_p}")
-    print(f"  Body: {body:.2f}, Range: {total_range:.2f}")
-    
-    if total_range == 0: return False, "None"
-    
-    is_doji = body <= (total_range * 0.1)
-    print(f"  is_doji (Body <= 10% Range): {is_doji}")
-    
-    upper_wick = high_p - max(open_p, close_p)
-    lower_wick = min(open_p, close_p) - low_p
-    is_hammer = (lower_wick > 2 * body) and (upper_wick < body)
-    print(f"  is_hammer: {is_hammer}")
-    
-    if is_doji: return True, "Doji"
-    if is_hammer: return True, "Hammer"
-    
-    # Fallback Small Candle
-    is_small = (body / total_range) < 0.3
-    print(f"  is_small (Body < 30% Range): {is_small}")
-    
-    if is_small: return True, "Small Candle"
-    
-    return False, "None"
-
-def test_scan():
+import engine
+import patterns
+from providers import YFinanceProvider
+
+def check_candle_pattern(df):
+    # Same pattern bits the scanner uses, printed with the ratios behind them
+    panel = engine.align({'df': df})
+    o, h, l, c = panel['open'], panel['high'], panel['low'], panel['close']
+    bits = engine.candle_patterns(o, h, l, c, panel['valid'])[:, 0]
+    candle = engine.candle_features(o, h, l, c)
+
+    for row in range(max(0, len(bits) - 3), len(bits)):
+        print(f"  {panel['dates'][row].date()} O:{o[row, 0]} H:{h[row, 0]} L:{l[row, 0]} C:{c[row, 0]}")
+        print(f"    Body: {candle['body'][row, 0]:.2f}, Range: {candle['range'][row, 0]:.2f}, "
+              f"Body/Range: {candle['body_ratio'][row, 0]:.2f}")
+        print(f"    Patterns: {', '.join(patterns.names(bits[row])) or 'None'}")
+
+    last = bits[-1]
+    return bool(patterns.small_pattern(last)), patterns.names(last)
+
+def test_scan(provider=None):
     tickers = ["RELIANCE.NS", "TCS.NS", "INFY.NS", "SBIN.NS", "HDFCBANK.NS"]
+    if provider is None:
+        provider = YFinanceProvider()
     print(f"Downloading {tickers}...")
-    data = yf.download(tickers, period="5d", interval="1d", group_by='ticker', threads=True)
-    
+    # NR7 needs the six bars before the latest one
+    data = provider.fetch(tickers, period="1mo")
+
     for ticker in tickers:
         print(f"\nTesting {ticker}...")
         try:
+            if ticker not in data:
+                print("  No data")
+                continue
             df = data[ticker].dropna()
             if df.empty:
                 print("  No data")
                 continue
-            
-            today = df.iloc[-1]
-            print(f"  Date: {today.name}")
-            
-            res, name = check_candle_pattern(today['Open'], today['High'], today['Low'], today['Close'])
-            print(f"  Result: {res} ({name})")
-            
+
+            res, names = check_candle_pattern(df)
+            print(f"  Doji_Setup candle: {res} ({', '.join(names) or 'None'})")
+
         except Exception as e:
             print(f"  Error: {e}")
 
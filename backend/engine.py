@@ -0,0 +1,473 @@
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+import rules
+import timeframes
+import confluence
+import patterns
+from timeframes import take_rows
+from telemetry import timed
+
+# Vectorized indicator engine: the whole universe as date × ticker arrays.
+# Every feature is computed for every row, so the live scan (last row per
+# ticker) and historical evaluation share one definition.
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+STRATEGIES = [s.name for s in rules.DEFAULT_STRATEGIES]
+MIN_BARS = 50
+MIN_MONTHS = 3
+
+
+def calculate_cpr_value(high, low, close):
+    pivot = (high + low + close) / 3
+    bc = (high + low) / 2
+    tc = (pivot - bc) + pivot
+    return {
+        'pivot': np.round(pivot, 2),
+        'bc': np.round(bc, 2),
+        'tc': np.round(tc, 2),
+        'width_pct': np.round(np.abs(tc - bc) / pivot * 100, 2)
+    }
+
+
+def calculate_camarilla_value(high, low, close):
+    r = high - low
+    h3 = close + (r * 1.1) / 4
+    l3 = close - (r * 1.1) / 4
+    h4 = close + (r * 1.1) / 2
+    l4 = close - (r * 1.1) / 2
+    # Pine Script: center = sclose
+    pp = close
+    return {
+        'h3': np.round(h3, 2),
+        'l3': np.round(l3, 2),
+        'h4': np.round(h4, 2),
+        'l4': np.round(l4, 2),
+        'center': np.round(pp, 2)
+    }
+
+
+@timed("clean")
+def align(frames, tickers=None):
+    """
+    Aligns {ticker: DataFrame} into a date × ticker panel.
+    Rows a ticker is missing, or where any column is NaN (what dropna()
+    would remove), are marked invalid instead of being dropped.
+    """
+    if tickers is None:
+        tickers = list(frames.keys())
+    tickers = [t for t in tickers if t in frames and not frames[t].empty]
+
+    if not tickers:
+        empty = np.empty((0, 0))
+        return {
+            'dates': pd.DatetimeIndex([]), 'tickers': [],
+            'open': empty, 'high': empty, 'low': empty, 'close': empty, 'volume': empty,
+            'valid': np.empty((0, 0), dtype=bool)
+        }
+
+    # The date union is sorted explicitly (pandas' concat default for it is changing)
+    wide = pd.concat({t: frames[t].reindex(columns=FIELDS) for t in tickers}, axis=1, sort=False).sort_index()
+    valid = pd.concat({t: frames[t].notna().all(axis=1) for t in tickers}, axis=1, sort=False)
+    valid = valid.reindex(wide.index).fillna(False).astype(bool)
+
+    panel = {'dates': wide.index, 'tickers': tickers, 'valid': valid[tickers].to_numpy()}
+    for field in FIELDS:
+        panel[field.lower()] = wide.xs(field, axis=1, level=1)[tickers].to_numpy(dtype=np.float64)
+    return panel
+
+
+def skip_reason(df):
+    """Why a ticker's bars can't produce a signal (None if they can), using the eligibility rules."""
+    valid = df.notna().all(axis=1).to_numpy()
+    if not valid.any():
+        return "no_bars"
+    if valid.sum() < MIN_BARS:
+        return "short_history"
+    dates = df.index[valid]
+    if (dates[-1].year - dates[0].year) * 12 + dates[-1].month - dates[0].month + 1 < MIN_MONTHS:
+        return "few_months"
+    return None
+
+
+def skip_reasons(panel):
+    """skip_reason for every ticker of a panel at once."""
+    valid = panel['valid']
+    n = valid.shape[0]
+    keys = month_keys(panel['dates'])
+    first = keys[np.where(valid.any(axis=0), valid.argmax(axis=0), 0)] if n else np.zeros(valid.shape[1], dtype=np.int64)
+    last = keys[n - 1 - valid[::-1].argmax(axis=0)] if n else first
+    reasons = np.where(~valid.any(axis=0), "no_bars",
+                       np.where(valid.sum(axis=0) < MIN_BARS, "short_history",
+                                np.where(last - first + 1 < MIN_MONTHS, "few_months", "")))
+    return [r or None for r in reasons.tolist()]
+
+
+def last_valid_row(valid):
+    """Index of the latest valid row at or before each row (-1 if none)."""
+    rows = np.arange(valid.shape[0])[:, None]
+    return np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+
+
+def prev_valid_row(valid):
+    """Index of the latest valid row strictly before each row (-1 if none)."""
+    last = last_valid_row(valid)
+    prev = np.full_like(last, -1)
+    prev[1:] = last[:-1]
+    return prev
+
+
+def ema_step(weighted, cur, length):
+    """One pandas ewm(span=length, adjust=False) update of the running average."""
+    alpha = 1. / (1. + (length - 1) / 2.)
+    old_wt = 1. - alpha
+    with np.errstate(invalid='ignore'):
+        stepped = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+    # pandas leaves the average untouched when the new value equals it
+    return np.where(weighted != cur, stepped, weighted)
+
+
+def ema(close, valid, length):
+    """
+    EMA over each ticker's valid rows, matching pandas_ta's default:
+    seeded with the SMA of the first `length` closes, then pandas
+    ewm(span=length, adjust=False). Invalid rows carry the last value.
+    """
+    n, m = close.shape
+    count = np.cumsum(valid, axis=0)
+
+    # SMA seed from the first `length` valid closes of each ticker
+    block = np.full((length, m), np.nan)
+    r, c = np.nonzero(valid & (count <= length))
+    block[count[r, c] - 1, c] = close[r, c]
+    seed = np.ascontiguousarray(block.T).sum(axis=1) / length
+
+    out = np.full((n, m), np.nan)
+    weighted = np.full(m, np.nan)
+    for t in range(n):
+        update = valid[t] & (count[t] > length)
+        weighted = np.where(update, ema_step(weighted, close[t], length), weighted)
+        weighted = np.where(valid[t] & (count[t] == length), seed, weighted)
+        out[t] = weighted
+    return out
+
+
+def month_keys(dates):
+    return timeframes.period_keys(dates, "monthly")
+
+
+def monthly_bars(panel):
+    """
+    Calendar-month High/Low/Close per ticker, like resample('ME') on the
+    valid rows. Returns (first_key, high, low, close) where row k of each
+    array is month first_key + k; months without bars are NaN.
+    """
+    return timeframes.table(panel, "monthly")
+
+
+def candle_features(o, h, l, c):
+    body = np.abs(c - o)
+    total_range = h - l
+    with np.errstate(divide='ignore', invalid='ignore'):
+        body_ratio = body / total_range
+    return {
+        'body': body,
+        'range': total_range,
+        'upper_wick': h - np.maximum(o, c),
+        'lower_wick': np.minimum(o, c) - l,
+        'body_ratio': body_ratio,
+    }
+
+
+def candle_patterns(o, h, l, c, valid):
+    """
+    patterns.encode bits of every row of a date × ticker panel, against each
+    ticker's previous valid bars (0 on invalid rows).
+    """
+    prev = prev_valid_row(valid)
+    total_range = h - l
+
+    def prior_ranges():
+        rows = prev
+        for _ in range(patterns.PRIOR_RANGES):
+            yield take_rows(total_range, rows)
+            rows = np.where(rows >= 0, np.take_along_axis(prev, np.clip(rows, 0, None), axis=0), -1)
+
+    bits = patterns.encode((o, h, l, c), tuple(take_rows(v, prev) for v in (o, h, l, c)), prior_ranges())
+    return np.where(valid, bits, 0).astype(np.uint16)
+
+
+class LazyFeatures(Mapping):
+    """
+    Feature groups ({name: array or dict of arrays}) computed on first
+    access and kept, so features no strategy or record reads are never built.
+    """
+
+    def __init__(self, groups):
+        self.groups = groups
+        self.values = {}
+
+    def __getitem__(self, name):
+        if name not in self.values:
+            self.values[name] = _compute(self.groups[name])
+        return self.values[name]
+
+    def __contains__(self, name):
+        return name in self.groups
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def __len__(self):
+        return len(self.groups)
+
+
+@timed("indicators")
+def _compute(group):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return group()
+
+
+def compute_features(panel):
+    """
+    Every scanner feature for every row of the panel, computed lazily (see
+    LazyFeatures). Daily pivots come from the ticker's previous valid bar,
+    weekly and monthly pivots from the previous (and second previous)
+    calendar week and month.
+    """
+    o, h, l, c = panel['open'], panel['high'], panel['low'], panel['close']
+    valid = panel['valid']
+    n = valid.shape[0]
+    shared = {}
+
+    def once(key, build):
+        # Groups computed together (e.g. a timeframe's CPR and Camarilla) are built once
+        if key not in shared:
+            shared[key] = build()
+        return shared[key]
+
+    def daily():
+        # --- Daily (T-1) levels ---
+        prev = prev_valid_row(valid)
+        ph, pl, pc = take_rows(h, prev), take_rows(l, prev), take_rows(c, prev)
+        return {'cpr_daily': calculate_cpr_value(ph, pl, pc), 'cam_daily': calculate_camarilla_value(ph, pl, pc)}
+
+    def eligible():
+        keys = month_keys(panel['dates'])
+        # Calendar months spanned since the ticker's first bar (len(df_monthly))
+        first_row = np.where(valid.any(axis=0), valid.argmax(axis=0), n - 1)
+        months_seen = keys[:, None] - keys[first_row][None, :] + 1
+        count = np.cumsum(valid, axis=0)
+        return valid & (count >= MIN_BARS) & (months_seen >= MIN_MONTHS)
+
+    def pivots(timeframe, name):
+        return lambda: once(timeframe, lambda: pivot_features(panel, timeframe))[name]
+
+    return LazyFeatures({
+        'price': lambda: c,
+        'open': lambda: o,
+        'high': lambda: h,
+        'low': lambda: l,
+        'range_pct': lambda: np.abs(h - l) / c * 100,
+        'ema8': lambda: ema(c, valid, 8),
+        'ema20': lambda: ema(c, valid, 20),
+        'cpr_daily': lambda: once('daily', daily)['cpr_daily'],
+        'cam_daily': lambda: once('daily', daily)['cam_daily'],
+        **{name: pivots(timeframe, name) for timeframe in ("weekly", "monthly")
+           for name in (f'cpr_{timeframe}', f'cam_{timeframe}', f'cam_{timeframe}_prev')},
+        'candle': lambda: {**candle_features(o, h, l, c), 'patterns': candle_patterns(o, h, l, c, valid)},
+        'eligible': eligible,
+    })
+
+
+def pivot_features(panel, timeframe):
+    """
+    cpr_<timeframe> / cam_<timeframe> from the previous `timeframe` period and
+    cam_<timeframe>_prev from the one before, for every row of the panel.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        last = timeframes.previous_period(panel, timeframe, 1)
+        before = timeframes.previous_period(panel, timeframe, 2)
+        return {
+            f'cpr_{timeframe}': calculate_cpr_value(*last),
+            f'cam_{timeframe}': calculate_camarilla_value(*last),
+            f'cam_{timeframe}_prev': calculate_camarilla_value(*before),
+        }
+
+
+def intraday_features(panel, timeframe="15m"):
+    """
+    Features of `timeframe` candles (e.g. "15m", "60m") built from a panel of
+    minute bars. Pivots exist for the candle's own timeframe and every coarser
+    one (cpr_daily from the previous session, cpr_60m from the previous hour,
+    ...). Returns (candles, features); the rules engine evaluates them like
+    daily features.
+    """
+    candles = timeframes.aggregate(panel, timeframe)
+    o, h, l, c = candles['open'], candles['high'], candles['low'], candles['close']
+    valid = candles['valid']
+    shared = {}
+
+    def pivots(tf, name):
+        def build():
+            if tf not in shared:
+                shared[tf] = pivot_features(candles, tf)
+            return shared[tf][name]
+        return build
+
+    coarser = timeframes.TIMEFRAMES[timeframes.TIMEFRAMES.index(timeframe):]
+    return candles, LazyFeatures({
+        'price': lambda: c,
+        'open': lambda: o,
+        'high': lambda: h,
+        'low': lambda: l,
+        'range_pct': lambda: np.abs(h - l) / c * 100,
+        'ema8': lambda: ema(c, valid, 8),
+        'ema20': lambda: ema(c, valid, 20),
+        **{name: pivots(tf, name) for tf in coarser
+           for name in (f'cpr_{tf}', f'cam_{tf}', f'cam_{tf}_prev')},
+        'candle': lambda: {**candle_features(o, h, l, c), 'patterns': candle_patterns(o, h, l, c, valid)},
+        'eligible': lambda: valid,
+    })
+
+
+def _map(features, fn):
+    return {k: _map(v, fn) if isinstance(v, dict) else fn(v) for k, v in features.items()}
+
+
+def latest(features, valid):
+    """Reduces full-history features to each ticker's last valid bar (lazily, group by group)."""
+    last = last_valid_row(valid)[-1:] if valid.shape[0] else np.full((1, valid.shape[1]), -1)
+
+    def pick(values):
+        if values.dtype == bool:
+            return np.take_along_axis(values, np.clip(last, 0, None), axis=0)[0] & (last[0] >= 0)
+        if values.dtype.kind in 'ui':
+            # Bitmasks stay integers; tickers without bars get no bits
+            return np.where(last[0] >= 0, np.take_along_axis(values, np.clip(last, 0, None), axis=0)[0], 0).astype(values.dtype)
+        return take_rows(values, last)[0]
+
+    def reduce(name):
+        value = features[name]
+        return _map(value, pick) if isinstance(value, dict) else pick(value)
+
+    return LazyFeatures({name: (lambda name=name: reduce(name)) for name in features})
+
+
+@timed("evaluate")
+def evaluate(f, strategies=None):
+    """Evaluates strategies (default: rules.DEFAULT_STRATEGIES) as boolean masks over any feature shape."""
+    return rules.evaluate(f, strategies)
+
+
+# Record fields in the order they are packed into result arrays
+RECORD_FIELDS = [
+    ('price',), ('range_pct',),
+    ('cpr_daily', 'width_pct'), ('cam_daily', 'center'), ('cpr_daily', 'pivot'),
+    ('cam_monthly', 'h3'), ('cam_monthly_prev', 'h3'),
+    ('cam_monthly', 'l3'), ('cam_monthly_prev', 'l3'),
+    ('cpr_monthly', 'pivot'),
+    ('confluence', 'count'), ('confluence', 'nearest'), ('confluence', 'nearest_pct'),
+    ('candle', 'patterns'),
+]
+
+
+@timed("serialize")
+def pack_hits(f, masks):
+    """
+    Compacts strategy hits into plain arrays: (hits, flags, values) where
+    hits are ticker indices, flags a bitmask over the strategies in `masks`
+    (in order, up to 32) and values a len(hits) × len(RECORD_FIELDS) float64 array.
+    """
+    flags = np.zeros(len(f['price']), dtype=np.uint32)
+    for bit, strategy in enumerate(masks):
+        flags |= masks[strategy].astype(np.uint32) << np.uint32(bit)
+    hits = np.flatnonzero(flags).astype(np.int32)
+
+    values = np.empty((len(hits), len(RECORD_FIELDS)))
+    # Confluence is only computed for the hits
+    extra = {'confluence': confluence.features(f, hits)}
+    for k, path in enumerate(RECORD_FIELDS):
+        if path[0] in extra:
+            values[:, k] = extra[path[0]][path[1]]
+            continue
+        column = f
+        for key in path:
+            column = column[key]
+        values[:, k] = column[hits]
+    # Levels are already rounded; rounding again in float64 also cleans up float32 panels
+    return hits, flags[hits], np.round(values, 2)
+
+
+@timed("serialize")
+def unpack_records(tickers, flags, values, strategies=None):
+    """Builds valid_stocks records from packed hits (tickers aligned with the rows)."""
+    names = [s.name for s in strategies] if strategies else STRATEGIES
+    records = []
+    for ticker, flag, v in zip(tickers, flags, values):
+        records.append({
+            "ticker": ticker.replace(".NS", ""),
+            "price": v[0],
+            "strategies": [s for bit, s in enumerate(names) if flag >> bit & 1],
+            "range_pct": v[1],
+
+            # Store Daily levels for Doji tab
+            "daily": {
+                "cpr_width": v[2],
+                "cam_center": v[3],
+                "pivot": v[4]
+            },
+
+            # Store Monthly levels for Inside Tab
+            "monthly": {
+                "curr_h3": v[5],
+                "prev_h3": v[6],
+                "curr_l3": v[7],
+                "prev_l3": v[8],
+                "pivot": v[9]
+            },
+
+            # Pivot levels / EMAs within confluence.CONFLUENCE_PCT of the price
+            "confluence": {
+                "score": int(v[10]),
+                "nearest": confluence.LEVEL_NAMES[int(v[11])] if v[11] >= 0 else None,
+                "nearest_pct": v[12] if not np.isnan(v[12]) else None
+            },
+
+            # Candlestick patterns of the latest bar
+            "patterns": patterns.names(v[13])
+        })
+    return records
+
+
+def rank_records(records):
+    """Orders records by confluence score, then by distance to the nearest level."""
+    def key(record):
+        c = record.get("confluence") or {}
+        pct = c.get("nearest_pct")
+        return -(c.get("score") or 0), abs(pct) if pct is not None else float('inf')
+    return sorted(records, key=key)
+
+
+def build_records(tickers, f, masks, strategies=None):
+    """Builds the valid_stocks records for tickers with at least one strategy hit."""
+    hits, flags, values = pack_hits(f, masks)
+    return unpack_records([tickers[j] for j in hits], flags, values, strategies)
+
+
+def scan_frames(frames, tickers=None, strategies=None):
+    """
+    Runs the full vectorized scan over {ticker: DataFrame}.
+    Returns packed hits (see pack_hits) with hit indices into the aligned
+    ticker list, plus that list.
+    """
+    return scan_panel(align(frames, tickers), strategies)
+
+
+def scan_panel(panel, strategies=None):
+    """scan_frames on an already aligned panel (e.g. a panel_store view)."""
+    if not panel['tickers']:
+        return panel['tickers'], np.empty(0, dtype=np.int32), np.empty(0, dtype=np.uint32), np.empty((0, len(RECORD_FIELDS)))
+    features = compute_features(panel)
+    f = latest(features, panel['valid'])
+    return (panel['tickers'],) + pack_hits(f, evaluate(f, strategies))
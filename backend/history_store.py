@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import contextlib
+import nse_calendar
+
+# Scan history: every scan's hits appended to a local SQLite database, one row
+# per (date, strategy, ticker) with the record's daily and monthly levels.
+# Sessions are keyed by the date of the latest bar, not the run's clock: a
+# session scanned more than once on its day (before and after the close)
+# keeps its latest scan, and later reruns over the same bars add nothing.
+# Lookups go through the primary key (date, strategy, ticker) and the
+# (strategy, ticker, date) / (ticker, date) indexes, so the dashboard never
+# loads or diffs whole JSON files.
+
+DB_FILE = os.path.join(os.path.dirname(__file__), "data", "scan_history.db")
+
+# Column name -> path into a scan record
+LEVELS = {
+    "price": ("price",),
+    "range_pct": ("range_pct",),
+    "cpr_width": ("daily", "cpr_width"),
+    "cam_center": ("daily", "cam_center"),
+    "daily_pivot": ("daily", "pivot"),
+    "curr_h3": ("monthly", "curr_h3"),
+    "prev_h3": ("monthly", "prev_h3"),
+    "curr_l3": ("monthly", "curr_l3"),
+    "prev_l3": ("monthly", "prev_l3"),
+    "monthly_pivot": ("monthly", "pivot"),
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS scans (
+    date TEXT PRIMARY KEY,
+    last_updated TEXT NOT NULL,
+    total_scanned INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signals (
+    date TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    {", ".join(f"{c} REAL" for c in LEVELS)},
+    PRIMARY KEY (date, strategy, ticker)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signals_strategy ON signals (strategy, ticker, date);
+CREATE INDEX IF NOT EXISTS signals_ticker ON signals (ticker, date);
+"""
+
+
+def connect(db=DB_FILE):
+    directory = os.path.dirname(db)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+@contextlib.contextmanager
+def _open(db):
+    conn = connect(db)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _level(record, path):
+    value = record
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return None if value is None else float(value)
+
+
+def record_scan(result, db=DB_FILE):
+    """
+    Appends a scan_stocks() result under its session: the date of its latest
+    bar ("session"; older results without one fall back to the date of
+    last_updated). A scan taken on the session day replaces any earlier scan
+    of it (intraday, then after the close). Once a scan from a later day has
+    recorded the session (its final bars), reruns over the same bars, e.g.
+    on weekends, are skipped, as are days that are not NSE sessions.
+    Returns (date, rows written), rows None if the scan was skipped.
+    """
+    date = result.get("session") or result["last_updated"][:10]
+    if not nse_calendar.is_trading_day(date):
+        return date, None
+    rows = [(date, strategy, s["ticker"], *(_level(s, path) for path in LEVELS.values()))
+            for s in result["stocks"] for strategy in s["strategies"]]
+    with _open(db) as conn, conn:
+        recorded = conn.execute("SELECT last_updated FROM scans WHERE date = ?", (date,)).fetchone()
+        if recorded is not None and recorded[0][:10] > date:
+            return date, None
+        conn.execute("DELETE FROM signals WHERE date = ?", (date,))
+        conn.execute("INSERT OR REPLACE INTO scans VALUES (?, ?, ?)",
+                     (date, result["last_updated"], result.get("total_scanned", 0)))
+        conn.executemany(f"INSERT OR REPLACE INTO signals VALUES ({', '.join('?' * (3 + len(LEVELS)))})", rows)
+    return date, len(rows)
+
+
+def sessions(db=DB_FILE):
+    """Recorded session dates, oldest first."""
+    with _open(db) as conn:
+        return [r[0] for r in conn.execute("SELECT date FROM scans ORDER BY date")]
+
+
+def _session(conn, date=None):
+    """`date` if given, else the latest recorded session."""
+    if date is not None:
+        return date
+    return conn.execute("SELECT MAX(date) FROM scans").fetchone()[0]
+
+
+def changes(date=None, strategy=None, db=DB_FILE):
+    """
+    Signals new and dropped on `date` (default: the latest session) versus
+    the previous recorded session: {strategy: {"added": [rows], "dropped": [rows]}}.
+    Added rows carry that day's levels, dropped rows the previous day's.
+    """
+    with _open(db) as conn:
+        date = _session(conn, date)
+        if date is None:
+            return {}
+        previous = conn.execute("SELECT MAX(date) FROM scans WHERE date < ?", (date,)).fetchone()[0]
+        query = """
+            SELECT s.* FROM signals s
+            WHERE s.date = ? AND (? IS NULL OR s.strategy = ?) AND NOT EXISTS (
+                SELECT 1 FROM signals p WHERE p.date = ? AND p.strategy = s.strategy AND p.ticker = s.ticker)
+            ORDER BY s.strategy, s.ticker
+        """
+        out = {}
+        for key, (day, other) in (("added", (date, previous)), ("dropped", (previous, date))):
+            if day is None:
+                continue
+            for row in conn.execute(query, (day, strategy, strategy, other)):
+                entry = out.setdefault(row["strategy"], {"added": [], "dropped": []})
+                entry[key].append(dict(row))
+        return out
+
+
+def streaks(strategy, date=None, min_days=1, db=DB_FILE):
+    """
+    Tickers in `strategy` on `date` (default: the latest session) with the
+    number of consecutive recorded sessions they have been in it, longest
+    first: [{"ticker", "days", "since"}].
+    """
+    with _open(db) as conn:
+        date = _session(conn, date)
+        if date is None:
+            return []
+        # Gaps and islands over session numbers: a run's rows share n - row_number
+        rows = conn.execute("""
+            WITH sessions AS (
+                SELECT date, ROW_NUMBER() OVER (ORDER BY date) AS n FROM scans WHERE date <= ?
+            ), hits AS (
+                SELECT s.ticker, s.date, sessions.n,
+                       sessions.n - ROW_NUMBER() OVER (PARTITION BY s.ticker ORDER BY sessions.n) AS run
+                FROM signals s JOIN sessions ON sessions.date = s.date
+                WHERE s.strategy = ?
+            )
+            SELECT ticker, COUNT(*) AS days, MIN(date) AS since FROM hits
+            GROUP BY ticker, run
+            HAVING MAX(n) = (SELECT MAX(n) FROM sessions) AND COUNT(*) >= ?
+            ORDER BY days DESC, ticker
+        """, (date, strategy, min_days))
+        return [dict(r) for r in rows]
+
+
+def timeline(ticker, strategy=None, start=None, end=None, db=DB_FILE):
+    """Every recorded signal of `ticker` (optionally one strategy / date range), oldest first."""
+    with _open(db) as conn:
+        rows = conn.execute("""
+            SELECT * FROM signals
+            WHERE ticker = ? AND (? IS NULL OR strategy = ?)
+              AND date >= COALESCE(?, '') AND date <= COALESCE(?, '9999')
+            ORDER BY date, strategy
+        """, (ticker, strategy, strategy, start, end))
+        return [dict(r) for r in rows]
+
+
+def import_files(paths, db=DB_FILE):
+    """Backfills the history from saved scan results (data.json or data/scans/<day>.json)."""
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                result = json.load(f)
+            date, n = record_scan(result, db)
+            if n is None:
+                print(f"Skipped {path}: {date} is not a session or is already recorded")
+            else:
+                print(f"Imported {path}: {date}, {n} signals")
+        except Exception as e:
+            print(f"Warning: Could not import {path}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the scan history database")
+    parser.add_argument("--db", default=DB_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="Backfill from saved scan JSON files")
+    p.add_argument("files", nargs="+")
+    p = sub.add_parser("changes", help="Signals new / dropped versus the previous session")
+    p.add_argument("--date")
+    p.add_argument("--strategy")
+    p = sub.add_parser("streaks", help="Consecutive sessions in a strategy")
+    p.add_argument("strategy")
+    p.add_argument("--date")
+    p.add_argument("--min-days", type=int, default=2)
+    p = sub.add_parser("timeline", help="A ticker's signal history")
+    p.add_argument("ticker")
+    p.add_argument("--strategy")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        import_files(args.files, args.db)
+    elif args.command == "changes":
+        for name, c in changes(args.date, args.strategy, args.db).items():
+            print(f"{name}: +{len(c['added'])} -{len(c['dropped'])}")
+            print(f"  new: {', '.join(r['ticker'] for r in c['added']) or '-'}")
+            print(f"  dropped: {', '.join(r['ticker'] for r in c['dropped']) or '-'}")
+    elif args.command == "streaks":
+        for r in streaks(args.strategy, args.date, args.min_days, args.db):
+            print(f"{r['ticker']}: {r['days']} sessions (since {r['since']})")
+    else:
+        json.dump(timeline(args.ticker, args.strategy, db=args.db), sys.stdout, indent=2)
+        print()
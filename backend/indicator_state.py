@@ -0,0 +1,287 @@
+import os
+import numpy as np
+import pandas as pd
+import engine
+import patterns
+import timeframes
+import telemetry
+from telemetry import timed
+
+# Persisted per-ticker indicator state, advanced one bar at a time.
+#
+# The stored state is "committed" up to each ticker's second-to-last bar: the
+# latest bar may still be an intraday partial that changes on the next scan.
+# Every scan advances the committed state through the new bars (usually one
+# or two), so its cost is O(1) per ticker instead of O(history). A ticker is
+# recomputed from its full history only when it is new, short, or the stored
+# bar no longer matches the data (history restated).
+
+STATE_FILE = os.path.join(os.path.dirname(__file__), "data", "indicator_state.npz")
+
+STATE_FIELDS = [
+    'day', 'count', 'first_key', 'month_key',
+    'open', 'high', 'low', 'close',
+    'prev_open', 'prev_high', 'prev_low', 'prev_close',
+    # High-low ranges of the bars before prev, newest first (NR4 / NR7)
+    'range2', 'range3', 'range4', 'range5', 'range6',
+    'ema8', 'ema20',
+    # Running aggregate of the current calendar month
+    'month_high', 'month_low', 'month_close',
+    # The two calendar months before it (NaN if no bars traded that month)
+    'm1_high', 'm1_low', 'm1_close',
+    'm2_high', 'm2_low', 'm2_close',
+    # Same for calendar weeks
+    'week_key', 'week_high', 'week_low', 'week_close',
+    'w1_high', 'w1_low', 'w1_close',
+    'w2_high', 'w2_low', 'w2_close',
+]
+# (running period, previous, second previous, timeframe)
+PERIODS = [('month', 'm1', 'm2', "monthly"), ('week', 'w1', 'w2', "weekly")]
+BAR_FIELDS = ['open', 'high', 'low', 'close']
+RANGE_FIELDS = ['range2', 'range3', 'range4', 'range5', 'range6']
+
+
+def _day(dates):
+    return np.asarray(pd.DatetimeIndex(dates).values.astype('datetime64[D]').astype(np.int64), dtype=np.float64)
+
+
+def _period_key(days, timeframe):
+    return timeframes.period_keys(days.astype('datetime64[D]'), timeframe).astype(np.float64)
+
+
+def empty_state():
+    return {'tickers': []} | {f: np.empty(0) for f in STATE_FIELDS}
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return empty_state()
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            state = {f: data[f] for f in STATE_FIELDS}
+            state['tickers'] = data['tickers'].tolist()
+        return state
+    except Exception as e:
+        print(f"Warning: Could not read indicator state: {e}")
+        return empty_state()
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, tickers=np.asarray(state['tickers'], dtype=str), **{f: state[f] for f in STATE_FIELDS})
+    os.replace(tmp, path)
+
+
+def subset(state, rows):
+    out = {f: state[f][rows] for f in STATE_FIELDS}
+    out['tickers'] = [state['tickers'][j] for j in rows]
+    return out
+
+
+def concat(*states):
+    out = {f: np.concatenate([s[f] for s in states]) for f in STATE_FIELDS}
+    out['tickers'] = [t for s in states for t in s['tickers']]
+    return out
+
+
+def merge(state, updates):
+    """Replaces or appends the rows in `updates`, keyed by ticker."""
+    updated = set(updates['tickers'])
+    keep = [j for j, t in enumerate(state['tickers']) if t not in updated]
+    return concat(subset(state, keep), updates)
+
+
+@timed("indicators")
+def from_panel(panel):
+    """State as of each ticker's last valid bar, computed from its full history."""
+    valid = panel['valid']
+    has_bars = valid.any(axis=0)
+    cols = np.flatnonzero(has_bars)
+    n = valid.shape[0]
+
+    last = engine.last_valid_row(valid)[-1]
+    prev = engine.prev_valid_row(valid)[last, np.arange(valid.shape[1])]
+    first_row = valid.argmax(axis=0)
+
+    def at(values, rows):
+        return engine.take_rows(values, rows[None, :])[0]
+
+    row = np.clip(last, 0, n - 1)
+    keys = engine.month_keys(panel['dates'])
+    state = {
+        'day': _day(panel['dates'])[row],
+        'count': valid.sum(axis=0).astype(np.float64),
+        'first_key': keys[first_row].astype(np.float64),
+        'open': at(panel['open'], last),
+        'high': at(panel['high'], last),
+        'low': at(panel['low'], last),
+        'close': at(panel['close'], last),
+        'prev_open': at(panel['open'], prev),
+        'prev_high': at(panel['high'], prev),
+        'prev_low': at(panel['low'], prev),
+        'prev_close': at(panel['close'], prev),
+        'ema8': at(engine.ema(panel['close'], valid, 8), last),
+        'ema20': at(engine.ema(panel['close'], valid, 20), last),
+    }
+    before = engine.prev_valid_row(valid)
+    rows = prev
+    for field in RANGE_FIELDS:
+        rows = np.where(rows >= 0, before[np.clip(rows, 0, None), np.arange(valid.shape[1])], -1)
+        state[field] = at(panel['high'] - panel['low'], rows)
+    for running, p1, p2, timeframe in PERIODS:
+        keys = timeframes.period_keys(panel['dates'], timeframe)
+        first_key, high, low, close = timeframes.table(panel, timeframe)
+        state[f'{running}_key'] = keys[row].astype(np.float64)
+        for prefix, offset in ((running, 0), (p1, 1), (p2, 2)):
+            slot = keys[row] - first_key - offset
+            rows = np.where(slot >= 0, slot, -1)
+            state[f'{prefix}_high'], state[f'{prefix}_low'], state[f'{prefix}_close'] = \
+                at(high, rows), at(low, rows), at(close, rows)
+
+    state = {f: state[f][cols] for f in STATE_FIELDS}
+    state['tickers'] = [panel['tickers'][j] for j in cols]
+    return state
+
+
+def advance(state, bars, day):
+    """
+    Advances every row of `state` by one bar. `bars` holds open/high/low/close
+    arrays aligned with the state rows, `day` the bar dates (days since epoch).
+    """
+    s = dict(state)
+    o, h, l, c = bars['open'], bars['high'], bars['low'], bars['close']
+    for running, p1, p2, timeframe in PERIODS:
+        key = _period_key(day, timeframe)
+        shift = key - state[f'{running}_key']
+        new_period = shift > 0
+        # Roll-over: the running period becomes p1 (or p2 if a period was skipped)
+        for f in ('high', 'low', 'close'):
+            current, prev1, prev2 = state[f'{running}_{f}'], state[f'{p1}_{f}'], state[f'{p2}_{f}']
+            s[f'{p1}_{f}'] = np.where(new_period, np.where(shift == 1, current, np.nan), prev1)
+            s[f'{p2}_{f}'] = np.where(new_period, np.where(shift == 1, prev1, np.where(shift == 2, current, np.nan)), prev2)
+        s[f'{running}_high'] = np.where(new_period, h, np.fmax(state[f'{running}_high'], h))
+        s[f'{running}_low'] = np.where(new_period, l, np.fmin(state[f'{running}_low'], l))
+        s[f'{running}_close'] = c
+        s[f'{running}_key'] = key
+
+    s[RANGE_FIELDS[0]] = state['prev_high'] - state['prev_low']
+    for newer, older in zip(RANGE_FIELDS, RANGE_FIELDS[1:]):
+        s[older] = state[newer]
+    s['prev_open'], s['prev_high'], s['prev_low'], s['prev_close'] = state['open'], state['high'], state['low'], state['close']
+    s['open'], s['high'], s['low'], s['close'] = o, h, l, c
+    s['ema8'] = engine.ema_step(state['ema8'], c, 8)
+    s['ema20'] = engine.ema_step(state['ema20'], c, 20)
+    s['count'] = state['count'] + 1
+    s['day'] = np.asarray(day, dtype=np.float64)
+    return s
+
+
+@timed("indicators")
+def features(state):
+    """Latest-bar features in the shape engine.latest() returns."""
+    o, h, l, c = state['open'], state['high'], state['low'], state['close']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prev = (state['prev_high'], state['prev_low'], state['prev_close'])
+        m1 = (state['m1_high'], state['m1_low'], state['m1_close'])
+        m2 = (state['m2_high'], state['m2_low'], state['m2_close'])
+        w1 = (state['w1_high'], state['w1_low'], state['w1_close'])
+        w2 = (state['w2_high'], state['w2_low'], state['w2_close'])
+        months_seen = state['month_key'] - state['first_key'] + 1
+        return {
+            'price': c,
+            'open': o,
+            'high': h,
+            'low': l,
+            'range_pct': np.abs(h - l) / c * 100,
+            'ema8': state['ema8'],
+            'ema20': state['ema20'],
+            'cpr_daily': engine.calculate_cpr_value(*prev),
+            'cam_daily': engine.calculate_camarilla_value(*prev),
+            'cpr_weekly': engine.calculate_cpr_value(*w1),
+            'cam_weekly': engine.calculate_camarilla_value(*w1),
+            'cam_weekly_prev': engine.calculate_camarilla_value(*w2),
+            'cpr_monthly': engine.calculate_cpr_value(*m1),
+            'cam_monthly': engine.calculate_camarilla_value(*m1),
+            'cam_monthly_prev': engine.calculate_camarilla_value(*m2),
+            'candle': {
+                **engine.candle_features(o, h, l, c),
+                'patterns': patterns.encode(
+                    (o, h, l, c), (state['prev_open'], *prev),
+                    [state['prev_high'] - state['prev_low']] + [state[f] for f in RANGE_FIELDS]),
+            },
+            'eligible': (state['count'] >= engine.MIN_BARS) & (months_seen >= engine.MIN_MONTHS),
+        }
+
+
+def _matches(df, day, row, state):
+    """True if the committed bar in `state` is still what the data says."""
+    ts = pd.Timestamp(np.datetime64(int(day), 'D'))
+    if ts not in df.index:
+        return False
+    bar = df.loc[ts]
+    return all(np.isclose(bar[f.capitalize()], state[f][row], rtol=1e-9, atol=0) for f in BAR_FIELDS)
+
+
+@timed("indicators")
+def _advance_frames(state, frames):
+    """Advances each state row through its ticker's bars, one step per bar across all tickers."""
+    n_steps = max((len(frames[t]) for t in state['tickers']), default=0)
+    for step in range(n_steps):
+        rows = [j for j, t in enumerate(state['tickers']) if len(frames[t]) > step]
+        bars = {f: np.array([frames[state['tickers'][j]][f.capitalize()].iloc[step] for j in rows]) for f in BAR_FIELDS}
+        day = _day([frames[state['tickers'][j]].index[step] for j in rows])
+        part = advance(subset(state, rows), bars, day)
+        for f in STATE_FIELDS:
+            state[f] = state[f].copy()
+            state[f][rows] = part[f]
+    return state
+
+
+def scan_frames(frames, tickers, state, strategies=None):
+    """
+    Incremental equivalent of engine.scan_frames. Returns
+    (tickers, hits, flags, values, committed) where `committed` holds the
+    updated state rows to persist (as of each ticker's second-to-last bar).
+    """
+    index = {t: j for j, t in enumerate(state['tickers'])}
+    incremental, full = [], []
+    with telemetry.stage("clean"):
+        for ticker in tickers:
+            if ticker not in frames:
+                continue
+            df = frames[ticker].dropna()
+            if df.empty:
+                continue
+            j = index.get(ticker)
+            if j is not None and state['count'][j] >= engine.MIN_BARS and _matches(df, state['day'][j], j, state):
+                new = df[df.index > pd.Timestamp(np.datetime64(int(state['day'][j]), 'D'))]
+                if len(new) > 0:
+                    incremental.append((ticker, j, new))
+                    continue
+            full.append((ticker, df))
+    telemetry.count("state_incremental", len(incremental))
+    telemetry.count("state_recomputed", len(full))
+
+    # Full recompute: build committed state from all but the last bar
+    parts, last_bars = [], {}
+    if full:
+        history = {t: df.iloc[:-1] for t, df in full if len(df) > 1}
+        panel = engine.align(history)
+        if panel['tickers']:
+            parts.append(from_panel(panel))
+        last_bars.update({t: df.iloc[-1:] for t, df in full if t in history})
+
+    # Incremental: advance the committed state through all new bars but the last
+    if incremental:
+        inc = subset(state, [j for _, j, _ in incremental])
+        inc = _advance_frames(inc, {t: new.iloc[:-1] for t, _, new in incremental})
+        parts.append(inc)
+        last_bars.update({t: new.iloc[-1:] for t, _, new in incremental})
+
+    committed = concat(*parts) if parts else empty_state()
+    current = _advance_frames(dict(committed), last_bars)
+
+    f = features(current)
+    hits, flags, values = engine.pack_hits(f, engine.evaluate(f, strategies))
+    return current['tickers'], hits, flags, values, committed
@@ -0,0 +1,54 @@
+import os
+import datetime
+
+# NSE trading calendar: weekends and exchange holidays. Standard library only,
+# so the dashboard and the scan history can check sessions without importing
+# pandas. timeframes.is_trading_day is this one.
+
+# NSE trading holidays (weekday closures). Extend this table each year when
+# NSE publishes its calendar; until then, dates can be listed one per line
+# (YYYY-MM-DD) in the optional HOLIDAYS_FILE without a code change.
+NSE_HOLIDAYS = {
+    # 2024
+    "2024-01-22", "2024-01-26", "2024-03-08", "2024-03-25", "2024-03-29", "2024-04-11",
+    "2024-04-17", "2024-05-01", "2024-05-20", "2024-06-17", "2024-07-17", "2024-08-15",
+    "2024-10-02", "2024-11-01", "2024-11-15", "2024-11-20", "2024-12-25",
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14", "2025-04-18",
+    "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02", "2025-10-21", "2025-10-22",
+    "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-15", "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03",
+    "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14", "2026-10-02",
+    "2026-10-20", "2026-11-10", "2026-11-24", "2026-12-25",
+}
+HOLIDAYS_FILE = os.path.join(os.path.dirname(__file__), "nse_holidays.txt")
+
+_holidays = None
+
+
+def holidays():
+    global _holidays
+    if _holidays is None:
+        days = set(NSE_HOLIDAYS)
+        if os.path.exists(HOLIDAYS_FILE):
+            try:
+                with open(HOLIDAYS_FILE, 'r') as f:
+                    days.update(line.strip() for line in f if line.strip() and not line.startswith("#"))
+            except Exception as e:
+                print(f"Warning: Could not read holidays file: {e}")
+        _holidays = {datetime.date.fromisoformat(d) for d in days}
+        year = datetime.date.today().year
+        if not any(d.year == year for d in _holidays):
+            print(f"Warning: No NSE holidays listed for {year}; every weekday counts as a session. "
+                  f"Add them to nse_calendar.NSE_HOLIDAYS or {HOLIDAYS_FILE}")
+    return _holidays
+
+
+def is_trading_day(day):
+    """True for NSE sessions. `day` is a date, a datetime / pd.Timestamp, or a YYYY-MM-DD string."""
+    if isinstance(day, str):
+        day = datetime.date.fromisoformat(day[:10])
+    elif isinstance(day, datetime.datetime):
+        day = day.date()
+    return day.weekday() < 5 and day not in holidays()
@@ -0,0 +1,129 @@
+import os
+import json
+import gzip
+import hashlib
+import brotli
+
+# Static-site output: a small manifest plus one minified, content-hashed shard
+# per strategy (with .gz / .br siblings), and a delta against the previous scan.
+# Hashed files never change, so they can be cached forever; only the manifest
+# has to be revalidated.
+
+MANIFEST = "manifest.json"
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _write(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _write_hashed(out_dir, prefix, data):
+    """Writes data (plus compressed siblings) as <prefix>.<hash>.json; returns the file name."""
+    name = f"{prefix}.{hashlib.sha256(data).hexdigest()[:12]}.json"
+    path = os.path.join(out_dir, name)
+    # Each file is checked on its own, so shards from older scans get any sibling they lack
+    # (mtime=0 keeps the .gz byte-identical for identical content)
+    for suffix, encode in (("", None), (".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0)),
+                           (".br", brotli.compress)):
+        if not os.path.exists(path + suffix):
+            _write(path + suffix, encode(data) if encode else data)
+    return name
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read previous manifest: {e}")
+        return None
+
+
+def _load_shard(out_dir, name):
+    try:
+        with open(os.path.join(out_dir, name), 'r') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def diff(previous, current):
+    """{strategy: {"added": [...], "removed": [...]}} between two {strategy: [tickers]} maps."""
+    delta = {}
+    for strategy in sorted(set(previous) | set(current)):
+        old, new = set(previous.get(strategy, [])), set(current.get(strategy, []))
+        delta[strategy] = {"added": sorted(new - old), "removed": sorted(old - new)}
+    return delta
+
+
+def _cleanup(out_dir, keep):
+    for name in os.listdir(out_dir):
+        base = name
+        for ext in (".gz", ".br"):
+            if base.endswith(ext):
+                base = base[:-len(ext)]
+        if base != MANIFEST and base.endswith(".json") and base not in keep:
+            os.remove(os.path.join(out_dir, name))
+
+
+def write_outputs(result, out_dir, strategies=None):
+    """
+    Writes the scan result to out_dir as manifest + per-strategy shards + delta.
+    `strategies` (names) fixes the shard list so strategies without hits still
+    get an empty shard; by default it is taken from the result.
+    Shards referenced by the previous manifest are kept for one more scan so
+    visitors who loaded it can still fetch them.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    previous = load_manifest(out_dir)
+
+    if strategies is None:
+        strategies = []
+        for stock in result['stocks']:
+            for s in stock['strategies']:
+                if s not in strategies:
+                    strategies.append(s)
+
+    shards, members = {}, {}
+    for strategy in strategies:
+        rows = [s for s in result['stocks'] if strategy in s['strategies']]
+        members[strategy] = [s['ticker'] for s in rows]
+        name = _write_hashed(out_dir, strategy, _dumps(rows))
+        shards[strategy] = {"file": name, "count": len(rows)}
+
+    # Delta against the previous scan's shards
+    prev_members = {}
+    if previous:
+        for strategy, info in previous.get("shards", {}).items():
+            rows = _load_shard(out_dir, info["file"])
+            if rows is not None:
+                prev_members[strategy] = [s['ticker'] for s in rows]
+    delta = {
+        "since": previous.get("last_updated") if previous else None,
+        "strategies": diff(prev_members, members),
+    }
+    delta_name = _write_hashed(out_dir, "delta", _dumps(delta))
+
+    manifest = {
+        "last_updated": result['last_updated'],
+        "total_scanned": result['total_scanned'],
+        "shards": shards,
+        "delta": delta_name,
+    }
+    _write(os.path.join(out_dir, MANIFEST), _dumps(manifest))
+
+    keep = {info["file"] for info in shards.values()} | {delta_name}
+    if previous:
+        keep |= {info["file"] for info in previous.get("shards", {}).values()}
+        if previous.get("delta"):
+            keep.add(previous["delta"])
+    _cleanup(out_dir, keep)
+    return manifest
@@ -0,0 +1,184 @@
+import os
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+import engine
+from pipeline import Downloader
+from providers import YFinanceProvider, SnapshotProvider, SyntheticProvider, period_start
+from universes import load_universes, merge_universes, DEFAULT_UNIVERSES
+
+# On-disk price panel for large universes and long histories.
+#
+# Daily OHLCV is stored as one float32 .npy array per field laid out
+# date × ticker, with the date index, the ticker index and a validity bitmap
+# (one bit per date × ticker, packed along the ticker axis) beside it.
+# Missing bars are invalid bits rather than dropped rows, exactly like an
+# engine.align panel. Opening a panel memory-maps the arrays and reads only
+# the .npy headers and the two indexes; view() then hands the engine
+# zero-copy slices of a date window and a ticker range, so memory follows
+# the window scanned rather than the history stored.
+
+PANEL_DIR = os.path.join(os.path.dirname(__file__), "data", "panel")
+HISTORY_PERIOD = "15y"
+DTYPE = np.float32
+DATES_FILE = "dates.npy"
+TICKERS_FILE = "tickers.npy"
+VALID_FILE = "valid.npy"
+
+
+def _compact(df):
+    """(days, values, valid) of one ticker's bars: datetime64[D] dates and float32 n × 5 OHLCV."""
+    df = df.dropna(how='all').sort_index()
+    df = df[~df.index.duplicated(keep='last')]
+    values = df.reindex(columns=engine.FIELDS).to_numpy(dtype=DTYPE)
+    days = df.index.values.astype('datetime64[D]')
+    return days, values, ~np.isnan(values).any(axis=1)
+
+
+def _write(columns, path):
+    """Writes {ticker: _compact(df)} as a panel at `path`, replacing any panel there."""
+    tickers = [t for t, c in columns.items() if len(c[0])]
+    dates = np.unique(np.concatenate([columns[t][0] for t in tickers])) if tickers else np.empty(0, 'datetime64[D]')
+    n, m = len(dates), len(tickers)
+
+    tmp = path.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    arrays = {f: open_memmap(os.path.join(tmp, f"{f.lower()}.npy"), mode='w+', dtype=DTYPE, shape=(n, m))
+              for f in engine.FIELDS}
+    for values in arrays.values():
+        values[:] = np.nan
+    valid = np.zeros((n, m), dtype=bool)
+    for j, ticker in enumerate(tickers):
+        days, values, ok = columns[ticker]
+        rows = np.searchsorted(dates, days)
+        for k, field in enumerate(engine.FIELDS):
+            arrays[field][rows, j] = values[:, k]
+        valid[rows, j] = ok
+    for values in arrays.values():
+        values.flush()
+    del arrays
+    np.save(os.path.join(tmp, VALID_FILE), np.packbits(valid, axis=1, bitorder='little'))
+    np.save(os.path.join(tmp, DATES_FILE), dates)
+    np.save(os.path.join(tmp, TICKERS_FILE), np.array(tickers, dtype=str))
+
+    # Readers that already mapped the old panel keep their (unlinked) files
+    old = path.rstrip(os.sep) + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return n, m
+
+
+def save_panel(frames, path=PANEL_DIR):
+    """Writes {ticker: DataFrame} of daily bars as a panel. Returns (dates, tickers)."""
+    return _write({t: _compact(df) for t, df in frames.items()}, path)
+
+
+def build_panel(provider, tickers, period=HISTORY_PERIOD, path=PANEL_DIR):
+    """Downloads `period` of bars for `tickers` and writes them as a panel, holding only float32 copies."""
+    columns = {}
+    for chunk, batch in Downloader(lambda c: provider.fetch(c, period=period)).run(tickers):
+        for ticker, df in batch.items():
+            columns[ticker] = _compact(df)
+    n, m = _write(columns, path)
+    print(f"Panel saved to {path} ({n} dates × {m} tickers)")
+    return n, m
+
+
+def exists(path=PANEL_DIR):
+    return os.path.exists(os.path.join(path, VALID_FILE))
+
+
+def load_panel(path=PANEL_DIR):
+    """
+    Memory-maps the panel at `path`. Returns a store: 'dates', 'tickers',
+    the field arrays (read-only memmaps, date × ticker) and 'bits', the
+    packed validity bitmap. Pass it to view() for engine panels.
+    """
+    store = {
+        'dates': pd.DatetimeIndex(np.load(os.path.join(path, DATES_FILE))),
+        'tickers': np.load(os.path.join(path, TICKERS_FILE)).tolist(),
+        'bits': np.load(os.path.join(path, VALID_FILE), mmap_mode='r'),
+    }
+    for field in engine.FIELDS:
+        store[field.lower()] = np.load(os.path.join(path, f"{field.lower()}.npy"), mmap_mode='r')
+    return store
+
+
+def window(store, period, end=None):
+    """Row slice of the last `period` of the panel (ending at `end`, default its last date)."""
+    if len(store['dates']) == 0:
+        return slice(0, 0)
+    end = store['dates'][-1] if end is None else pd.Timestamp(end)
+    start = np.searchsorted(store['dates'], period_start(end, period))
+    return slice(int(start), int(np.searchsorted(store['dates'], end, side='right')))
+
+
+def columns(store, tickers):
+    """Column positions of `tickers` in panel order, plus the tickers the panel doesn't have."""
+    position = {t: j for j, t in enumerate(store['tickers'])}
+    found = sorted(position[t] for t in tickers if t in position)
+    return np.asarray(found, dtype=np.int64), [t for t in tickers if t not in position]
+
+
+def view(store, rows=slice(None), cols=slice(None)):
+    """
+    Engine panel over store[rows, cols]. With slices the price arrays are
+    views of the memory map (nothing is read until the engine touches it);
+    an index array for `cols` copies just the window. Only the window's part
+    of the validity bitmap is unpacked.
+    """
+    m = len(store['tickers'])
+    if isinstance(cols, slice):
+        c = range(m)[cols]
+        if c.step != 1:
+            raise ValueError("Column slices must be contiguous")
+        lo = c.start // 8
+        bits = store['bits'][rows, lo:(c.stop + 7) // 8]
+        valid = np.unpackbits(bits, axis=1, bitorder='little')[:, c.start - lo * 8:c.stop - lo * 8]
+        tickers = store['tickers'][cols]
+    else:
+        valid = np.unpackbits(store['bits'][rows], axis=1, count=m, bitorder='little')[:, cols]
+        tickers = [store['tickers'][j] for j in cols]
+    panel = {'dates': store['dates'][rows], 'tickers': tickers, 'valid': valid.astype(bool)}
+    for field in engine.FIELDS:
+        panel[field.lower()] = store[field.lower()][rows, cols]
+    return panel
+
+
+def batches(cols, size):
+    """Splits sorted column positions into batches, as slices where they are contiguous."""
+    for k in range(0, len(cols), size):
+        chunk = cols[k:k + size]
+        if chunk[-1] - chunk[0] + 1 == len(chunk):
+            yield slice(int(chunk[0]), int(chunk[-1]) + 1)
+        else:
+            yield chunk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped price panel")
+    parser.add_argument("--provider", choices=["yfinance", "snapshot", "synthetic"], default="yfinance")
+    parser.add_argument("--snapshot-dir", help="Directory of recorded bars (snapshot provider)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic provider")
+    parser.add_argument("--universe", action="append", help="nifty500, total_market, fno or a watchlist file (repeatable)")
+    parser.add_argument("--period", default=HISTORY_PERIOD, help="History to store, e.g. 2y, 15y")
+    parser.add_argument("--output", default=PANEL_DIR, help="Panel directory")
+    args = parser.parse_args()
+
+    if args.provider == "snapshot":
+        provider = SnapshotProvider(args.snapshot_dir)
+        universe = provider.tickers()
+    else:
+        if args.provider == "synthetic":
+            provider = SyntheticProvider(seed=args.seed, history_days=4000)
+        else:
+            provider = YFinanceProvider()
+        universe, _ = merge_universes(load_universes(args.universe or DEFAULT_UNIVERSES))
+
+    build_panel(provider, universe, args.period, args.output)
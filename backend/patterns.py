@@ -0,0 +1,87 @@
+import numpy as np
+
+# Candlestick pattern library: every bar of every ticker classified at once
+# into a uint16 bitmask, one bit per pattern. The live scan, the incremental
+# state scan, backtests and debug_scan.py all use these definitions, and rules
+# test bits ("pattern.doji", "candle.small_pattern") instead of recomputing
+# body and wick ratios.
+
+DOJI = 1 << 0
+HAMMER = 1 << 1
+SMALL = 1 << 2
+INSIDE = 1 << 3
+BULLISH_ENGULFING = 1 << 4
+BEARISH_ENGULFING = 1 << 5
+NR4 = 1 << 6
+NR7 = 1 << 7
+
+# Name -> bit, in bit order (names appear in records and as rules' "pattern.<name>")
+PATTERNS = {
+    "doji": DOJI,
+    "hammer": HAMMER,
+    "small": SMALL,
+    "inside": INSIDE,
+    "bullish_engulfing": BULLISH_ENGULFING,
+    "bearish_engulfing": BEARISH_ENGULFING,
+    "nr4": NR4,
+    "nr7": NR7,
+}
+# Candle body as a fraction of its range: at most this is a doji, below this a small candle
+DOJI_BODY_RATIO = 0.1
+SMALL_BODY_RATIO = 0.3
+# Earlier ranges needed for the widest narrow-range pattern (NR7)
+PRIOR_RANGES = 6
+
+
+def encode(bar, prev, prior_ranges):
+    """
+    Pattern bits of bars of any shape. `bar` and `prev` are (open, high, low,
+    close) arrays of each bar and the bar before it; `prior_ranges` yields
+    the high-low ranges of the PRIOR_RANGES bars before it, most recent
+    first (an iterable, so callers can produce them one at a time). Missing (NaN) inputs never set a bit.
+
+    doji / hammer / small follow check_candle_pattern and the Small Candle
+    fallback: zero-range bars are none of them. Inside: within the previous
+    bar's high-low range. Engulfing: the body engulfs the previous bar's
+    opposite-colour body. NR4 / NR7: narrower than each of the previous 3 / 6 ranges.
+    """
+    o, h, l, c = bar
+    po, ph, pl, pc = prev
+    body = np.abs(c - o)
+    total_range = h - l
+    upper_wick = h - np.maximum(o, c)
+    lower_wick = np.minimum(o, c) - l
+    bits = np.zeros(np.shape(c), dtype=np.uint16)
+
+    def set_bit(bit, condition):
+        bits[...] |= np.where(condition, bit, 0).astype(np.uint16)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_range = total_range > 0
+        set_bit(DOJI, has_range & (body <= total_range * DOJI_BODY_RATIO))
+        set_bit(HAMMER, has_range & (lower_wick > 2 * body) & (upper_wick < body))
+        set_bit(SMALL, has_range & (body / total_range < SMALL_BODY_RATIO))
+        set_bit(INSIDE, (h <= ph) & (l >= pl))
+        prev_body = np.abs(pc - po)
+        wider = body > prev_body
+        set_bit(BULLISH_ENGULFING, (c > o) & (pc < po) & (o <= pc) & (c >= po) & wider)
+        set_bit(BEARISH_ENGULFING, (c < o) & (pc > po) & (o >= pc) & (c <= po) & wider)
+        narrowest = np.full(np.shape(total_range), np.inf)
+        for k, earlier in enumerate(prior_ranges, start=1):
+            # np.minimum keeps NaN, so a missing earlier bar rules the pattern out
+            narrowest = np.minimum(narrowest, earlier)
+            if k == 3:
+                set_bit(NR4, total_range < narrowest)
+        set_bit(NR7, total_range < narrowest)
+    return bits
+
+
+def small_pattern(bits):
+    """Doji, or a small candle that isn't a hammer (the Doji_Setup candle)."""
+    bits = np.asarray(bits)
+    return ((bits & DOJI) != 0) | (((bits & SMALL) != 0) & ((bits & HAMMER) == 0))
+
+
+def names(bits):
+    """Pattern names set in one bitmask, in bit order."""
+    return [name for name, bit in PATTERNS.items() if int(bits) & bit]
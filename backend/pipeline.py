@@ -0,0 +1,208 @@
+import time
+import queue
+import random
+import threading
+import telemetry
+
+# Pipelined downloader: a pool of download threads feeds a bounded queue that
+# the scanner consumes, so indicator computation overlaps with network I/O.
+
+DOWNLOAD_WORKERS = 3
+BATCH_SIZE = 50
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 100
+# Batches waiting for the consumer before downloads pause (back-pressure)
+QUEUE_SIZE = 4
+RETRIES = 3
+BACKOFF_SECONDS = 1.0
+# Upstream request budget (token bucket)
+REQUESTS_PER_SECOND = 2.0
+REQUEST_BURST = 4
+# A batch finishing well under this grows the batch size, one over it shrinks it
+TARGET_BATCH_SECONDS = 10.0
+# How often a worker blocked on a full queue checks whether the consumer has gone
+STOP_POLL_SECONDS = 0.5
+
+_DONE = object()
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter shared by all download threads (rate=None: no limit)."""
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, capacity=REQUEST_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Downloader:
+    """
+    Downloads tickers in adaptively sized batches on `workers` threads.
+    Iterating yields (chunk, frames) as batches complete. A batch that still
+    fails after retries is split and its tickers re-queued one by one, so a
+    single bad symbol (or a throttled request) no longer loses 50 tickers.
+    Abandoning the iteration (or calling close()) stops the workers.
+    """
+
+    def __init__(self, fetch, workers=DOWNLOAD_WORKERS, batch_size=BATCH_SIZE,
+                 min_batch=MIN_BATCH_SIZE, max_batch=MAX_BATCH_SIZE, queue_size=QUEUE_SIZE,
+                 retries=RETRIES, backoff=BACKOFF_SECONDS, limiter=None):
+        self.fetch = fetch
+        self.workers = workers
+        self.batch_size = batch_size
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter or TokenBucket()
+        self.results = queue.Queue(maxsize=queue_size)
+        self.cond = threading.Condition()
+        self.pending = []
+        # Tickers re-queued from failed or partial batches, fetched one at a time
+        self.solo = []
+        self.in_flight = 0
+        self.failed = []
+        self.stop = threading.Event()
+
+    # --- Work queue ---
+    def _next_batch(self):
+        with self.cond:
+            while not self.pending and not self.solo and self.in_flight > 0 and not self.stop.is_set():
+                self.cond.wait()
+            if self.stop.is_set():
+                return None
+            if self.pending:
+                size = self.batch_size
+                chunk, self.pending = self.pending[:size], self.pending[size:]
+            elif self.solo:
+                chunk = [self.solo.pop(0)]
+            else:
+                return None
+            self.in_flight += 1
+            return chunk
+
+    def _finish_batch(self, requeue=()):
+        with self.cond:
+            self.solo.extend(requeue)
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def _resize(self, elapsed, ok):
+        with self.cond:
+            if not ok or elapsed > TARGET_BATCH_SECONDS:
+                self.batch_size = max(self.min_batch, self.batch_size // 2)
+            elif elapsed < TARGET_BATCH_SECONDS / 2:
+                self.batch_size = min(self.max_batch, int(self.batch_size * 1.5))
+
+    # --- Download ---
+    def _fetch_with_retry(self, chunk):
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                frames = self.fetch(chunk)
+                if frames or len(chunk) == 1:
+                    return frames, attempt == 0
+                raise RuntimeError("empty response")
+            except Exception as e:
+                if attempt == self.retries:
+                    print(f"Download failed for {len(chunk)} tickers after {attempt + 1} attempts: {e}")
+                    return None, False
+                telemetry.count("download_retries")
+                # Exponential backoff with jitter, cut short by close()
+                if self.stop.wait(self.backoff * (2 ** attempt) * (1 + random.random() / 2)):
+                    return None, False
+
+    def _worker(self):
+        while True:
+            chunk = self._next_batch()
+            if chunk is None:
+                return
+            requeue = ()
+            try:
+                requeue = self._download(chunk)
+            except Exception as e:
+                print(f"Warning: Download worker failed on {len(chunk)} tickers: {e}")
+                self.failed.extend(chunk)
+            finally:
+                # Always release the batch, or the other workers wait on it forever
+                self._finish_batch(requeue)
+
+    def _download(self, chunk):
+        """Fetches one batch and queues its frames. Returns the tickers to retry one by one."""
+        start = time.monotonic()
+        frames, ok = self._fetch_with_retry(chunk)
+        self._resize(time.monotonic() - start, ok)
+
+        if frames is None:
+            if len(chunk) > 1:
+                print(f"Re-queueing {len(chunk)} tickers individually.")
+                telemetry.count("download_requeued", len(chunk))
+                return chunk
+            self.failed.extend(chunk)
+            return ()
+
+        # Tickers a multi-ticker response left out get one solo attempt
+        missing = [t for t in chunk if t not in frames]
+        if len(chunk) == 1:
+            self.failed.extend(missing)
+            missing = []
+        self._put((chunk, frames))
+        return missing
+
+    def _put(self, item):
+        """Queues `item` for the consumer, giving up once the downloader is closed."""
+        while not self.stop.is_set():
+            try:
+                self.results.put(item, timeout=STOP_POLL_SECONDS)
+                return
+            except queue.Full:
+                pass
+
+    def __iter__(self):
+        # Workers record downloads and retries into the iterating scan's telemetry
+        threads = [threading.Thread(target=telemetry.bind(self._worker), daemon=True) for _ in range(self.workers)]
+
+        def supervise():
+            for thread in threads:
+                thread.join()
+            self._put(_DONE)
+
+        for thread in threads:
+            thread.start()
+        threading.Thread(target=supervise, daemon=True).start()
+        return self._results()
+
+    def _results(self):
+        try:
+            for item in iter(self.results.get, _DONE):
+                yield item
+        finally:
+            # Runs when the consumer finishes, raises or drops the iterator
+            self.close()
+
+    def close(self):
+        """Stops the workers: nothing new is fetched and blocked puts give up."""
+        self.stop.set()
+        with self.cond:
+            self.cond.notify_all()
+
+    def run(self, tickers):
+        with self.cond:
+            self.pending = list(tickers)
+        return iter(self)
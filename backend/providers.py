@@ -0,0 +1,222 @@
+import os
+import re
+import zlib
+import datetime
+import numpy as np
+import pandas as pd
+
+# Market-data providers. Every provider returns {ticker: DataFrame} with a
+# DatetimeIndex and Open/High/Low/Close/Volume columns, and exposes now()
+# so a scan's timestamp comes from the data source rather than the wall clock.
+
+# Sessions a replay plays back when no start date is given
+REPLAY_SESSIONS = 20
+
+
+def period_start(end, period):
+    """Start date for a yfinance-style period ("5d", "6mo", "2y") ending at `end`."""
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    offset = {
+        'd': pd.DateOffset(days=n),
+        'wk': pd.DateOffset(weeks=n),
+        'mo': pd.DateOffset(months=n),
+        'y': pd.DateOffset(years=n),
+    }[unit]
+    return pd.Timestamp(end).normalize() - offset
+
+
+def _slice(df, start=None, end=None):
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df.index <= pd.Timestamp(end)]
+    return df
+
+
+def split_download(data, tickers):
+    """
+    Splits a yfinance download into {ticker: DataFrame}.
+    Tickers missing from the response are left out.
+    """
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    for ticker in tickers:
+        if len(tickers) == 1:
+            # Single ticker dataframe (columns may still carry the ticker level)
+            df = data.copy()
+            if isinstance(df.columns, pd.MultiIndex):
+                if ticker not in df.columns.get_level_values(0):
+                    continue
+                df = df[ticker].copy()
+        else:
+            if not isinstance(data.columns, pd.MultiIndex) or ticker not in data.columns.levels[0]:
+                continue
+            df = data[ticker].copy()
+
+        if df.dropna(how='all').empty:
+            continue
+        frames[ticker] = df
+    return frames
+
+
+class YFinanceProvider:
+    """Live daily bars from Yahoo Finance."""
+    name = "yfinance"
+    # Live data goes through the local bar store
+    cacheable = True
+
+    def fetch(self, tickers, start=None, period=None):
+        import yfinance as yf
+        kwargs = {'start': start} if start is not None else {'period': period or "6mo"}
+        data = yf.download(tickers, interval="1d", group_by='ticker', threads=True, **kwargs)
+        return split_download(data, tickers)
+
+    def now(self):
+        return datetime.datetime.now()
+
+
+class SnapshotProvider:
+    """
+    Replays recorded bars from a directory of <ticker>.parquet or
+    <ticker>.csv files (see record()). Fully offline and deterministic.
+    """
+    name = "snapshot"
+    cacheable = False
+
+    def __init__(self, path, as_of=None):
+        self.path = path
+        self.as_of = pd.Timestamp(as_of) if as_of is not None else None
+        self._frames = {}
+
+    def tickers(self):
+        names = [os.path.splitext(f) for f in sorted(os.listdir(self.path))]
+        return [stem for stem, ext in names if ext in (".parquet", ".csv")]
+
+    def _load(self, ticker):
+        if ticker not in self._frames:
+            df = None
+            parquet = os.path.join(self.path, f"{ticker}.parquet")
+            csv = os.path.join(self.path, f"{ticker}.csv")
+            if os.path.exists(parquet):
+                df = pd.read_parquet(parquet)
+            elif os.path.exists(csv):
+                df = pd.read_csv(csv, index_col=0, parse_dates=True)
+            if df is not None:
+                df = _slice(df.sort_index(), end=self.as_of)
+            self._frames[ticker] = df
+        return self._frames[ticker]
+
+    def fetch(self, tickers, start=None, period=None):
+        if start is None:
+            start = period_start(self.now(), period or "6mo")
+        frames = {}
+        for ticker in tickers:
+            df = self._load(ticker)
+            if df is None:
+                continue
+            df = _slice(df, start=start)
+            if not df.empty:
+                frames[ticker] = df.copy()
+        return frames
+
+    def now(self):
+        if self.as_of is not None:
+            return self.as_of.to_pydatetime()
+        # Latest bar in the snapshot
+        last = [df.index[-1] for df in (self._load(t) for t in self.tickers()) if df is not None and not df.empty]
+        return max(last).to_pydatetime() if last else datetime.datetime(1970, 1, 1)
+
+
+class ReplayProvider(SnapshotProvider):
+    """
+    Plays a snapshot back one session at a time, as a stand-in for a live
+    feed: fetch() and now() only see bars up to the replay clock, and
+    advance() moves the clock to the next recorded session.
+    """
+    name = "replay"
+
+    def __init__(self, path, start=None, sessions=REPLAY_SESSIONS):
+        super().__init__(path)
+        dates = sorted(set().union(*(df.index for df in (self._load(t) for t in self.tickers()) if df is not None)))
+        self.dates = pd.DatetimeIndex(dates)
+        if start is not None:
+            self.position = max(0, int(self.dates.searchsorted(pd.Timestamp(start), side='right')) - 1)
+        else:
+            self.position = max(0, len(self.dates) - sessions - 1)
+
+    def advance(self):
+        """Reveals the next session; False once the recording is exhausted."""
+        if self.position + 1 >= len(self.dates):
+            return False
+        self.position += 1
+        return True
+
+    def fetch(self, tickers, start=None, period=None):
+        clock = self.dates[self.position]
+        return {t: df for t, df in ((t, _slice(df, end=clock)) for t, df in super().fetch(tickers, start, period).items())
+                if not df.empty}
+
+    def now(self):
+        return self.dates[self.position].to_pydatetime()
+
+
+class SyntheticProvider:
+    """
+    Deterministic random-walk bars. The same (seed, ticker, end) always
+    yields the same series, whatever else is requested alongside it.
+    """
+    name = "synthetic"
+    cacheable = False
+
+    def __init__(self, seed=0, end="2024-06-28", history_days=800):
+        self.seed = seed
+        self.end = pd.Timestamp(end)
+        self.dates = pd.bdate_range(end=self.end, periods=history_days)
+
+    def bars(self, ticker):
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+        n = len(self.dates)
+        base = rng.uniform(50, 5000)
+        close = base * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+        open_p = close * (1 + rng.normal(0, 0.005, n))
+        high = np.maximum(open_p, close) * (1 + np.abs(rng.normal(0, 0.006, n)))
+        low = np.minimum(open_p, close) * (1 - np.abs(rng.normal(0, 0.006, n)))
+        volume = rng.integers(10_000, 5_000_000, n).astype(np.float64)
+        return pd.DataFrame({
+            'Open': open_p, 'High': high, 'Low': low, 'Close': close, 'Volume': volume
+        }, index=self.dates)
+
+    def fetch(self, tickers, start=None, period=None):
+        if start is None:
+            start = period_start(self.end, period or "6mo")
+        return {t: _slice(self.bars(t), start=start) for t in tickers}
+
+    def now(self):
+        return self.end.to_pydatetime()
+
+
+def get_provider(name, **kwargs):
+    providers = {
+        "yfinance": YFinanceProvider,
+        "snapshot": SnapshotProvider,
+        "replay": ReplayProvider,
+        "synthetic": SyntheticProvider,
+    }
+    if name not in providers:
+        raise ValueError(f"Unknown provider: {name}")
+    return providers[name](**kwargs)
+
+
+def record(provider, tickers, path, period="6mo"):
+    """Writes the provider's bars to `path` as a snapshot SnapshotProvider can replay."""
+    os.makedirs(path, exist_ok=True)
+    frames = provider.fetch(tickers, period=period)
+    for ticker, df in frames.items():
+        df.to_parquet(os.path.join(path, f"{ticker}.parquet"))
+    print(f"Recorded {len(frames)} tickers to {path}")
+    return len(frames)
@@ -0,0 +1,298 @@
+import os
+import gzip
+import json
+import math
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qsl, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local query API over the latest scan results. The scan's data.json is held
+# in memory, indexed by strategy and ticker, and reloaded whenever the file
+# changes. Clients ask for the rows they display (filtered, sorted, a page
+# at a time) instead of downloading every record:
+#
+#   GET /summary                     last_updated, total_scanned, hits per strategy
+#   GET /stocks?strategy=Doji_Setup&min_score=5&sort=-score&limit=20&offset=40
+#   GET /stocks/RELIANCE             one record
+#
+# Responses carry an ETag derived from the scan and the query, so a repeated
+# request with If-None-Match costs a 304, and are gzipped when accepted.
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend", "public", "data.json")
+HOST = "127.0.0.1"
+PORT = 8766
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+# Smaller bodies are sent uncompressed
+GZIP_MIN_BYTES = 1024
+# Encoded responses kept per scan (cleared when a new scan is loaded)
+RESPONSE_CACHE = 256
+
+# Query field -> path into a record; numeric fields accept min_<field> / max_<field>
+FIELDS = {
+    "ticker": ("ticker",),
+    "price": ("price",),
+    "range_pct": ("range_pct",),
+    "cpr_width": ("daily", "cpr_width"),
+    "cam_center": ("daily", "cam_center"),
+    "daily_pivot": ("daily", "pivot"),
+    "monthly_pivot": ("monthly", "pivot"),
+    "score": ("confluence", "score"),
+    "nearest_pct": ("confluence", "nearest_pct"),
+}
+# Comma-separated / repeatable list filters: record matches if it has any of the values
+LIST_FILTERS = {"strategy": "strategies", "universe": "universes", "pattern": "patterns"}
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _field(record, path):
+    value = record
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def _symbol(ticker):
+    return ticker.strip().upper().replace(".NS", "")
+
+
+def _values(params, name):
+    return [v.strip() for value in params.get(name, []) for v in value.split(",") if v.strip()]
+
+
+def _number(params, name):
+    try:
+        value = float(params[name][-1])
+    except ValueError:
+        value = math.nan
+    # nan / inf (and overflows like 1e400) would fail later, outside the 400 path
+    if not math.isfinite(value):
+        raise QueryError(f"{name} must be a number")
+    return value
+
+
+class ResultIndex:
+    """One scan's records indexed by strategy and ticker."""
+
+    def __init__(self, result, version):
+        self.version = version
+        self.last_updated = result.get("last_updated")
+        self.total_scanned = result.get("total_scanned", 0)
+        # data.json is already ranked by confluence; positions keep that order
+        self.stocks = result.get("stocks", [])
+        self.by_ticker = {s["ticker"]: k for k, s in enumerate(self.stocks)}
+        self.by_strategy = {}
+        for k, s in enumerate(self.stocks):
+            for strategy in s.get("strategies", []):
+                self.by_strategy.setdefault(strategy, []).append(k)
+
+    def summary(self):
+        return {
+            "last_updated": self.last_updated,
+            "total_scanned": self.total_scanned,
+            "total": len(self.stocks),
+            "strategies": {name: len(rows) for name, rows in self.by_strategy.items()},
+        }
+
+    def stock(self, ticker):
+        k = self.by_ticker.get(_symbol(ticker))
+        return None if k is None else self.stocks[k]
+
+    def query(self, params):
+        """
+        Records matching `params` ({name: [values]} as from parse_qs):
+        strategy / universe / pattern / ticker lists, min_<field> / max_<field>,
+        sort=[-]<field> and limit / offset. Returns one page plus the total.
+        """
+        unknown = [p for p in params if p not in ("sort", "limit", "offset", "ticker", *LIST_FILTERS)
+                   and not (p[:4] in ("min_", "max_") and p[4:] in FIELDS and p[4:] != "ticker")]
+        if unknown:
+            raise QueryError(f"Unknown parameter: {unknown[0]}")
+
+        # Index lookups narrow the candidates before any record is read
+        strategies = _values(params, "strategy")
+        if strategies:
+            rows = sorted({k for name in strategies for k in self.by_strategy.get(name, [])})
+        else:
+            rows = range(len(self.stocks))
+        tickers = _values(params, "ticker")
+        if tickers:
+            wanted = {self.by_ticker.get(_symbol(t)) for t in tickers}
+            rows = [k for k in rows if k in wanted]
+        stocks = [self.stocks[k] for k in rows]
+
+        for name, key in LIST_FILTERS.items():
+            wanted = set(_values(params, name))
+            if wanted and name != "strategy":
+                stocks = [s for s in stocks if wanted.intersection(s.get(key) or [])]
+        for name in params:
+            if name[:4] in ("min_", "max_"):
+                bound, path = _number(params, name), FIELDS[name[4:]]
+                keep = (lambda v: v >= bound) if name.startswith("min_") else (lambda v: v <= bound)
+                stocks = [s for s in stocks if _field(s, path) is not None and keep(_field(s, path))]
+
+        if "sort" in params:
+            sort = params["sort"][-1]
+            descending = sort.startswith("-")
+            path = FIELDS.get(sort.lstrip("-"))
+            if path is None:
+                raise QueryError(f"Cannot sort by {sort.lstrip('-')}")
+            # Records without the field go last either way
+            present = [s for s in stocks if _field(s, path) is not None]
+            missing = [s for s in stocks if _field(s, path) is None]
+            stocks = sorted(present, key=lambda s: _field(s, path), reverse=descending) + missing
+
+        limit = int(_number(params, "limit")) if "limit" in params else DEFAULT_LIMIT
+        offset = int(_number(params, "offset")) if "offset" in params else 0
+        if not 0 < limit <= MAX_LIMIT or offset < 0:
+            raise QueryError(f"limit must be 1-{MAX_LIMIT} and offset >= 0")
+        page = stocks[offset:offset + limit]
+        return {
+            "last_updated": self.last_updated,
+            "total": len(stocks),
+            "offset": offset,
+            "limit": limit,
+            "next": offset + limit if offset + limit < len(stocks) else None,
+            "stocks": page,
+        }
+
+
+class ResultStore:
+    """The latest ResultIndex for `path`, reloaded when the file changes, plus encoded responses."""
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.index = None
+        self.signature = None
+        self.responses = {}
+
+    def current(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return self.index
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self.signature:
+            with self.lock:
+                if signature != self.signature:
+                    self._load(signature)
+        return self.index
+
+    def _load(self, signature):
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            self.index = ResultIndex(json.loads(data), hashlib.sha256(data).hexdigest()[:16])
+            self.responses = {}
+            print(f"Loaded {len(self.index.stocks)} records ({self.index.last_updated}) from {self.path}")
+        except Exception as e:
+            # Keep serving the previous scan (e.g. data.json caught mid-write)
+            print(f"Warning: Could not load {self.path}: {e}")
+        self.signature = signature
+
+    def response(self, index, key, build):
+        """(etag, body, gzipped body or None) for `key`, built once per scan."""
+        cached = self.responses.get((index.version, key))
+        if cached is None:
+            body = json.dumps(build(), separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            gz = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+            etag = f'"{index.version}-{hashlib.sha256(repr(key).encode()).hexdigest()[:12]}"'
+            cached = (etag, body, gz)
+            with self.lock:
+                if len(self.responses) >= RESPONSE_CACHE:
+                    self.responses.clear()
+                self.responses[(index.version, key)] = cached
+        return cached
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body=b"", etag=None, gz=None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Expose-Headers", "ETag")
+            self.send_header("Vary", "Accept-Encoding")
+            if etag:
+                self.send_header("ETag", etag)
+            if gz is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gz
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _error(self, status, message):
+            self._send(status, json.dumps({"error": message}).encode('utf-8'))
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            index = store.current()
+            if index is None:
+                return self._error(503, "No scan results yet")
+            params = {}
+            for name, value in parse_qsl(url.query):
+                params.setdefault(name, []).append(value)
+            # The response depends only on the scan, the path and the (order-insensitive) query
+            key = (url.path.rstrip("/"), tuple(sorted((k, tuple(v)) for k, v in params.items())))
+
+            if key[0] == "/summary":
+                build = index.summary
+            elif key[0] == "/stocks":
+                build = lambda: index.query(params)
+            elif key[0].startswith("/stocks/"):
+                record = index.stock(unquote(key[0][len("/stocks/"):]))
+                if record is None:
+                    return self._error(404, "Ticker not in the latest scan")
+                build = lambda: record
+            else:
+                return self._error(404, "Not found")
+
+            try:
+                # Invalid queries raise before anything is cached, so they never get a 304
+                etag, body, gz = store.response(index, key, build)
+            except QueryError as e:
+                return self._error(400, str(e))
+            if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                return self._send(304, etag=etag)
+            self._send(200, body, etag, gz)
+
+        do_HEAD = do_GET
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(store, host=HOST, port=PORT):
+    """Starts the query server on a background thread and returns it."""
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving scan results on http://{host}:{server.server_address[1]}/stocks")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query API over the latest scan results")
+    parser.add_argument("--data", default=DATA_FILE, help="Scan result file (scan.py's data.json)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    store = ResultStore(args.data)
+    store.current()
+    serve(store, args.host, args.port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("Stopped.")
@@ -0,0 +1,357 @@
+import re
+import json
+import threading
+from collections.abc import Mapping
+import numpy as np
+import confluence
+import patterns
+
+# Declarative strategy rules compiled to vectorized predicates.
+#
+# A strategy is a named list of predicates over named features such as
+# "cpr_monthly.tc", "ema8", "range_pct" or "candle.body_ratio". All strategies
+# are evaluated together: every feature is computed lazily and at most once per
+# ticker, identical predicates are shared between strategies, and each
+# strategy runs its cheapest / most selective predicates first so later
+# predicates only see the tickers that survived.
+
+OPS = {
+    '<': np.less, '<=': np.less_equal,
+    '>': np.greater, '>=': np.greater_equal,
+    '==': np.equal, '!=': np.not_equal,
+}
+# Distance returned for a level that is zero or negative (matches the scanner's EMA check)
+FAR_PCT = 999
+# Doji_Setup thresholds (sweep.py evaluates grids of them)
+DOJI_RANGE_PCT = 1.5
+DOJI_CPR_PCT = 4.0
+DOJI_EMA_PCT = 1.0
+# Candle body as a fraction of its range: at most this is a doji, below this a small candle
+DOJI_BODY_RATIO = patterns.DOJI_BODY_RATIO
+SMALL_BODY_RATIO = patterns.SMALL_BODY_RATIO
+# Assumed pass rate for a predicate that hasn't been evaluated yet
+DEFAULT_PASS_RATE = 0.5
+
+# Observed pass rates, shared by every evaluation in this process (scans on
+# several threads update them under the lock)
+_pass_rates = {}
+_pass_rates_lock = threading.Lock()
+
+
+# --- Derived features ---
+
+def _small_pattern(fs, rows):
+    return patterns.small_pattern(fs.get('candle.patterns', rows))
+
+
+def _pattern(bit):
+    def compute(fs, rows):
+        return (fs.get('candle.patterns', rows) & bit) != 0
+    return compute
+
+
+def _distance(level):
+    def compute(fs, rows):
+        price, value = fs.get('price', rows), fs.get(level, rows)
+        return np.where(value > 0, np.abs(price - value) / value * 100, FAR_PCT)
+    return compute
+
+
+def _touch(level):
+    def compute(fs, rows):
+        value = fs.get(level, rows)
+        return (fs.get('low', rows) <= value) & (value <= fs.get('high', rows))
+    return compute
+
+
+def _confluence(field):
+    def compute(fs, rows):
+        levels = np.stack([fs.get(name, rows) for name in confluence.LEVEL_NAMES], axis=1)
+        return confluence.confluence(fs.get('price', rows), levels)[confluence.FIELDS.index(field)]
+    return compute
+
+
+DERIVED = {
+    'candle.small_pattern': _small_pattern,
+    'candle.is_doji': _pattern(patterns.DOJI),
+    'candle.is_hammer': _pattern(patterns.HAMMER),
+    **{f'pattern.{name}': _pattern(bit) for name, bit in patterns.PATTERNS.items()},
+    **{f'confluence.{field}': _confluence(field) for field in confluence.FIELDS},
+}
+
+
+def derived(name):
+    """
+    Function computing a derived feature, or None. "pattern.<name>" tests a
+    patterns.PATTERNS bit of the candle, "dist.<feature>" is the %
+    distance of price from a level, "touch.<feature>" whether the bar's
+    high-low range contains it, "confluence.count" the number of pivot
+    levels / EMAs within confluence.CONFLUENCE_PCT of the price.
+    """
+    if name in DERIVED:
+        return DERIVED[name]
+    if name.startswith("dist."):
+        return _distance(name[len("dist."):])
+    if name.startswith("touch."):
+        return _touch(name[len("touch."):])
+    return None
+
+
+class FeatureSet:
+    """
+    Named features over a fixed set of rows (tickers, or ticker-bars for 2D
+    history). Base features come from the engine and are only read (so, with
+    engine.LazyFeatures, only computed) when a predicate asks for them;
+    derived ones are computed on demand, only for the rows asked for, and
+    never twice for the same row.
+    """
+
+    def __init__(self, features):
+        self.features = features
+        self.shape = np.shape(features['price'])
+        self.size = int(np.prod(self.shape))
+        self.base = {}
+        self.cache = {}
+
+    def _base(self, name):
+        """Engine feature `name` ("group" or "group.key"), flattened; None if there is none."""
+        if name not in self.base:
+            value = self.features
+            for key in name.split("."):
+                if not isinstance(value, Mapping) or key not in value:
+                    return None
+                value = value[key]
+            if isinstance(value, Mapping):
+                return None
+            self.base[name] = np.ravel(value)
+        return self.base[name]
+
+    def get(self, name, rows):
+        base = self._base(name)
+        if base is not None:
+            return base[rows]
+        compute = derived(name)
+        if compute is None:
+            raise KeyError(f"Unknown feature: {name}")
+        if name not in self.cache:
+            self.cache[name] = (None, np.zeros(self.size, dtype=bool))
+        values, done = self.cache[name]
+        missing = rows[~done[rows]]
+        if len(missing):
+            computed = np.asarray(compute(self, missing))
+            if values is None:
+                values = np.zeros(self.size, dtype=computed.dtype)
+            values[missing] = computed
+            done[missing] = True
+            self.cache[name] = (values, done)
+        return values[rows]
+
+    def cost(self, name):
+        """0 for features that are already available, 1 for ones still to read or compute."""
+        if name in self.base:
+            return 0
+        cached = self.cache.get(name)
+        return 0 if cached is not None and cached[1].all() else 1
+
+
+# --- Predicates ---
+
+class Predicate:
+    key = ""
+    deps = ()
+
+    def evaluate(self, fs, rows):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return self.key
+
+
+class Compare(Predicate):
+    """feature <op> number, or feature <op> feature."""
+
+    def __init__(self, left, op, right):
+        if op not in OPS:
+            raise ValueError(f"Unknown operator: {op}")
+        self.left, self.op, self.right = left, op, right
+        self.key = f"{left} {op} {right}"
+        self.deps = (left,) if not isinstance(right, str) else (left, right)
+
+    def evaluate(self, fs, rows):
+        right = fs.get(self.right, rows) if isinstance(self.right, str) else self.right
+        with np.errstate(invalid='ignore'):
+            return OPS[self.op](fs.get(self.left, rows), right)
+
+
+class Flag(Predicate):
+    """Boolean feature is true."""
+
+    def __init__(self, feature):
+        self.feature = feature
+        self.key = feature
+        self.deps = (feature,)
+
+    def evaluate(self, fs, rows):
+        return fs.get(self.feature, rows).astype(bool)
+
+
+class Near(Predicate):
+    """Feature within `pct` percent of any of `levels`."""
+
+    def __init__(self, feature, levels, pct):
+        self.feature, self.levels, self.pct = feature, list(levels), float(pct)
+        self.key = f"near({feature}, [{', '.join(self.levels)}], {self.pct})"
+        self.deps = (feature, *self.levels)
+
+    def evaluate(self, fs, rows):
+        value = fs.get(self.feature, rows)
+        out = np.zeros(len(rows), dtype=bool)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for level in self.levels:
+                target = fs.get(level, rows)
+                out |= (np.abs(value - target) / target * 100) < self.pct
+        return out
+
+
+class AnyOf(Predicate):
+    """True if any of the nested predicates is."""
+
+    def __init__(self, *predicates):
+        self.predicates = [parse_predicate(p) for p in predicates]
+        self.key = f"any({', '.join(p.key for p in self.predicates)})"
+        self.deps = tuple(d for p in self.predicates for d in p.deps)
+
+    def evaluate(self, fs, rows):
+        out = np.zeros(len(rows), dtype=bool)
+        for p in self.predicates:
+            remaining = ~out
+            if not remaining.any():
+                break
+            out[remaining] = p.evaluate(fs, rows[remaining])
+        return out
+
+
+_COMPARE = re.compile(r"^\s*([\w.]+)\s*(<=|>=|==|!=|<|>)\s*([\w.+-]+)\s*$")
+
+
+def _number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_predicate(spec):
+    """Accepts a Predicate, "feature <op> value", a bare boolean feature name, or a dict (near / any)."""
+    if isinstance(spec, Predicate):
+        return spec
+    if isinstance(spec, str):
+        match = _COMPARE.match(spec)
+        if match:
+            left, op, right = match.groups()
+            number = _number(right)
+            return Compare(left, op, number if number is not None else right)
+        return Flag(spec.strip())
+    if isinstance(spec, dict):
+        if "near" in spec:
+            near = spec["near"]
+            return Near(near.get("feature", "price"), near["levels"], near["pct"])
+        if "any" in spec:
+            return AnyOf(*spec["any"])
+    raise ValueError(f"Cannot parse predicate: {spec!r}")
+
+
+class Strategy:
+    def __init__(self, name, *predicates):
+        self.name = name
+        self.predicates = [parse_predicate(p) for p in predicates]
+
+    def __repr__(self):
+        return f"Strategy({self.name!r}, {self.predicates})"
+
+
+def parse_strategies(config):
+    """{"strategies": [{"name": ..., "all": [...]}, ...]} -> [Strategy]."""
+    return [Strategy(s["name"], *s["all"]) for s in config["strategies"]]
+
+
+def load_strategies(path):
+    """Loads strategies from a .json or .yaml/.yml file (YAML needs PyYAML)."""
+    with open(path, 'r') as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Loading YAML strategies requires PyYAML (pip install pyyaml)")
+            config = yaml.safe_load(f)
+        else:
+            config = json.load(f)
+    return parse_strategies(config)
+
+
+DEFAULT_STRATEGIES = [
+    # Doji + Near Monthly CPR (TC/PP/BC) + Near 8/20 EMA + Low range
+    Strategy(
+        "Doji_Setup",
+        "eligible",
+        f"range_pct < {DOJI_RANGE_PCT}",
+        "candle.small_pattern",
+        Near("price", ["cpr_monthly.pivot", "cpr_monthly.tc", "cpr_monthly.bc"], DOJI_CPR_PCT),
+        AnyOf(f"dist.ema8 < {DOJI_EMA_PCT}", f"dist.ema20 < {DOJI_EMA_PCT}"),
+    ),
+    # Monthly Inside Camarilla: curr H3/L3 and H4/L4 inside prev
+    Strategy(
+        "Inside_Camarilla",
+        "eligible",
+        "cam_monthly.h3 <= cam_monthly_prev.h3",
+        "cam_monthly.l3 >= cam_monthly_prev.l3",
+        "cam_monthly.h4 <= cam_monthly_prev.h4",
+        "cam_monthly.l4 >= cam_monthly_prev.l4",
+    ),
+]
+
+
+class Evaluator:
+    """Evaluates many strategies over one FeatureSet, sharing features and predicate results."""
+
+    def __init__(self, features):
+        self.fs = FeatureSet(features)
+        self.results = {}
+
+    def _rank(self, predicate):
+        # Cheapest, most selective first: cost / (1 - pass rate)
+        if predicate.key in self.results and self.results[predicate.key][1].all():
+            return 0.0
+        cost = 1 + sum(self.fs.cost(d) for d in predicate.deps)
+        pass_rate = _pass_rates.get(predicate.key, DEFAULT_PASS_RATE)
+        return cost / max(1e-6, 1 - pass_rate)
+
+    def _evaluate(self, predicate, rows):
+        if predicate.key not in self.results:
+            self.results[predicate.key] = (np.zeros(self.fs.size, dtype=bool), np.zeros(self.fs.size, dtype=bool))
+        values, done = self.results[predicate.key]
+        missing = rows[~done[rows]]
+        if len(missing):
+            values[missing] = predicate.evaluate(self.fs, missing)
+            done[missing] = True
+            rate = values[missing].mean()
+            with _pass_rates_lock:
+                previous = _pass_rates.get(predicate.key, rate)
+                _pass_rates[predicate.key] = 0.8 * previous + 0.2 * rate
+        return values[rows]
+
+    def strategy(self, strategy):
+        alive = np.arange(self.fs.size)
+        for predicate in sorted(strategy.predicates, key=self._rank):
+            alive = alive[self._evaluate(predicate, alive)]
+            if len(alive) == 0:
+                break
+        mask = np.zeros(self.fs.size, dtype=bool)
+        mask[alive] = True
+        return mask.reshape(self.fs.shape)
+
+
+def evaluate(features, strategies=None):
+    """{strategy name: boolean mask} for features of any shape (1D latest or 2D history)."""
+    evaluator = Evaluator(features)
+    return {s.name: evaluator.strategy(s) for s in strategies or DEFAULT_STRATEGIES}
@@ -1,259 +1,333 @@
-import yfinance as yf
-import pandas as pd
-import pandas_ta as ta
 import json
 import os
-import datetime
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from tickers import get_nifty500_tickers
+import pandas as pd
+from universes import load_universes, merge_universes, shard, DEFAULT_UNIVERSES
+import bar_store
+import engine
+import history_store
+import indicator_state
+import panel_store
+import telemetry
+from rules import load_strategies, DEFAULT_STRATEGIES
+from output_writer import write_outputs
+from pipeline import Downloader, TokenBucket, BATCH_SIZE, DOWNLOAD_WORKERS, REQUESTS_PER_SECOND
+from providers import YFinanceProvider, SnapshotProvider, SyntheticProvider, record
+from engine import calculate_cpr_value, calculate_camarilla_value
 
 # Configuration
-OUTPUT_FILE = "../frontend/public/data.json"
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend", "public")
+OUTPUT_FILE = os.path.join(PUBLIC_DIR, "data.json")
+# Manifest + per-strategy shards loaded by the React frontend
+OUTPUT_DIR = os.path.join(PUBLIC_DIR, "scan")
 DAYS_BACK = 60
-CAMARILLA_DOJI_THRESHOLD = 0.05
-CPR_WIDTH_THRESHOLD = 0.5
 
-def calculate_cpr_value(high, low, close):
-    pivot = (high + low + close) / 3
-    bc = (high + low) / 2
-    tc = (pivot - bc) + pivot
-    return {
-        'pivot': round(pivot, 2),
-        'bc': round(bc, 2),
-        'tc': round(tc, 2),
-        'width_pct': round(abs(tc - bc) / pivot * 100, 2)
-    }
+@telemetry.timed("download")
+def load_bars(chunk, provider):
+    # Live providers go through the local bar store; replay/synthetic data is read as-is
+    if provider.cacheable:
+        return bar_store.get_bars(chunk, provider)
+    return provider.fetch(chunk, period=bar_store.HISTORY_PERIOD)
 
-def calculate_camarilla_value(high, low, close):
-    r = high - low
-    h3 = close + (r * 1.1) / 4
-    l3 = close - (r * 1.1) / 4
-    h4 = close + (r * 1.1) / 2
-    l4 = close - (r * 1.1) / 2
-    # Pine Script: center = sclose
-    pp = close 
-    return {
-        'h3': round(h3, 2),
-        'l3': round(l3, 2),
-        'h4': round(h4, 2),
-        'l4': round(l4, 2),
-        'center': round(pp, 2)
-    }
+def scan_shard(provider, tickers, workers=DOWNLOAD_WORKERS, rate=REQUESTS_PER_SECOND, on_batch=None,
+               strategies=None, panel_dir=None):
+    """
+    Downloads and scans one shard of the universe. Runs in a worker process,
+    so it returns compact arrays instead of DataFrames or records:
+    (hits, flags, values, failed, state, session, report) with hits indexing
+    into `tickers`, `state` the updated indicator-state rows (None for
+    offline providers), `session` the date of the latest bar scanned
+    (YYYY-MM-DD, None if none) and `report` the shard's telemetry report.
+    on_batch(done, total, hit_tickers, flags, values) is called after each batch.
+    With panel_dir, bars come from that memory-mapped panel instead of the provider.
+    """
+    with telemetry.recording() as recorder, telemetry.profile():
+        if panel_dir:
+            result = _scan_panel_shard(panel_dir, tickers, on_batch, strategies)
+        else:
+            result = _scan_shard(provider, tickers, workers, rate, on_batch, strategies)
+    return result + (recorder.report(),)
+
+def _last_day(dates, session=None):
+    """The later of `session` and the last of `dates`, as YYYY-MM-DD."""
+    if len(dates) == 0:
+        return session
+    return max(session or "", pd.Timestamp(max(dates)).strftime("%Y-%m-%d"))
 
-def check_candle_pattern(open_p, high_p, low_p, close_p):
-    body = abs(close_p - open_p)
-    total_range = high_p - low_p
-    if total_range == 0: return False, "None"
+def _scan_panel_shard(panel_dir, tickers, on_batch, strategies):
+    # Every process maps the same files, so shards share one copy in the page cache
+    store = panel_store.load_panel(panel_dir)
+    rows = panel_store.window(store, bar_store.HISTORY_PERIOD)
+    cols, missing = panel_store.columns(store, tickers)
+    order = {t: k for k, t in enumerate(tickers)}
+    hits, flags, values = [], [], []
+    done = 0
+    session = None
     
-    is_doji = body <= (total_range * 0.1)
-    upper_wick = high_p - max(open_p, close_p)
-    lower_wick = min(open_p, close_p) - low_p
-    is_hammer = (lower_wick > 2 * body) and (upper_wick < body)
+    for batch in panel_store.batches(cols, BATCH_SIZE):
+        start = time.perf_counter()
+        with telemetry.stage("clean"):
+            panel = panel_store.view(store, rows, batch)
+            for ticker, reason in zip(panel['tickers'], engine.skip_reasons(panel)):
+                telemetry.skip(reason, [ticker])
+            session = _last_day(panel['dates'][panel['valid'].any(axis=1)], session)
+        done += len(panel['tickers'])
+        print(f"Processing batch of {len(panel['tickers'])} ({done}/{len(cols)})...")
+        batch_tickers, batch_hits, batch_flags, batch_values = engine.scan_panel(panel, strategies)
+        hits.extend(order[batch_tickers[j]] for j in batch_hits)
+        flags.append(batch_flags)
+        values.append(batch_values)
+        telemetry.count("tickers_scanned", len(batch_tickers))
+        recorder = telemetry.current()
+        if recorder is not None:
+            recorder.batch(len(batch_tickers), time.perf_counter() - start, len(batch_hits))
+        if on_batch is not None:
+            on_batch(done, len(cols), [batch_tickers[j] for j in batch_hits], batch_flags, batch_values)
     
-    if is_doji: return True, "Doji"
-    if is_hammer: return True, "Hammer"
-    return False, "None"
+    hits = np.asarray(hits, dtype=np.int32)
+    flags = np.concatenate(flags) if flags else np.empty(0, dtype=np.uint32)
+    values = np.concatenate(values) if values else np.empty((0, len(engine.RECORD_FIELDS)))
+    telemetry.skip("not_in_panel", missing)
+    return hits, flags, values, missing, None, session
+
+def _scan_shard(provider, tickers, workers, rate, on_batch, strategies):
+    # Live data advances the persisted indicator state; replays are always computed from scratch
+    state = indicator_state.load_state() if provider.cacheable else None
+    committed = []
+    # Downloads run on background threads while finished batches are scanned here
+    downloader = Downloader(lambda chunk: load_bars(chunk, provider), workers=workers,
+                            limiter=TokenBucket(rate=rate))
+    order = {t: k for k, t in enumerate(tickers)}
+    hits, flags, values = [], [], []
+    # Tickers a partial response left out come back in a solo batch; count each once
+    completed = set()
+    session = None
+    
+    try:
+        for chunk, frames in downloader.run(tickers):
+            start = time.perf_counter()
+            completed.update(chunk)
+            done = len(completed)
+            print(f"Processing batch of {len(chunk)} ({done}/{len(tickers)})...")
+            with telemetry.stage("clean"):
+                # One aligned panel per batch: eligibility is checked for all its tickers at once
+                panel = engine.align(frames, chunk)
+                for ticker, reason in zip(panel['tickers'], engine.skip_reasons(panel)):
+                    telemetry.skip(reason, [ticker])
+                telemetry.skip("no_bars", [t for t in chunk if t in frames and frames[t].empty])
+                session = _last_day(panel['dates'][panel['valid'].any(axis=1)], session)
+            # Indicators and strategies for the whole batch at once
+            if state is not None:
+                batch_tickers, batch_hits, batch_flags, batch_values, batch_state = \
+                    indicator_state.scan_frames(frames, chunk, state, strategies)
+                committed.append(batch_state)
+            else:
+                batch_tickers, batch_hits, batch_flags, batch_values = engine.scan_panel(panel, strategies)
+            hits.extend(order[batch_tickers[j]] for j in batch_hits)
+            flags.append(batch_flags)
+            values.append(batch_values)
+            telemetry.count("tickers_scanned", len(batch_tickers))
+            recorder = telemetry.current()
+            if recorder is not None:
+                recorder.batch(len(chunk), time.perf_counter() - start, len(batch_hits))
+            if on_batch is not None:
+                on_batch(done, len(tickers), [batch_tickers[j] for j in batch_hits], batch_flags, batch_values)
+    finally:
+        # Stops the download threads if a batch raised mid-scan
+        downloader.close()
+    
+    hits = np.asarray(hits, dtype=np.int32)
+    flags = np.concatenate(flags) if flags else np.empty(0, dtype=np.uint32)
+    values = np.concatenate(values) if values else np.empty((0, len(engine.RECORD_FIELDS)))
+    if state is not None:
+        state = indicator_state.concat(*committed) if committed else indicator_state.empty_state()
+    telemetry.skip("download_failed", downloader.failed)
+    return hits, flags, values, downloader.failed, state, session
+
+def build_records(hit_tickers, flags, values, membership=None, strategies=None):
+    records = engine.unpack_records(hit_tickers, flags, values, strategies)
+    if membership is not None:
+        for ticker, record in zip(hit_tickers, records):
+            record["universes"] = membership[ticker]
+    return records
 
-def scan_stocks():
+def scan_stocks(provider=None, tickers=None, output_file=OUTPUT_FILE, workers=DOWNLOAD_WORKERS,
+                universes=None, processes=1, on_progress=None, strategies=None, output_dir=OUTPUT_DIR,
+                report_file=telemetry.REPORT_FILE, metrics_file=telemetry.METRICS_FILE, panel_dir=None,
+                history_file=None, rate=REQUESTS_PER_SECOND):
+    """
+    Scans the universe and writes the result to output_file.
+    on_progress(done, total, records) streams each batch's hits; it is only
+    called for single-process scans. strategies defaults to
+    rules.DEFAULT_STRATEGIES. Pass output_dir=None to skip the sharded
+    frontend output. The run's telemetry is written to report_file (JSON)
+    and metrics_file (Prometheus textfile); None skips either. With
+    panel_dir, bars are read from a panel_store panel (tickers default to
+    all of its tickers) instead of being downloaded. The hits are appended
+    to the scan history database history_file (None skips it). rate is
+    the provider request budget per second (None for no limit, e.g. for
+    local or synthetic data).
+    """
+    with telemetry.recording() as recorder:
+        result = _scan_stocks(provider, tickers, output_file, workers, universes, processes,
+                              on_progress, strategies, output_dir, recorder, panel_dir, history_file, rate)
+    try:
+        report = recorder.write(report_file, metrics_file)
+        stages = ", ".join(f"{name} {s['wall_seconds']:.2f}s" for name, s in report['stages'].items())
+        print(f"Timing: {stages}")
+        if report['skip_counts']:
+            print(f"Skipped: {', '.join(f'{r} {n}' for r, n in report['skip_counts'].items())}")
+    except Exception as e:
+        print(f"Warning: Could not save scan report: {e}")
+    return result
+
+def _scan_stocks(provider, tickers, output_file, workers, universes, processes, on_progress, strategies,
+                 output_dir, recorder, panel_dir=None, history_file=None, rate=REQUESTS_PER_SECOND):
     print("Starting stock scan...")
-    tickers = get_nifty500_tickers()
-    valid_stocks = []
+    if provider is None:
+        provider = YFinanceProvider()
+    membership = None
+    if tickers is None and panel_dir and not universes:
+        with telemetry.stage("universe"):
+            tickers = panel_store.load_panel(panel_dir)['tickers']
+    if tickers is None:
+        with telemetry.stage("universe"):
+            tickers, membership = merge_universes(load_universes(universes or DEFAULT_UNIVERSES))
+    telemetry.count("tickers_requested", len(tickers))
     
     print(f"Total tickers to scan: {len(tickers)}")
     print("NOTE: Ensuring data is up to date...")
     
-    # OUTPUT Structure
-    valid_stocks = []
-    BATCH_SIZE = 50
+    # Split the universe across processes; the request budget is split with it
+    shards = shard(tickers, processes)
+    if rate:
+        rate = rate / max(1, len(shards))
+    if len(shards) > 1:
+        print(f"Scanning {len(shards)} shards on {len(shards)} processes...")
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            results = list(pool.map(scan_shard, [provider] * len(shards), shards,
+                                    [workers] * len(shards), [rate] * len(shards),
+                                    [None] * len(shards), [strategies] * len(shards),
+                                    [panel_dir] * len(shards)))
+    else:
+        on_batch = None
+        if on_progress is not None:
+            def on_batch(done, total, hit_tickers, flags, values):
+                on_progress(done, total, build_records(hit_tickers, flags, values, membership, strategies))
+        results = [scan_shard(provider, shards[0], workers, rate, on_batch, strategies, panel_dir)] if shards else []
     
-    for i in range(0, len(tickers), BATCH_SIZE):
-        chunk = tickers[i : i + BATCH_SIZE]
-        print(f"Processing batch {i} to {i + len(chunk)}...")
-        
-        try:
-            # Download batch
-            data = yf.download(chunk, period="6mo", interval="1d", group_by='ticker', threads=True)
-            
-            if data is None or data.empty:
-                print(f"Batch {i} returned no data.")
-                # Even if empty, continue to next batch
-                continue
-                
-            # Iterate tickers in this chunk
-            for ticker in chunk:
-                try:
-                    # Handle yfinance structure differences
-                    if len(chunk) == 1:
-                        # Single ticker dataframe
-                        df = data.copy()
-                    else:
-                        # Multi-ticker dataframe
-                        if ticker not in data.columns.levels[0] if isinstance(data.columns, pd.MultiIndex) else False:
-                             # Ticker data missing in this batch
-                             continue
-                        df = data[ticker].copy()
-                    
-                    if df.empty: continue
-                    
-                    df.dropna(inplace=True)
-                    if len(df) < 50: continue # Ensure enough data for monthly calc
-                    
-                    # --- Daily Data Points ---
-                    today = df.iloc[-1]
-                    current_price = today['Close']
-                    
-                    if i == 0 and len(valid_stocks) == 0:
-                         print(f"DEBUG: Latest data date for {ticker} is {today.name}")
-                    
-                    # --- 1. Calculate Daily Indicators (for Doji Strategy) ---
-                    # Row -2 is Yesterday (T-1) for Daily Pivots
-                    prev_day_daily = df.iloc[-2]
-                    
-                    cpr_daily = calculate_cpr_value(prev_day_daily['High'], prev_day_daily['Low'], prev_day_daily['Close'])
-                    cam_daily = calculate_camarilla_value(prev_day_daily['High'], prev_day_daily['Low'], prev_day_daily['Close'])
-                    
-                    # --- 2. Calculate Monthly Indicators (for Inside Cam Strategy) ---
-                    # Resample to Monthly
-                    # yfinance index is DatetimeIndex. Resample 'ME' gives last day of month.
-                    try:
-                        df_monthly = df.resample('ME').agg({
-                            'Open': 'first',
-                            'High': 'max',
-                            'Low': 'min',
-                            'Close': 'last'
-                        })
-                        
-                        if len(df_monthly) < 3: continue
-                        
-                        # Monthly Pivots for CURRENT Month are based on LAST Month (Row -2)
-                        last_month = df_monthly.iloc[-2] # Completed
-                        cam_monthly_curr = calculate_camarilla_value(last_month['High'], last_month['Low'], last_month['Close'])
-                        cpr_monthly_curr = calculate_cpr_value(last_month['High'], last_month['Low'], last_month['Close'])
-
-                        # Monthly Pivots for LAST Month were based on 2 MONTHS AGO (Row -3)
-                        month_before_last = df_monthly.iloc[-3]
-                        cam_monthly_prev = calculate_camarilla_value(month_before_last['High'], month_before_last['Low'], month_before_last['Close'])
-                        
-                    except Exception as e:
-                        # print(f"Monthly resample failed for {ticker}: {e}")
-                        continue
-
-                    # --- 3. Strategy Logic ---
-                    strategies = []
-                    today_range_pct = abs(today['High'] - today['Low']) / current_price * 100
-                    
-                    # 0. Indicators (EMA)
-                    try:
-                        ema8 = df.ta.ema(length=8)
-                        ema20 = df.ta.ema(length=20)
-                        curr_ema8 = ema8.iloc[-1] if ema8 is not None else 0
-                        curr_ema20 = ema20.iloc[-1] if ema20 is not None else 0
-                    except:
-                        curr_ema8 = 0
-                        curr_ema20 = 0
-
-                    # --- Strategy A: Daily Doji Logic (Pattern + Location) ---
-                    # User Request: "Doji + Near Monthly CPR (TC/PP/BC) + Near 8/20 EMA"
-                    
-                    # 1. Pattern Check
-                    has_pattern, pattern_name = check_candle_pattern(today['Open'], today['High'], today['Low'], today['Close'])
-                    
-                    if not has_pattern:
-                        body_size = abs(today['Close'] - today['Open'])
-                        range_size = today['High'] - today['Low']
-                        if range_size > 0 and (body_size / range_size) < 0.3:
-                            has_pattern = True
-                            pattern_name = "Small Candle"
-
-                    # Explicitly Ignore Hammers
-                    if pattern_name == "Hammer":
-                        has_pattern = False
-
-                    # 2. Location Check: Near MONTHLY Pivot (TC, PP, or BC)
-                    # User: "Near this month's monthly TC, monthly PP and monthly BC"
-                    # We check proximity to ANY of the three levels (Range concept).
-                    month_pp = cpr_monthly_curr['pivot']
-                    month_tc = cpr_monthly_curr['tc']
-                    month_bc = cpr_monthly_curr['bc']
-                    
-                    levels_to_check = [month_pp, month_tc, month_bc]
-                    is_near_monthly_cpr = False
-                    
-                    for level in levels_to_check:
-                         dist = abs(current_price - level) / level * 100
-                         if dist < 4.0: # User requested 4% tolerance
-                             is_near_monthly_cpr = True
-                             break
-                    
-                    # 3. Location Check: Near EMA (8 or 20)
-                    dist_ema8 = abs(current_price - curr_ema8) / curr_ema8 * 100 if curr_ema8 > 0 else 999
-                    dist_ema20 = abs(current_price - curr_ema20) / curr_ema20 * 100 if curr_ema20 > 0 else 999
-                    is_near_ema = (dist_ema8 < 1.0) or (dist_ema20 < 1.0)
-
-                    # 4. Range Check
-                    is_low_range = today_range_pct < 1.5
-
-                    if has_pattern and is_near_monthly_cpr and is_near_ema and is_low_range:
-                        strategies.append("Doji_Setup")
-
-                    # --- Strategy B: Monthly Inside Camarilla (Pine Script Alignment) ---
-                    # Requirement: Recent month Camerilla (L3 L4 H3 H4) should be within Last month (L3 L4 H3 H4)
-                    
-                    is_inside_h3l3 = (cam_monthly_curr['h3'] <= cam_monthly_prev['h3']) and (cam_monthly_curr['l3'] >= cam_monthly_prev['l3'])
-                    is_inside_h4l4 = (cam_monthly_curr['h4'] <= cam_monthly_prev['h4']) and (cam_monthly_curr['l4'] >= cam_monthly_prev['l4'])
-                    
-                    if is_inside_h3l3 and is_inside_h4l4:
-                        strategies.append("Inside_Camarilla")
-
-                    # --- 4. Add to List ---
-                    if strategies:
-                        valid_stocks.append({
-                            "ticker": ticker.replace(".NS", ""),
-                            "price": round(current_price, 2),
-                            "strategies": strategies,
-                            "range_pct": round(today_range_pct, 2),
-                            
-                            # Store Daily levels for Doji tab
-                            "daily": {
-                                 "cpr_width": cpr_daily['width_pct'],
-                                 "cam_center": cam_daily['center'],
-                                 "pivot": cpr_daily['pivot']
-                            },
-                            
-                            # Store Monthly levels for Inside Tab
-                            "monthly": {
-                                "curr_h3": cam_monthly_curr['h3'],
-                                "prev_h3": cam_monthly_prev['h3'],
-                                "curr_l3": cam_monthly_curr['l3'],
-                                "prev_l3": cam_monthly_prev['l3'],
-                                "pivot": cpr_monthly_curr['pivot']
-                            }
-                        })
-                except Exception as e:
-                    # print(f"Error processing {ticker}: {e}")
-                    continue
-                    
-        except Exception as e:
-            print(f"Batch download failed for chunk starting {i}: {e}")
-            continue
+    # Shards are contiguous and each is sorted by position, so concatenating keeps universe order
+    valid_stocks, failed, states, sessions = [], [], [], []
+    for part, (hits, flags, values, shard_failed, shard_state, shard_session, shard_report) in zip(shards, results):
+        order = np.argsort(hits, kind='stable')
+        hit_tickers = [part[j] for j in hits[order]]
+        valid_stocks.extend(build_records(hit_tickers, flags[order], values[order], membership, strategies))
+        failed.extend(shard_failed)
+        if shard_state is not None:
+            states.append(shard_state)
+        if shard_session:
+            sessions.append(shard_session)
+        recorder.merge(shard_report)
+    
+    # Strongest confluence first
+    valid_stocks = engine.rank_records(valid_stocks)
+    
+    if states:
+        with telemetry.stage("indicators"):
+            indicator_state.save_state(indicator_state.merge(indicator_state.load_state(), indicator_state.concat(*states)))
+    
+    if failed:
+        print(f"No data for {len(failed)} tickers: {', '.join(sorted(failed))}")
+    
+    names = [s.name for s in strategies or DEFAULT_STRATEGIES]
+    for name in names:
+        telemetry.count(f"hits.{name}", sum(name in s['strategies'] for s in valid_stocks))
             
     # Output
     result = {
-        "last_updated": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "last_updated": provider.now().strftime("%Y-%m-%d %H:%M:%S"),
+        # Date of the latest bar scanned: the trading session the hits belong to
+        "session": max(sessions) if sessions else None,
         "total_scanned": len(tickers),
         "stocks": valid_stocks
     }
     
-    try:
-        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-        with open(OUTPUT_FILE, 'w') as f:
-            json.dump(result, f, indent=2)
-        print(f"Data saved to {OUTPUT_FILE}")
-    except Exception as e:
-        print(f"Warning: Could not save to file: {e}")
+    with telemetry.stage("serialize"):
+        try:
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            with open(output_file, 'w') as f:
+                json.dump(result, f, indent=2)
+            print(f"Data saved to {output_file}")
+        except Exception as e:
+            print(f"Warning: Could not save to file: {e}")
+        
+        if output_dir:
+            try:
+                manifest = write_outputs(result, output_dir, names)
+                counts = ", ".join(f"{k}: {v['count']}" for k, v in manifest['shards'].items())
+                print(f"Shards saved to {output_dir} ({counts})")
+            except Exception as e:
+                print(f"Warning: Could not save shards: {e}")
+        
+        if history_file:
+            try:
+                date, rows = history_store.record_scan(result, history_file)
+                if rows is None:
+                    print(f"History not updated: {date} is not a session or already has its final scan")
+                else:
+                    print(f"History updated for {date} ({rows} signals)")
+            except Exception as e:
+                print(f"Warning: Could not update scan history: {e}")
         
     print(f"Scan complete. Scanned {len(tickers)}. Found {len(valid_stocks)} stocks.")
     return result
 
 if __name__ == "__main__":
-    scan_stocks()
+    parser = argparse.ArgumentParser(description="Camarilla & CPR stock scanner")
+    parser.add_argument("--provider", choices=["yfinance", "snapshot", "synthetic"], default="yfinance")
+    parser.add_argument("--snapshot-dir", help="Directory of recorded bars (snapshot provider)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic provider")
+    parser.add_argument("--record", metavar="DIR", help="Record the universe's bars to DIR instead of scanning")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Directory for the frontend manifest and shards")
+    parser.add_argument("--report", default=telemetry.REPORT_FILE, help="JSON run report (timings, skip reasons)")
+    parser.add_argument("--metrics", default=telemetry.METRICS_FILE, help="Prometheus textfile with the run's metrics")
+    parser.add_argument("--history", help="SQLite scan history the hits are appended to "
+                                          "(default: data/scan_history.db for yfinance scans, none otherwise)")
+    parser.add_argument("--profile", metavar="PATH", help=f"cProfile the scan loop to PATH (or set ${telemetry.PROFILE_ENV})")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="Concurrent download batches per process")
+    parser.add_argument("--universe", action="append", help="nifty500, total_market, fno or a watchlist file (repeatable)")
+    parser.add_argument("--strategies", help="JSON/YAML file of strategy rules (default: built-in strategies)")
+    parser.add_argument("--processes", type=int, default=1, help="Scan shards in this many processes (0 = all cores)")
+    parser.add_argument("--panel", metavar="DIR", help="Scan a panel built by panel_store.py instead of downloading")
+    args = parser.parse_args()
+    processes = args.processes or os.cpu_count()
+
+    if args.provider == "snapshot":
+        provider = SnapshotProvider(args.snapshot_dir)
+        universe = provider.tickers()
+    elif args.provider == "synthetic":
+        provider = SyntheticProvider(seed=args.seed)
+        universe = None
+    else:
+        provider = YFinanceProvider()
+        universe = None
+
+    if args.record:
+        if universe is None:
+            universe, _ = merge_universes(load_universes(args.universe or DEFAULT_UNIVERSES))
+        record(provider, universe, args.record)
+    else:
+        strategies = load_strategies(args.strategies) if args.strategies else None
+        # Only live market data goes into the signal history unless a database is named
+        history = args.history or (history_store.DB_FILE if args.provider == "yfinance" and not args.panel else None)
+        if args.profile:
+            # Through the environment so worker processes profile too
+            os.environ[telemetry.PROFILE_ENV] = args.profile
+        scan_stocks(provider, universe, args.output, args.workers, args.universe, processes,
+                    strategies=strategies, output_dir=args.output_dir,
+                    report_file=args.report, metrics_file=args.metrics, panel_dir=args.panel,
+                    history_file=history)
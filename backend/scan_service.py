@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import datetime
+import threading
+import nse_calendar
+import history_store
+
+# One shared background scan per trading day for every dashboard session.
+# Jobs live in this module (process-wide, so all Streamlit sessions see the
+# same one) and finished results are persisted so app restarts reuse them.
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "data", "scans")
+# Results taken before the close are refreshed after this many seconds
+RESULT_TTL = 3600
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+MARKET_CLOSE = datetime.time(15, 30)
+
+_jobs = {}
+_lock = threading.Lock()
+
+
+def trading_day(now=None):
+    """Current NSE trading day in IST (weekends and holidays roll back to the last session)."""
+    now = now or datetime.datetime.now(IST)
+    day = now.date()
+    while not nse_calendar.is_trading_day(day):
+        day -= datetime.timedelta(days=1)
+    return day
+
+
+class ScanJob:
+    def __init__(self, day):
+        self.day = day
+        self.status = "pending"
+        self.stocks = []
+        self.done = 0
+        self.total = 0
+        self.started = None
+        self.finished = None
+        self.last_updated = None
+        self.total_scanned = 0
+        self.error = None
+        self.lock = threading.Lock()
+
+    def start(self, **scan_kwargs):
+        self.status = "running"
+        self.started = time.time()
+        thread = threading.Thread(target=self._run, kwargs=scan_kwargs, daemon=True)
+        thread.start()
+
+    def _run(self, **scan_kwargs):
+        import scan
+        if "provider" not in scan_kwargs:
+            # Live dashboard scans feed the signal history
+            scan_kwargs.setdefault("history_file", history_store.DB_FILE)
+        try:
+            result = scan.scan_stocks(on_progress=self._on_progress, **scan_kwargs)
+            with self.lock:
+                # The final list is ranked by confluence; partial results arrive by batch
+                self.stocks = result['stocks']
+                self.last_updated = result.get('last_updated')
+                self.total_scanned = result.get('total_scanned', 0)
+                self.done = self.total = self.total_scanned
+                self.finished = time.time()
+                self.status = "done"
+            self.save()
+        except Exception as e:
+            with self.lock:
+                self.error = str(e)
+                self.finished = time.time()
+                self.status = "error"
+
+    def _on_progress(self, done, total, records):
+        with self.lock:
+            self.done = done
+            self.total = total
+            self.stocks.extend(records)
+
+    def snapshot(self):
+        """Consistent copy of the job's state for rendering."""
+        with self.lock:
+            elapsed = (self.finished or time.time()) - (self.started or time.time())
+            return {
+                "status": self.status,
+                "stocks": list(self.stocks),
+                "done": self.done,
+                "total": self.total,
+                "tickers_per_sec": self.done / elapsed if elapsed > 0 else 0.0,
+                "last_updated": self.last_updated or "Running...",
+                "total_scanned": self.total_scanned or self.total,
+                "error": self.error,
+            }
+
+    def is_final(self):
+        """Results written after the close won't change for this trading day."""
+        if self.finished is None:
+            return False
+        written = datetime.datetime.fromtimestamp(self.finished, IST)
+        return written >= datetime.datetime.combine(self.day, MARKET_CLOSE, IST)
+
+    def expired(self):
+        if self.status == "error":
+            return True
+        if self.status != "done" or self.is_final():
+            return False
+        return time.time() - self.finished > RESULT_TTL
+
+    # --- Persistence ---
+    def save(self):
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{self.day.isoformat()}.json")
+        with self.lock:
+            payload = {
+                "day": self.day.isoformat(),
+                "finished": self.finished,
+                "last_updated": self.last_updated,
+                "total_scanned": self.total_scanned,
+                "stocks": self.stocks,
+            }
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            payload = json.load(f)
+        job = cls(datetime.date.fromisoformat(payload["day"]))
+        job.status = "done"
+        job.stocks = payload["stocks"]
+        job.finished = job.started = payload["finished"]
+        job.last_updated = payload["last_updated"]
+        job.total_scanned = job.done = job.total = payload["total_scanned"]
+        return job
+
+
+def _load_persisted(day=None):
+    """Persisted job for `day`, or the most recent one if day is None."""
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    names = sorted(f for f in os.listdir(RESULTS_DIR) if f.endswith(".json"))
+    if day is not None:
+        names = [f for f in names if f == f"{day.isoformat()}.json"]
+    if not names:
+        return None
+    try:
+        return ScanJob.load(os.path.join(RESULTS_DIR, names[-1]))
+    except Exception as e:
+        print(f"Warning: Could not load persisted scan {names[-1]}: {e}")
+        return None
+
+
+def get_job(start=False, **scan_kwargs):
+    """
+    Returns today's shared scan job. With start=True a scan is started
+    unless one is already running or today's results are still fresh.
+    Without it, the latest available results (possibly an earlier day's)
+    are returned, or None.
+    """
+    day = trading_day()
+    with _lock:
+        job = _jobs.get(day) or _load_persisted(day)
+        if job is not None:
+            _jobs[day] = job
+        if start and (job is None or job.expired()):
+            job = ScanJob(day)
+            _jobs[day] = job
+            job.start(**scan_kwargs)
+        if job is None:
+            job = _load_persisted()
+        return job
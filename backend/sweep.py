@@ -0,0 +1,258 @@
+import json
+import time
+import argparse
+import numpy as np
+import engine
+import patterns
+import rules
+from backtest import forward_returns, HORIZONS
+from pipeline import Downloader
+from providers import YFinanceProvider, SnapshotProvider, SyntheticProvider
+from universes import load_universes, merge_universes, DEFAULT_UNIVERSES
+
+# Parameter sweep for the Doji_Setup thresholds.
+#
+# Every threshold is a "feature < value" (or <=) test, so for a sorted grid of
+# values each row has a first grid index from which it passes. A grid point
+# (i, j, ...) then matches exactly the rows whose first-pass indices are all
+# <= (i, j, ...): one histogram of the rows over those indices, cumulatively
+# summed along every axis, gives the hit count of every combination at once.
+# The doji / small-candle test is an OR of two thresholds and is counted by
+# inclusion-exclusion on the same cumulative histogram. Cost is one pass over
+# the rows plus the grid size, however many combinations are swept.
+
+OUTPUT_FILE = "sweep_report.json"
+HISTORY_PERIOD = "2y"
+# Axis order of the result arrays
+PARAMS = ["range_pct", "cpr_pct", "ema_pct", "small_ratio", "doji_ratio"]
+DEFAULTS = {
+    "range_pct": rules.DOJI_RANGE_PCT,
+    "cpr_pct": rules.DOJI_CPR_PCT,
+    "ema_pct": rules.DOJI_EMA_PCT,
+    "small_ratio": rules.SMALL_BODY_RATIO,
+    "doji_ratio": rules.DOJI_BODY_RATIO,
+}
+DEFAULT_GRID = {
+    "range_pct": [1.0, 1.5, 2.0, 2.5],
+    "cpr_pct": [1.0, 2.0, 3.0, 4.0, 5.0],
+    "ema_pct": [0.5, 1.0, 1.5, 2.0],
+    "small_ratio": [0.2, 0.3, 0.4],
+    "doji_ratio": [0.05, 0.1, 0.15],
+}
+CPR_LEVELS = ["pivot", "tc", "bc"]
+# Combinations with fewer trades are left out of the printed ranking
+MIN_TRADES = 30
+
+
+def sweep_features(f):
+    """
+    The per-row quantities the thresholds apply to, computed once over the
+    eligible rows of engine features (latest 1D or full-history 2D).
+    Returns (rows, values) with rows the flat indices of eligible rows.
+    """
+    rows = np.flatnonzero(np.ravel(f['eligible']))
+    price = np.ravel(f['price'])[rows]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Same formulas as rules.Near and rules' dist.<feature>; the min distance is below
+        # a threshold exactly when any single distance is
+        cpr = [np.ravel(f['cpr_monthly'][level])[rows] for level in CPR_LEVELS]
+        cpr_dist = np.fmin.reduce([np.abs(price - level) / level * 100 for level in cpr])
+        ema = [np.ravel(f[name])[rows] for name in ('ema8', 'ema20')]
+        ema_dist = np.fmin.reduce([np.where(v > 0, np.abs(price - v) / v * 100, rules.FAR_PCT) for v in ema])
+    candle = {k: np.ravel(v)[rows] for k, v in f['candle'].items()}
+    # Body ratios are swept; the hammer exclusion is fixed, so it comes from the pattern bits
+    hammer = (candle['patterns'] & patterns.HAMMER) != 0
+    return rows, {
+        "range_pct": np.ravel(f['range_pct'])[rows],
+        "cpr_dist": cpr_dist,
+        "ema_dist": ema_dist,
+        "body": candle['body'],
+        "range": candle['range'],
+        "body_ratio": candle['body_ratio'],
+        "hammer": hammer,
+    }
+
+
+def _first_below(values, grid):
+    """First index i with values < grid[i] (len(grid) if none, NaN never passes)."""
+    return np.searchsorted(grid, values, side='right')
+
+
+def pass_indices(v, grid):
+    """First passing grid index of every row for each parameter, in PARAMS order."""
+    n_small, n_doji = len(grid["small_ratio"]), len(grid["doji_ratio"])
+    # Doji: body <= range * ratio, tested against every grid value to keep the exact comparison
+    doji = v["body"][:, None] <= v["range"][:, None] * np.asarray(grid["doji_ratio"])[None, :]
+    k_doji = np.where(doji.any(axis=1), doji.argmax(axis=1), n_doji)
+    small_ok = ~v["hammer"] & (v["range"] > 0)
+    k_small = np.where(small_ok, _first_below(v["body_ratio"], grid["small_ratio"]), n_small)
+    # A zero-range bar is neither
+    zero = v["range"] == 0
+    k_doji = np.where(zero, n_doji, k_doji)
+    k_small = np.where(zero, n_small, k_small)
+    return [
+        _first_below(v["range_pct"], grid["range_pct"]),
+        _first_below(v["cpr_dist"], grid["cpr_pct"]),
+        _first_below(v["ema_dist"], grid["ema_pct"]),
+        k_small,
+        k_doji,
+    ]
+
+
+def cumulative_counts(indices, grid, weights=None):
+    """
+    C[i0, ..., i4] = sum of weights of rows whose first-pass index is <= i
+    on every axis. Axes have one extra slot for "never passes", so the last
+    slot of an axis counts rows regardless of that parameter.
+    """
+    shape = tuple(len(grid[p]) + 1 for p in PARAMS)
+    flat = np.ravel_multi_index(indices, shape)
+    hist = np.bincount(flat, weights=weights, minlength=int(np.prod(shape))).reshape(shape)
+    for axis in range(len(shape)):
+        hist = np.cumsum(hist, axis=axis)
+    return hist
+
+
+def combine(c):
+    """Matches per grid point: the small-candle OR doji test by inclusion-exclusion."""
+    # The last slot of an axis means "any value" (it is dropped for the AND-ed axes)
+    c = c[:-1, :-1, :-1]
+    return c[:, :, :, -1:, :-1] + c[:, :, :, :-1, -1:] - c[:, :, :, :-1, :-1]
+
+
+def sweep(f, grid=DEFAULT_GRID, returns=None):
+    """
+    Hit counts for every combination of `grid` (arrays shaped by PARAMS order).
+    With `returns` ({horizon: array shaped like the features}), also the
+    mean forward return and hit rate of the matching rows per horizon.
+    """
+    grid = {p: sorted(grid.get(p, [DEFAULTS[p]])) for p in PARAMS}
+    rows, values = sweep_features(f)
+    indices = pass_indices(values, grid)
+    out = {"grid": grid, "hits": combine(cumulative_counts(indices, grid)).astype(np.int64)}
+    for horizon, r in (returns or {}).items():
+        r = np.ravel(r)[rows]
+        ok = ~np.isnan(r)
+        sub = [k[ok] for k in indices]
+        trades = combine(cumulative_counts(sub, grid))
+        total = combine(cumulative_counts(sub, grid, r[ok]))
+        wins = combine(cumulative_counts(sub, grid, (r[ok] > 0).astype(np.float64)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[horizon] = {"trades": trades.astype(np.int64), "mean_return_pct": total / trades,
+                            "hit_rate_pct": wins / trades * 100}
+    return out
+
+
+def to_table(result, horizons=()):
+    """Flat list of {params..., hits, returns} rows, one per grid combination."""
+    grid = result["grid"]
+    table = []
+    for index in np.ndindex(result["hits"].shape):
+        row = {p: grid[p][i] for p, i in zip(PARAMS, index)}
+        row["hits"] = int(result["hits"][index])
+        for h in horizons:
+            stats = result[h]
+            trades = int(stats["trades"][index])
+            row[f"{h}d"] = {
+                "trades": trades,
+                "mean_return_pct": round(float(stats["mean_return_pct"][index]), 3) if trades else None,
+                "hit_rate_pct": round(float(stats["hit_rate_pct"][index]), 2) if trades else None,
+            }
+        table.append(row)
+    return table
+
+
+def run_sweep(provider, tickers, grid=DEFAULT_GRID, period=HISTORY_PERIOD, horizons=HORIZONS,
+              latest=False, output_file=OUTPUT_FILE):
+    """
+    Sweeps `grid` over the universe's history (every bar, with forward returns)
+    or, with latest=True, over each ticker's latest bar only (today's hits).
+    """
+    combos = int(np.prod([len(grid.get(p, [DEFAULTS[p]])) for p in PARAMS]))
+    print(f"Sweeping {combos} combinations over {len(tickers)} tickers ({period})...")
+    start = time.perf_counter()
+    frames = {}
+    for chunk, batch in Downloader(lambda c: provider.fetch(c, period=period)).run(tickers):
+        frames.update(batch)
+    loaded = time.perf_counter()
+
+    panel = engine.align(frames, tickers)
+    features = engine.compute_features(panel)
+    returns = None
+    if latest:
+        features = engine.latest(features, panel['valid'])
+        horizons = []
+    else:
+        returns = {h: forward_returns(panel, h) for h in horizons}
+    result = sweep(features, grid, returns)
+    done = time.perf_counter()
+    print(f"Loaded data in {loaded - start:.1f}s, swept in {done - loaded:.2f}s.")
+
+    table = to_table(result, horizons)
+    default = next((row for row in table if all(row[p] == DEFAULTS[p] for p in PARAMS)), None)
+    report = {
+        "tickers": len(panel['tickers']),
+        "bars": int(panel['valid'].sum()),
+        "mode": "latest" if latest else "history",
+        "grid": result["grid"],
+        "default": default,
+        "combinations": table,
+    }
+    if default:
+        print(f"Default thresholds: {default['hits']} hits")
+    if horizons:
+        # Best mean return at the first horizon among combinations with enough trades
+        key = f"{horizons[0]}d"
+        ranked = [r for r in table if r[key]["trades"] >= MIN_TRADES]
+        ranked.sort(key=lambda r: -r[key]["mean_return_pct"])
+        print(f"Top combinations by {key} mean return (>= {MIN_TRADES} trades):")
+    else:
+        ranked = sorted(table, key=lambda r: -r["hits"])
+        print("Top combinations by hits:")
+    for row in ranked[:5]:
+        stats = f", {key} mean {row[key]['mean_return_pct']}%" if horizons else ""
+        print("  " + ", ".join(f"{p}={row[p]}" for p in PARAMS) + f": {row['hits']} hits{stats}")
+
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output_file}")
+    return report
+
+
+def parse_grid(specs):
+    """["cpr_pct=2,3,4", ...] -> grid (parameters not given keep DEFAULT_GRID)."""
+    grid = dict(DEFAULT_GRID)
+    for spec in specs or []:
+        name, _, values = spec.partition("=")
+        if name not in PARAMS:
+            raise ValueError(f"Unknown parameter: {name} (expected one of {', '.join(PARAMS)})")
+        grid[name] = [float(v) for v in values.split(",")]
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep Doji_Setup thresholds over a grid")
+    parser.add_argument("--provider", choices=["yfinance", "snapshot", "synthetic"], default="yfinance")
+    parser.add_argument("--snapshot-dir", help="Directory of recorded bars (snapshot provider)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic provider")
+    parser.add_argument("--universe", action="append", help="nifty500, total_market, fno or a watchlist file (repeatable)")
+    parser.add_argument("--grid", action="append", metavar="PARAM=V1,V2,...",
+                        help=f"Values for one of {', '.join(PARAMS)} (repeatable)")
+    parser.add_argument("--period", default=HISTORY_PERIOD, help="History to evaluate, e.g. 6mo, 2y")
+    parser.add_argument("--horizon", type=int, action="append", help="Forward-return horizon in sessions (repeatable)")
+    parser.add_argument("--latest", action="store_true", help="Only each ticker's latest bar (today's hits)")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    if args.provider == "snapshot":
+        provider = SnapshotProvider(args.snapshot_dir)
+        universe = provider.tickers()
+    else:
+        if args.provider == "synthetic":
+            provider = SyntheticProvider(seed=args.seed)
+        else:
+            provider = YFinanceProvider()
+        universe, _ = merge_universes(load_universes(args.universe or DEFAULT_UNIVERSES))
+
+    run_sweep(provider, universe, parse_grid(args.grid), args.period, args.horizon or HORIZONS,
+              args.latest, args.output)
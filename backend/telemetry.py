@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import threading
+import functools
+import contextlib
+import multiprocessing
+
+# Scan instrumentation: wall and CPU time per stage, per-batch throughput,
+# counters, and the tickers skipped for each reason.
+#
+# Code anywhere in the scan records into the active recorder through the
+# module-level helpers (stage, count, skip), which are no-ops when nothing is
+# recording; timed(name) is the decorator form. CPU time is per thread, so concurrent download threads don't
+# inflate the stages running on the main thread; stage wall time is busy time
+# summed over threads.
+
+REPORT_FILE = os.path.join(os.path.dirname(__file__), "data", "scan_report.json")
+METRICS_FILE = os.path.join(os.path.dirname(__file__), "data", "scan.prom")
+# Set to a .pstats path to cProfile the scan's hot loop (one file per process)
+PROFILE_ENV = "SCAN_PROFILE"
+STAGES = ["universe", "download", "clean", "resample", "indicators", "evaluate", "serialize"]
+METRIC_PREFIX = "scanner"
+
+
+class Telemetry:
+    def __init__(self):
+        self.started = time.time()
+        self.wall_start = time.perf_counter()
+        self.stages = {}
+        self.batches = []
+        self.counters = {}
+        self.skips = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Times the block as `name`. Stages nest: time spent in an inner stage
+        counts only towards it, so stage times add up to the total.
+        """
+        stack = self.local.__dict__.setdefault("stack", [])
+        wall, cpu = time.perf_counter(), time.thread_time()
+        if stack:
+            outer = stack[-1]
+            self._add(outer[0], wall - outer[1], cpu - outer[2], 0)
+        stack.append([name, wall, cpu])
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter(), time.thread_time()
+            _, start_wall, start_cpu = stack.pop()
+            self._add(name, wall - start_wall, cpu - start_cpu, 1)
+            if stack:
+                stack[-1][1], stack[-1][2] = wall, cpu
+
+    def _add(self, name, wall, cpu, calls):
+        with self.lock:
+            s = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+            s["wall_seconds"] += wall
+            s["cpu_seconds"] += cpu
+            s["calls"] += calls
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def skip(self, reason, tickers):
+        with self.lock:
+            self.skips.setdefault(reason, []).extend(tickers)
+
+    def batch(self, size, seconds, hits):
+        with self.lock:
+            self.batches.append({
+                "tickers": size,
+                "seconds": round(seconds, 4),
+                "tickers_per_sec": round(size / seconds, 1) if seconds > 0 else None,
+                "hits": hits,
+            })
+
+    def merge(self, report):
+        """Adds a report() from another recorder (e.g. a worker process) into this one."""
+        with self.lock:
+            for name, s in report["stages"].items():
+                mine = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+                for key in mine:
+                    mine[key] += s[key]
+            self.batches.extend(report["batches"])
+            for name, n in report["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for reason, tickers in report["skips"].items():
+                self.skips.setdefault(reason, []).extend(tickers)
+
+    def report(self):
+        with self.lock:
+            elapsed = time.perf_counter() - self.wall_start
+            ordered = [s for s in STAGES if s in self.stages] + sorted(set(self.stages) - set(STAGES))
+            sizes = sum(b["tickers"] for b in self.batches)
+            busy = sum(b["seconds"] for b in self.batches)
+            return {
+                "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+                "wall_seconds": round(elapsed, 4),
+                "stages": {name: {k: round(v, 4) if isinstance(v, float) else v for k, v in self.stages[name].items()}
+                           for name in ordered},
+                "counters": dict(sorted(self.counters.items())),
+                "skips": {reason: sorted(tickers) for reason, tickers in sorted(self.skips.items())},
+                "skip_counts": {reason: len(tickers) for reason, tickers in sorted(self.skips.items())},
+                "batches": list(self.batches),
+                "tickers_per_sec": round(sizes / busy, 1) if busy > 0 else None,
+            }
+
+    def to_prometheus(self, report=None):
+        """Prometheus text exposition format (for node_exporter's textfile collector)."""
+        report = report or self.report()
+        p = METRIC_PREFIX
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} gauge")
+            for labels, value in samples:
+                label = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+                lines.append(f"{p}_{name}{label} {value}")
+
+        metric("last_run_timestamp_seconds", "Unix time the last scan started.", [({}, int(self.started))])
+        metric("run_seconds", "Wall time of the last scan.", [({}, report["wall_seconds"])])
+        metric("stage_wall_seconds", "Wall time per scan stage (summed over threads).",
+               [({"stage": n}, s["wall_seconds"]) for n, s in report["stages"].items()])
+        metric("stage_cpu_seconds", "CPU time per scan stage.",
+               [({"stage": n}, s["cpu_seconds"]) for n, s in report["stages"].items()])
+        metric("events", "Scan counters.", [({"name": n}, v) for n, v in report["counters"].items()])
+        metric("skipped_tickers", "Tickers skipped, by reason.",
+               [({"reason": r}, n) for r, n in report["skip_counts"].items()])
+        metric("batches", "Batches scanned.", [({}, len(report["batches"]))])
+        metric("tickers_per_second", "Scan throughput over batch processing time.",
+               [({}, report["tickers_per_sec"] or 0)])
+        return "\n".join(lines) + "\n"
+
+    def write(self, report_file=REPORT_FILE, metrics_file=METRICS_FILE):
+        report = self.report()
+        if report_file:
+            _write_atomic(report_file, json.dumps(report, indent=2))
+        if metrics_file:
+            _write_atomic(metrics_file, self.to_prometheus(report))
+        return report
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# --- Active recorder ---
+
+# Per thread, so concurrent scans (dashboard, watch loop) each record into
+# their own report; worker threads join their scan's recorder through bind()
+_local = threading.local()
+
+
+def current():
+    return getattr(_local, "active", None)
+
+
+@contextlib.contextmanager
+def recording(recorder=None):
+    """Makes `recorder` (a new Telemetry by default) the active one for the block."""
+    previous = current()
+    _local.active = recorder or Telemetry()
+    try:
+        yield _local.active
+    finally:
+        _local.active = previous
+
+
+def bind(fn):
+    """Wraps `fn` to run under the calling thread's active recorder, for use as a thread target."""
+    recorder = current()
+
+    def wrapper(*args, **kwargs):
+        previous = current()
+        _local.active = recorder
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.active = previous
+    return wrapper
+
+
+@contextlib.contextmanager
+def stage(name):
+    active = current()
+    if active is None:
+        yield
+    else:
+        with active.stage(name):
+            yield
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            active = current()
+            if active is None:
+                return fn(*args, **kwargs)
+            with active.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    active = current()
+    if active is not None:
+        active.count(name, n)
+
+
+def skip(reason, tickers):
+    active = current()
+    if active is not None and reason and tickers:
+        active.skip(reason, tickers)
+
+
+@contextlib.contextmanager
+def profile(path=None):
+    """
+    cProfiles the block when `path` (default: $SCAN_PROFILE) is set. Each
+    process writes <path> or <path>.<pid> for worker processes; view with
+    `python -m pstats` or snakeviz. For sampling, run the scan under
+    `py-spy record -o scan.svg --subprocesses -- python scan.py`.
+    """
+    path = path or os.environ.get(PROFILE_ENV)
+    if not path:
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if multiprocessing.parent_process() is not None:
+            path = f"{path}.{os.getpid()}"
+        profiler.dump_stats(path)
+        print(f"Profile saved to {path}")
+
@@ -0,0 +1,40 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# The backend modules are flat scripts; tests import them the way scan.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def synthetic_frames(n_tickers, n_days=130, seed=0, end="2024-06-28"):
+    """
+    Random-walk OHLCV frames with the gaps real data has: late listings,
+    NaN cells, missing sessions and an all-NaN latest bar.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=n_days)
+    frames = {}
+    for k in range(n_tickers):
+        c = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n_days)))
+        o = c * (1 + rng.normal(0, 0.002, n_days))
+        h = np.maximum(o, c) * (1 + np.abs(rng.normal(0, 0.003, n_days)))
+        l = np.minimum(o, c) * (1 - np.abs(rng.normal(0, 0.003, n_days)))
+        df = pd.DataFrame({'Open': o, 'High': h, 'Low': l, 'Close': c,
+                           'Volume': rng.integers(1e5, 1e6, n_days).astype(float)}, index=dates)
+        if k % 7 == 1:
+            df = df.iloc[rng.integers(0, 80):]
+        if k % 5 == 2:
+            df.iloc[rng.integers(0, len(df), 6), 1] = np.nan
+        if k % 11 == 3:
+            df = df.drop(df.index[rng.integers(0, len(df), 10)])
+        if k % 13 == 4:
+            df.iloc[-1, :] = np.nan
+        frames[f"T{k}.NS"] = df
+    return frames
+
+
+@pytest.fixture(scope="session")
+def frames():
+    return synthetic_frames(400, seed=0)
@@ -0,0 +1,75 @@
+import numpy as np
+import confluence
+import engine
+
+# The batched searchsorted confluence against checking every level of every row.
+
+
+def brute_force(price, levels, pct=confluence.CONFLUENCE_PCT):
+    count, nearest, nearest_pct = [], [], []
+    for p, row in zip(price, levels):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            distance = np.clip((row - p) / p * 100, -confluence.FAR_PCT, confluence.FAR_PCT)
+        known = [j for j in range(len(row)) if not np.isnan(distance[j])]
+        count.append(sum(abs(distance[j]) <= pct for j in known))
+        if not known:
+            nearest.append(-1)
+            nearest_pct.append(np.nan)
+            continue
+        # Closest level; on a tie the one below the price, then the first in LEVELS order
+        best = min(known, key=lambda j: (abs(distance[j]), distance[j] >= 0, j))
+        nearest.append(best)
+        nearest_pct.append(distance[best])
+    return np.array(count), np.array(nearest), np.array(nearest_pct)
+
+
+def assert_matches(price, levels):
+    count, nearest, nearest_pct = confluence.confluence(price, levels)
+    expected = brute_force(price, levels)
+    np.testing.assert_array_equal(count, expected[0])
+    np.testing.assert_array_equal(nearest, expected[1])
+    np.testing.assert_allclose(nearest_pct, expected[2], rtol=0, atol=1e-8, equal_nan=True)
+
+
+def test_random_levels_match_brute_force():
+    rng = np.random.default_rng(0)
+    n, width = 5000, len(confluence.LEVELS)
+    price = rng.uniform(50, 5000, n)
+    levels = price[:, None] * (1 + rng.normal(0, 0.02, (n, width)))
+    # Unknown levels, rows without any level, and levels past the clip
+    levels[rng.random((n, width)) < 0.1] = np.nan
+    levels[:25] = np.nan
+    levels[25:50, 0] = price[25:50] * 30
+    assert_matches(price, levels)
+
+
+def test_ties_pick_the_level_below_then_the_first():
+    price = np.array([100.0, 100.0, 100.0])
+    levels = np.full((3, 4), np.nan)
+    levels[0, :2] = [100.5, 99.5]
+    levels[1, :3] = [100.9, 100.5, 100.5]
+    levels[2, :] = [103.0, 98.0, 98.0, 97.0]
+    assert_matches(price, levels)
+    count, nearest, _ = confluence.confluence(price, levels)
+    assert nearest.tolist() == [1, 1, 1]
+    assert count.tolist() == [2, 3, 0]
+
+
+def test_more_rows_than_one_chunk():
+    rng = np.random.default_rng(1)
+    n = confluence.CHUNK_ROWS * 2 + 7
+    price = rng.uniform(10, 100000, n)
+    levels = price[:, None] * (1 + rng.normal(0, 0.01, (n, 6)))
+    assert_matches(price, levels)
+
+
+def test_scan_features_match_brute_force(frames):
+    panel = engine.align(frames)
+    f = engine.latest(engine.compute_features(panel), panel['valid'])
+    price = np.ravel(f['price']).astype(np.float64)
+    levels = np.stack([confluence._level(f, path) for path in confluence.LEVELS], axis=1)
+    result = confluence.features(f)
+    expected = brute_force(price, levels)
+    np.testing.assert_array_equal(result["count"], expected[0])
+    np.testing.assert_array_equal(result["nearest"], expected[1])
+    np.testing.assert_allclose(result["nearest_pct"], expected[2], rtol=0, atol=1e-8, equal_nan=True)
@@ -0,0 +1,106 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import engine
+from engine import calculate_cpr_value, calculate_camarilla_value
+from conftest import synthetic_frames
+
+# The vectorized engine against the per-ticker pandas scan it replaced.
+
+
+def ta_ema(close, length):
+    """pandas_ta's EMA: seeded with the SMA of the first `length` closes."""
+    close = close.copy()
+    close[:length - 1] = np.nan
+    close.iloc[length - 1] = close[0:length].mean()
+    return close.ewm(span=length, adjust=False).mean()
+
+
+def check_candle_pattern(open_p, high_p, low_p, close_p):
+    body = abs(close_p - open_p)
+    total_range = high_p - low_p
+    if total_range == 0:
+        return False, "None"
+    upper_wick = high_p - max(open_p, close_p)
+    lower_wick = min(open_p, close_p) - low_p
+    if body <= total_range * 0.1:
+        return True, "Doji"
+    if lower_wick > 2 * body and upper_wick < body:
+        return True, "Hammer"
+    return False, "None"
+
+
+def baseline_scan(frames, tickers):
+    """The original one-ticker-at-a-time scan loop."""
+    out = []
+    for ticker in tickers:
+        if ticker not in frames:
+            continue
+        df = frames[ticker].dropna()
+        if len(df) < 50:
+            continue
+        today, prev = df.iloc[-1], df.iloc[-2]
+        price = today['Close']
+        cpr_daily = calculate_cpr_value(prev['High'], prev['Low'], prev['Close'])
+        cam_daily = calculate_camarilla_value(prev['High'], prev['Low'], prev['Close'])
+        monthly = df.resample('ME').agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'})
+        if len(monthly) < 3:
+            continue
+        last, before = monthly.iloc[-2], monthly.iloc[-3]
+        cam_curr = calculate_camarilla_value(last['High'], last['Low'], last['Close'])
+        cpr_curr = calculate_cpr_value(last['High'], last['Low'], last['Close'])
+        cam_prev = calculate_camarilla_value(before['High'], before['Low'], before['Close'])
+
+        range_pct = abs(today['High'] - today['Low']) / price * 100
+        ema8, ema20 = ta_ema(df['Close'], 8).iloc[-1], ta_ema(df['Close'], 20).iloc[-1]
+        candle, name = check_candle_pattern(today['Open'], today['High'], today['Low'], today['Close'])
+        if not candle:
+            body, total_range = abs(today['Close'] - today['Open']), today['High'] - today['Low']
+            if total_range > 0 and body / total_range < 0.3:
+                candle = True
+        if name == "Hammer":
+            candle = False
+        near_cpr = any(abs(price - level) / level * 100 < 4.0 for level in (cpr_curr['pivot'], cpr_curr['tc'], cpr_curr['bc']))
+        dist8 = abs(price - ema8) / ema8 * 100 if ema8 > 0 else 999
+        dist20 = abs(price - ema20) / ema20 * 100 if ema20 > 0 else 999
+
+        strategies = []
+        if candle and near_cpr and (dist8 < 1.0 or dist20 < 1.0) and range_pct < 1.5:
+            strategies.append("Doji_Setup")
+        if (cam_curr['h3'] <= cam_prev['h3'] and cam_curr['l3'] >= cam_prev['l3']
+                and cam_curr['h4'] <= cam_prev['h4'] and cam_curr['l4'] >= cam_prev['l4']):
+            strategies.append("Inside_Camarilla")
+        if strategies:
+            out.append({
+                "ticker": ticker.replace(".NS", ""),
+                "price": round(price, 2),
+                "strategies": strategies,
+                "range_pct": round(range_pct, 2),
+                "daily": {"cpr_width": cpr_daily['width_pct'], "cam_center": cam_daily['center'], "pivot": cpr_daily['pivot']},
+                "monthly": {"curr_h3": cam_curr['h3'], "prev_h3": cam_prev['h3'], "curr_l3": cam_curr['l3'],
+                            "prev_l3": cam_prev['l3'], "pivot": cpr_curr['pivot']},
+            })
+    return out
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_scan_matches_baseline(seed):
+    frames = synthetic_frames(300, seed=seed)
+    tickers = list(frames) + ["MISSING.NS"]
+    expected = baseline_scan(frames, tickers)
+
+    scanned, hits, flags, values = engine.scan_frames(frames, tickers)
+    records = engine.unpack_records([scanned[j] for j in hits], flags, values)
+    for record in records:
+        # Added since the baseline
+        record.pop("confluence")
+        record.pop("patterns")
+
+    assert expected, "the synthetic universe should produce hits"
+    assert json.dumps(records) == json.dumps(expected)
+
+
+def test_skip_reasons_match_per_ticker(frames):
+    panel = engine.align(frames)
+    assert engine.skip_reasons(panel) == [engine.skip_reason(frames[t]) for t in panel['tickers']]
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import engine
+import indicator_state
+import telemetry
+from providers import SyntheticProvider
+
+# Scans advanced from the persisted state must match full recomputes.
+
+TICKERS = [f"T{i}.NS" for i in range(120)]
+# Sessions scanned one after another
+DAYS = 25
+
+
+@pytest.fixture(scope="module")
+def history():
+    frames = SyntheticProvider(seed=3).fetch(TICKERS, period="1y")
+    # Missing sessions on some tickers
+    rng = np.random.default_rng(1)
+    for ticker in TICKERS[:30]:
+        df = frames[ticker]
+        frames[ticker] = df.drop(df.index[rng.choice(len(df), 20, replace=False)])
+    return frames
+
+
+def window(history, end, bars=125):
+    return {t: df[df.index <= end].iloc[-bars:] for t, df in history.items()}
+
+
+def hits(scan):
+    """{ticker: (strategy flags, record values)} of a scan_frames result, whatever its ticker order."""
+    tickers, rows, flags, values = scan[:4]
+    return {tickers[j]: (flag, row) for j, flag, row in zip(rows, flags, values)}
+
+
+def assert_same_scan(full, incremental):
+    assert sorted(full[0]) == sorted(incremental[0])
+    full, incremental = hits(full), hits(incremental)
+    assert full.keys() == incremental.keys()
+    for ticker, (flag, values) in full.items():
+        assert incremental[ticker][0] == flag, ticker
+        np.testing.assert_allclose(incremental[ticker][1], values, equal_nan=True, err_msg=ticker)
+
+
+def test_incremental_scans_match_full_recompute(history):
+    dates = sorted(set().union(*(df.index for df in history.values())))
+    state = indicator_state.empty_state()
+    with telemetry.recording() as recorder:
+        for end in dates[-DAYS:]:
+            frames = window(history, end)
+            incremental = indicator_state.scan_frames(frames, TICKERS, state)
+            assert_same_scan(engine.scan_frames(frames, TICKERS), incremental)
+            state = indicator_state.merge(state, incremental[4])
+    # After the first scan, tickers advance from the state instead of recomputing
+    assert recorder.counters["state_incremental"] >= (DAYS - 1) * len(TICKERS) // 2
+
+
+def test_incremental_features_match_full_recompute(history):
+    dates = sorted(set().union(*(df.index for df in history.values())))
+    state = indicator_state.empty_state()
+    for end in dates[-5:]:
+        frames = window(history, end)
+        committed = indicator_state.scan_frames(frames, TICKERS, state)[4]
+        state = indicator_state.merge(state, committed)
+
+    current = indicator_state._advance_frames(dict(committed), {t: frames[t].iloc[-1:] for t in committed['tickers']})
+    incremental = indicator_state.features(current)
+    panel = engine.align(frames, TICKERS)
+    full = engine.latest(engine.compute_features(panel), panel['valid'])
+    rows = [panel['tickers'].index(t) for t in current['tickers']]
+    for group in ['cpr_weekly', 'cam_weekly', 'cam_weekly_prev', 'cpr_monthly', 'cam_monthly', 'cam_monthly_prev']:
+        for key in full[group]:
+            np.testing.assert_allclose(incremental[group][key], full[group][key][rows], rtol=1e-12, equal_nan=True,
+                                       err_msg=f"{group}.{key}")
+    np.testing.assert_array_equal(incremental['candle']['patterns'], full['candle']['patterns'][rows])
+
+
+def test_restated_history_is_recomputed(history):
+    dates = sorted(set().union(*(df.index for df in history.values())))
+    frames = window(history, dates[-2])
+    state = indicator_state.empty_state()
+    state = indicator_state.merge(state, indicator_state.scan_frames(frames, TICKERS, state)[4])
+
+    frames = window(history, dates[-1])
+    restated = TICKERS[40]
+    df = frames[restated].copy()
+    df.iloc[-3, df.columns.get_loc('Close')] *= 1.05
+    frames[restated] = df
+    with telemetry.recording() as recorder:
+        incremental = indicator_state.scan_frames(frames, TICKERS, state)
+    assert_same_scan(engine.scan_frames(frames, TICKERS), incremental)
+    assert recorder.counters["state_recomputed"] >= 1
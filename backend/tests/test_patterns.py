@@ -0,0 +1,51 @@
+import numpy as np
+import engine
+import patterns
+
+# Pattern bits of the batched classifier against classifying one bar at a time.
+
+
+def bar_patterns(df):
+    """patterns.encode bits of each valid bar, one bar at a time."""
+    rows = df.dropna()
+    o, h, l, c = (rows[k].tolist() for k in ('Open', 'High', 'Low', 'Close'))
+    out = []
+    for i in range(len(rows)):
+        bits = 0
+        body, total_range = abs(c[i] - o[i]), h[i] - l[i]
+        if total_range > 0:
+            if body <= total_range * patterns.DOJI_BODY_RATIO:
+                bits |= patterns.DOJI
+            if min(o[i], c[i]) - l[i] > 2 * body and h[i] - max(o[i], c[i]) < body:
+                bits |= patterns.HAMMER
+            if body / total_range < patterns.SMALL_BODY_RATIO:
+                bits |= patterns.SMALL
+        if i >= 1:
+            if h[i] <= h[i - 1] and l[i] >= l[i - 1]:
+                bits |= patterns.INSIDE
+            prev_body = abs(c[i - 1] - o[i - 1])
+            if c[i] > o[i] and c[i - 1] < o[i - 1] and o[i] <= c[i - 1] and c[i] >= o[i - 1] and body > prev_body:
+                bits |= patterns.BULLISH_ENGULFING
+            if c[i] < o[i] and c[i - 1] > o[i - 1] and o[i] >= c[i - 1] and c[i] <= o[i - 1] and body > prev_body:
+                bits |= patterns.BEARISH_ENGULFING
+        ranges = [h[j] - l[j] for j in range(i)]
+        if i >= 3 and all(total_range < r for r in ranges[-3:]):
+            bits |= patterns.NR4
+        if i >= 6 and all(total_range < r for r in ranges[-6:]):
+            bits |= patterns.NR7
+        out.append(bits)
+    return np.array(out, dtype=np.uint16)
+
+
+def test_candle_patterns_match_per_bar(frames):
+    frames = dict(frames)
+    # Flat bars give zero bodies and ties
+    for ticker in list(frames)[:20]:
+        df = frames[ticker].copy()
+        df['Open'] = df['Close'] = df['Close'].round(0)
+        frames[ticker] = df
+    panel = engine.align(frames)
+    bits = engine.compute_features(panel)['candle']['patterns']
+    for j, ticker in enumerate(panel['tickers']):
+        got = bits[panel['valid'][:, j], j]
+        np.testing.assert_array_equal(got, bar_patterns(frames[ticker]), err_msg=ticker)
@@ -0,0 +1,72 @@
+import threading
+import time
+import pytest
+import pipeline
+from pipeline import Downloader, TokenBucket
+
+TICKERS = [f"T{i}" for i in range(40)]
+
+
+def downloader(fetch, **kwargs):
+    kwargs = {"workers": 3, "batch_size": 10, "retries": 0, "backoff": 0, "limiter": TokenBucket(rate=None), **kwargs}
+    return Downloader(fetch, **kwargs)
+
+
+def partial(chunk):
+    """Multi-ticker responses leave out every third ticker."""
+    if len(chunk) > 1:
+        return {t: 1 for k, t in enumerate(chunk) if k % 3}
+    return {chunk[0]: 1}
+
+
+def wait_for_threads(count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while threading.active_count() > count and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return threading.active_count()
+
+
+def test_left_out_tickers_are_retried_alone():
+    d = downloader(partial)
+    fetched = {}
+    for chunk, frames in d.run(TICKERS):
+        fetched.update(frames)
+    assert sorted(fetched) == sorted(TICKERS)
+    assert d.failed == []
+
+
+def test_worker_errors_release_the_batch():
+    d = downloader(partial, workers=2)
+    resize, calls = d._resize, []
+
+    def fail_once(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return resize(*args)
+
+    d._resize = fail_once
+    fetched = {}
+    for chunk, frames in d.run(TICKERS):
+        fetched.update(frames)
+    # The failed batch is reported instead of leaving the other workers waiting on it
+    assert len(d.failed) == 10
+    assert sorted(set(fetched) | set(d.failed)) == sorted(TICKERS)
+
+
+@pytest.mark.parametrize("abandon", ["raise", "break"])
+def test_abandoned_iteration_stops_the_workers(monkeypatch, abandon):
+    monkeypatch.setattr(pipeline, "STOP_POLL_SECONDS", 0.05)
+    before = threading.active_count()
+    d = downloader(partial, batch_size=1, queue_size=1)
+    if abandon == "raise":
+        with pytest.raises(RuntimeError):
+            for chunk, frames in d.run(TICKERS):
+                raise RuntimeError("scan failed")
+        d.close()
+    else:
+        batches = d.run(TICKERS)
+        next(batches)
+        batches.close()
+    # Workers blocked on the full queue give up instead of leaking
+    assert wait_for_threads(before) == before
@@ -0,0 +1,152 @@
+import gzip
+import json
+import urllib.error
+import urllib.request
+import pytest
+import query_api
+from query_api import QueryError, ResultIndex, ResultStore
+
+
+def record(ticker, strategies, price, score=None, universes=("nifty500",), patterns=()):
+    return {
+        "ticker": ticker,
+        "price": price,
+        "strategies": list(strategies),
+        "universes": list(universes),
+        "patterns": list(patterns),
+        "range_pct": 1.0,
+        "daily": {"cpr_width": 0.2, "cam_center": price, "pivot": price},
+        "monthly": {"pivot": price},
+        "confluence": None if score is None else {"score": score, "nearest": "ema8", "nearest_pct": 0.1},
+    }
+
+
+STOCKS = [
+    record("AAA", ["Doji_Setup"], 120.0, score=9, patterns=["doji"]),
+    record("BBB", ["Inside_Camarilla"], 80.0, score=7, universes=("fno",)),
+    record("CCC", ["Doji_Setup", "Inside_Camarilla"], 300.0, score=5, patterns=["small", "nr7"]),
+    record("DDD", ["Doji_Setup"], 45.0),
+    record("EEE", ["Inside_Camarilla"], 1500.0, score=2, universes=("nifty500", "fno"), patterns=["inside"]),
+]
+RESULT = {"last_updated": "2026-10-16 16:00:00", "total_scanned": 500, "stocks": STOCKS}
+
+
+@pytest.fixture
+def index():
+    return ResultIndex(RESULT, "v1")
+
+
+def tickers(page):
+    return [s["ticker"] for s in page["stocks"]]
+
+
+def test_filters(index):
+    assert tickers(index.query({"strategy": ["Doji_Setup"]})) == ["AAA", "CCC", "DDD"]
+    assert tickers(index.query({"strategy": ["Doji_Setup,Inside_Camarilla"]})) == ["AAA", "BBB", "CCC", "DDD", "EEE"]
+    assert tickers(index.query({"universe": ["fno"]})) == ["BBB", "EEE"]
+    assert tickers(index.query({"pattern": ["nr7", "inside"]})) == ["CCC", "EEE"]
+    assert tickers(index.query({"ticker": ["ccc.ns", "EEE"]})) == ["CCC", "EEE"]
+    assert tickers(index.query({"min_price": ["80"], "max_price": ["300"]})) == ["AAA", "BBB", "CCC"]
+    # Records without the field never pass a bound on it
+    assert tickers(index.query({"min_score": ["0"]})) == ["AAA", "BBB", "CCC", "EEE"]
+    assert tickers(index.query({"strategy": ["Inside_Camarilla"], "min_score": ["6"]})) == ["BBB"]
+    assert index.query({"strategy": ["Unknown"]})["total"] == 0
+
+
+def test_sort(index):
+    assert tickers(index.query({"sort": ["price"]})) == ["DDD", "BBB", "AAA", "CCC", "EEE"]
+    assert tickers(index.query({"sort": ["-price"]})) == ["EEE", "CCC", "AAA", "BBB", "DDD"]
+    # Missing values go last in either direction
+    assert tickers(index.query({"sort": ["score"]}))[-1] == "DDD"
+    assert tickers(index.query({"sort": ["-score"]}))[-1] == "DDD"
+
+
+def test_paging(index):
+    pages, offset = [], 0
+    while offset is not None:
+        page = index.query({"sort": ["price"], "limit": ["2"], "offset": [str(offset)]})
+        assert page["total"] == 5 and page["limit"] == 2 and page["offset"] == offset
+        pages.extend(tickers(page))
+        offset = page["next"]
+    assert pages == ["DDD", "BBB", "AAA", "CCC", "EEE"]
+    assert index.query({"offset": ["10"]})["stocks"] == []
+    assert index.query({})["limit"] == query_api.DEFAULT_LIMIT
+
+
+@pytest.mark.parametrize("params", [
+    {"limit": ["0"]},
+    {"limit": [str(query_api.MAX_LIMIT + 1)]},
+    {"offset": ["-1"]},
+    {"limit": ["ten"]},
+    {"limit": ["nan"]},
+    {"limit": ["inf"]},
+    {"offset": ["1e400"]},
+    {"min_price": ["nan"]},
+    {"min_ticker": ["A"]},
+    {"sort": ["strategies"]},
+    {"colour": ["red"]},
+])
+def test_invalid_queries(index, params):
+    with pytest.raises(QueryError):
+        index.query(params)
+
+
+def test_summary_and_lookup(index):
+    summary = index.summary()
+    assert summary["total"] == 5 and summary["total_scanned"] == 500
+    assert summary["strategies"] == {"Doji_Setup": 3, "Inside_Camarilla": 3}
+    assert index.stock("ccc.NS")["ticker"] == "CCC"
+    assert index.stock("ZZZ") is None
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(RESULT))
+    server = query_api.serve(ResultStore(str(path)), port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def test_http_queries(server):
+    status, headers, body = get(f"{server}/stocks?strategy=Doji_Setup&sort=-price&limit=2")
+    assert status == 200
+    assert tickers(json.loads(body)) == ["CCC", "AAA"]
+
+    # Repeated requests revalidate with the ETag
+    status, _, body = get(f"{server}/stocks?limit=2&sort=-price&strategy=Doji_Setup",
+                          {"If-None-Match": headers["ETag"]})
+    assert status == 304 and body == b""
+
+    status, headers, body = get(f"{server}/stocks?limit=1000", {"Accept-Encoding": "gzip"})
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body))["total"] == 5
+
+    status, _, body = get(f"{server}/stocks/EEE")
+    assert status == 200 and json.loads(body)["price"] == 1500.0
+
+
+@pytest.mark.parametrize("path, status", [
+    ("/stocks?limit=nan", 400),
+    ("/stocks?offset=1e400", 400),
+    ("/stocks?limit=-inf", 400),
+    ("/stocks?sort=nope", 400),
+    ("/stocks/ZZZ", 404),
+    ("/nothing", 404),
+])
+def test_http_errors(server, path, status):
+    got, _, body = get(server + path)
+    assert got == status
+    assert "error" in json.loads(body)
+    # The handler survives bad requests
+    assert get(f"{server}/summary")[0] == 200
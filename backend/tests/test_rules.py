@@ -0,0 +1,11 @@
+import engine
+import rules
+
+# Strategy evaluation over lazily computed engine features.
+
+
+def test_features_are_computed_on_first_use(frames):
+    panel = engine.align(frames)
+    features = engine.compute_features(panel)
+    rules.evaluate(features, [rules.Strategy("narrow", "eligible", "range_pct < 1")])
+    assert set(features.values) == {"eligible", "price", "range_pct"}
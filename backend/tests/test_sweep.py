@@ -0,0 +1,77 @@
+import itertools
+import numpy as np
+import pytest
+import engine
+import rules
+import sweep
+from backtest import forward_returns
+from providers import SyntheticProvider
+
+# The cumulative-histogram sweep against evaluating every grid point on its own.
+
+GRID = {
+    "range_pct": [1.0, 1.5, 2.5],
+    "cpr_pct": [2.0, 4.0],
+    "ema_pct": [0.5, 1.0, 2.0],
+    "small_ratio": [0.2, 0.3],
+    "doji_ratio": [0.05, 0.1, 0.2],
+}
+HORIZON = 5
+
+
+@pytest.fixture(scope="module")
+def history():
+    tickers = [f"S{i}.NS" for i in range(150)]
+    panel = engine.align(SyntheticProvider(seed=2).fetch(tickers, period="2y"), tickers)
+    return panel, engine.compute_features(panel)
+
+
+def baseline_candle(o, h, l, c, doji_ratio, small_ratio):
+    """The baseline's per-bar Doji_Setup candle check with swept body ratios."""
+    body, total_range = abs(c - o), h - l
+    if not total_range > 0:
+        return False
+    if body <= total_range * doji_ratio:
+        return True
+    if min(o, c) - l > 2 * body and h - max(o, c) < body:
+        # A hammer never counts, even with a small body
+        return False
+    return body / total_range < small_ratio
+
+
+def brute_force(panel, f, v):
+    """Doji_Setup mask with the thresholds of one grid point, the candle checked bar by bar."""
+    strategy = rules.Strategy(
+        "X", "eligible", f"range_pct < {v['range_pct']}",
+        rules.Near("price", ["cpr_monthly.pivot", "cpr_monthly.tc", "cpr_monthly.bc"], v['cpr_pct']),
+        rules.AnyOf(f"dist.ema8 < {v['ema_pct']}", f"dist.ema20 < {v['ema_pct']}"),
+    )
+    mask = rules.evaluate(f, [strategy])["X"]
+    for row, col in zip(*np.nonzero(mask)):
+        bar = (panel[k][row, col] for k in ('open', 'high', 'low', 'close'))
+        mask[row, col] = baseline_candle(*bar, v['doji_ratio'], v['small_ratio'])
+    return mask
+
+
+def test_sweep_matches_brute_force(history):
+    panel, f = history
+    returns = forward_returns(panel, HORIZON)
+    result = sweep.sweep(f, GRID, {HORIZON: returns})
+
+    assert result["hits"].sum() > 0
+    for index in itertools.product(*(range(len(GRID[p])) for p in sweep.PARAMS)):
+        v = {p: GRID[p][i] for p, i in zip(sweep.PARAMS, index)}
+        mask = brute_force(panel, f, v)
+        r = returns[mask]
+        r = r[~np.isnan(r)]
+        assert result["hits"][index] == mask.sum(), v
+        assert result[HORIZON]["trades"][index] == len(r), v
+        if len(r):
+            assert result[HORIZON]["mean_return_pct"][index] == pytest.approx(r.mean()), v
+            assert result[HORIZON]["hit_rate_pct"][index] == pytest.approx((r > 0).mean() * 100), v
+
+
+def test_default_thresholds_match_doji_setup(history):
+    _, f = history
+    result = sweep.sweep(f, {p: [value] for p, value in sweep.DEFAULTS.items()})
+    assert result["hits"].ravel()[0] == rules.evaluate(f)["Doji_Setup"].sum()
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+import engine
+import rules
+import timeframes
+from engine import calculate_cpr_value, calculate_camarilla_value
+
+# Intraday aggregation against pandas resampling each ticker's session bars.
+
+# Tuesday to Friday; 2024-04-11 is an NSE holiday
+DAYS = ["2024-04-09", "2024-04-10", "2024-04-11", "2024-04-12"]
+RULE = {"15m": "15min", "60m": "60min"}
+
+
+def minute_frames(seed=0):
+    """Minute bars from 09:00 to 15:44, so some fall outside the session."""
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex([t for day in DAYS
+                              for t in pd.date_range(f"{day} 09:00", f"{day} 15:44", freq="min")])
+    frames = {}
+    for k in range(4):
+        n = len(index)
+        c = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, n)))
+        o = c * (1 + rng.normal(0, 0.0002, n))
+        h = np.maximum(o, c) * (1 + np.abs(rng.normal(0, 0.0003, n)))
+        l = np.minimum(o, c) * (1 - np.abs(rng.normal(0, 0.0003, n)))
+        df = pd.DataFrame({'Open': o, 'High': h, 'Low': l, 'Close': c,
+                           'Volume': rng.integers(100, 1000, n).astype(float)}, index=index)
+        if k == 1:
+            df.iloc[rng.integers(0, n, 200), 2] = np.nan
+        if k == 2:
+            # No bars at all on the 10th
+            df = df[df.index.normalize() != pd.Timestamp("2024-04-10")]
+        if k == 3:
+            df = df.drop(df.index[rng.integers(0, n, 500)])
+        frames[f"M{k}.NS"] = df
+    return frames
+
+
+def session_bars(df):
+    t = df.index.hour * 60 + df.index.minute
+    holiday = df.index.normalize() == pd.Timestamp("2024-04-11")
+    return df[(t >= 9 * 60 + 15) & (t < 15 * 60 + 30) & ~holiday].dropna()
+
+
+def resample(df, rule):
+    # Buckets anchored at the 09:15 open
+    return df.resample(rule, offset="15min").agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}).dropna()
+
+
+def previous(bars, index):
+    """(high, low, close) of the previous period in `index`, NaN where the ticker had no bars."""
+    last = bars.reindex(index).shift(1)
+    return last['High'].to_numpy(), last['Low'].to_numpy(), last['Close'].to_numpy()
+
+
+@pytest.fixture(scope="module")
+def minutes():
+    frames = minute_frames()
+    return frames, engine.align(frames)
+
+
+@pytest.mark.parametrize("timeframe", ["15m", "60m"])
+def test_aggregate_matches_resample(minutes, timeframe):
+    frames, panel = minutes
+    candles = timeframes.aggregate(panel, timeframe)
+    assert not (candles['dates'].normalize() == pd.Timestamp("2024-04-11")).any()
+    for j, ticker in enumerate(panel['tickers']):
+        expected = resample(session_bars(frames[ticker]), RULE[timeframe])
+        rows = candles['valid'][:, j]
+        assert candles['dates'][rows].equals(expected.index)
+        for field in ('Open', 'High', 'Low', 'Close'):
+            np.testing.assert_allclose(candles[field.lower()][rows, j], expected[field].to_numpy(), rtol=1e-12)
+
+
+@pytest.mark.parametrize("timeframe", ["15m", "60m"])
+def test_intraday_pivots(minutes, timeframe):
+    frames, panel = minutes
+    candles, f = engine.intraday_features(panel, timeframe)
+    day = candles['dates'].normalize()
+    sessions = day.unique()
+    # Hours anchored at the 09:15 open
+    hours = (candles['dates'] - pd.Timedelta(minutes=15)).floor("60min") + pd.Timedelta(minutes=15)
+    for j, ticker in enumerate(panel['tickers']):
+        bars = session_bars(frames[ticker])
+        # Daily levels from the previous session, across the holiday
+        daily = bars.resample("D").agg({'High': 'max', 'Low': 'min', 'Close': 'last'}).dropna()
+        ph, pl, pc = (np.take(v, sessions.get_indexer(day)) for v in previous(daily, sessions))
+        for name, expected in (('cpr_daily', calculate_cpr_value(ph, pl, pc)),
+                               ('cam_daily', calculate_camarilla_value(ph, pl, pc))):
+            for level, values in expected.items():
+                np.testing.assert_allclose(f[name][level][:, j], values, rtol=1e-12, err_msg=f"{name}.{level}")
+        # Hourly levels from the previous hour, across sessions
+        hourly = resample(bars, "60min")
+        index = hours.unique()
+        ph, pl, pc = (np.take(v, index.get_indexer(hours)) for v in previous(hourly, index))
+        np.testing.assert_allclose(f['cam_60m']['h3'][:, j], calculate_camarilla_value(ph, pl, pc)['h3'], rtol=1e-12)
+    # The first session has no previous one
+    assert np.isnan(f['cpr_daily']['pivot'][day == sessions[0]]).all()
+    assert ('cpr_15m' in f) == (timeframe == "15m")
+
+
+def test_rules_evaluate_intraday_touches(minutes):
+    _, panel = minutes
+    candles, f = engine.intraday_features(panel, "15m")
+    strategy = rules.Strategy("H3_Touch", "eligible", "touch.cam_daily.h3", "range_pct < 1")
+    mask = rules.evaluate(f, [strategy])["H3_Touch"]
+    h3 = f['cam_daily']['h3']
+    with np.errstate(invalid='ignore'):
+        expected = candles['valid'] & (candles['low'] <= h3) & (h3 <= candles['high']) & (f['range_pct'] < 1)
+    assert expected.any()
+    np.testing.assert_array_equal(mask, expected)
@@ -1,62 +1,137 @@
-import pandas as pd
-import requests
 import io
 import os
 import time
 
-CACHE_FILE = os.path.join(os.path.dirname(__file__), "nifty500.csv")
+# pandas / requests / numpy are imported on first use: most callers only read
+# the pre-parsed universe below and never need them.
+
+CACHE_DIR = os.path.dirname(__file__)
+CACHE_FILE = os.path.join(CACHE_DIR, "nifty500.csv")
 # Cache valid for 24 hours
 MAX_CACHE_AGE = 86400 
+# Parsed ticker lists (<csv name>.npz) with when they were fetched and the CSV they came from
+PARSED_DIR = os.path.join(CACHE_DIR, "data", "universes")
 
-def get_nifty500_tickers():
+NSE_ARCHIVES = "https://nsearchives.nseindia.com/content"
+NIFTY500_URL = f"{NSE_ARCHIVES}/indices/ind_nifty500list.csv"
+TOTAL_MARKET_URL = f"{NSE_ARCHIVES}/indices/ind_niftytotalmarket_list.csv"
+FNO_URL = f"{NSE_ARCHIVES}/fo/fo_mktlots.csv"
+# Index derivatives listed alongside stocks in the F&O lot-size file
+FNO_INDEX_SYMBOLS = {"NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY", "NIFTYNXT50"}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def _parsed_file(cache_file):
+    return os.path.join(PARSED_DIR, os.path.splitext(os.path.basename(cache_file))[0] + ".npz")
+
+def load_parsed(cache_file):
     """
-    Fetches Nifty 500 tickers.
+    (tickers, fetched) from the pre-parsed copy of `cache_file`, fetched being
+    the download time (epoch seconds). (None, None) if there is no parsed
+    copy or the CSV changed since it was written.
+    """
+    path = _parsed_file(cache_file)
+    if not os.path.exists(path) or not os.path.exists(cache_file):
+        return None, None
+    try:
+        import numpy as np
+        source = os.stat(cache_file)
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['source_size']) != source.st_size or float(data['source_mtime']) != source.st_mtime:
+                return None, None
+            return data['tickers'].tolist(), float(data['fetched'])
+    except Exception as e:
+        print(f"Warning: Could not read parsed universe {path}: {e}")
+        return None, None
+
+def save_parsed(cache_file, tickers, url):
+    """Writes the parsed tickers of `cache_file` with its freshness metadata."""
+    try:
+        import numpy as np
+        os.makedirs(PARSED_DIR, exist_ok=True)
+        path = _parsed_file(cache_file)
+        tmp = path + ".tmp.npz"
+        source = os.stat(cache_file)
+        np.savez(tmp, tickers=np.asarray(tickers, dtype=str), url=url, fetched=source.st_mtime,
+                 source_size=source.st_size, source_mtime=source.st_mtime)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Warning: Could not save parsed universe: {e}")
+
+def read_cache(cache_file, url, parse):
+    """Tickers in a cached CSV, from its parsed copy when that is current."""
+    tickers, _ = load_parsed(cache_file)
+    if tickers is None:
+        with open(cache_file, 'r') as f:
+            tickers = parse(f.read())
+        if tickers:
+            save_parsed(cache_file, tickers, url)
+    return tickers
+
+def fetch_cached_list(cache_file, url, parse, label):
+    """
+    Fetches a ticker list published by NSE.
     Priority:
-    1. Local Cache (nifty500.csv) if < 24h old.
+    1. Local Cache if < 24h old.
     2. Web Download (NSE).
     3. Local Cache (Stale) if download fails.
-    4. Hardcoded Fallback.
+    Returns an empty list if all of these fail.
     """
     
     # 1. Try Cache (Fresh)
-    if os.path.exists(CACHE_FILE):
+    if os.path.exists(cache_file):
         try:
-            age = time.time() - os.path.getmtime(CACHE_FILE)
+            age = time.time() - os.path.getmtime(cache_file)
             if age < MAX_CACHE_AGE:
-                print("Using cached ticker list.")
-                return load_tickers_from_file(CACHE_FILE)
+                print(f"Using cached {label} list.")
+                return read_cache(cache_file, url, parse)
         except Exception as e:
             print(f"Error reading cache: {e}")
 
     # 2. Try Web
-    url = "https://nsearchives.nseindia.com/content/indices/ind_nifty500list.csv"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     try:
-        print(f"Fetching Nifty 500 list from {url}...")
-        response = requests.get(url, headers=headers, timeout=10)
+        import requests
+        print(f"Fetching {label} list from {url}...")
+        response = requests.get(url, headers=HEADERS, timeout=10)
         response.raise_for_status()
         
         # Validate content before saving
         text = response.text
-        if "Symbol" in text or "Company Name" in text:
-            with open(CACHE_FILE, 'w') as f:
+        tickers = parse(text)
+        if tickers:
+            with open(cache_file, 'w') as f:
                 f.write(text)
-            print("Successfully fetched and cached Nifty 500 list.")
-            return parse_csv(text)
+            save_parsed(cache_file, tickers, url)
+            print(f"Successfully fetched and cached {label} list.")
+            return tickers
             
     except Exception as e:
-        print(f"Error fetching Nifty 500 list: {e}")
+        print(f"Error fetching {label} list: {e}")
 
     # 3. Try Cache (Stale)
-    if os.path.exists(CACHE_FILE):
-        print("Using stale cache file.")
+    if os.path.exists(cache_file):
+        print(f"Using stale {label} cache file.")
         try:
-             return load_tickers_from_file(CACHE_FILE)
+            return read_cache(cache_file, url, parse)
         except: pass
 
+    return []
+
+def get_nifty500_tickers():
+    """
+    Fetches Nifty 500 tickers.
+    Priority:
+    1. Local Cache (nifty500.csv) if < 24h old.
+    2. Web Download (NSE).
+    3. Local Cache (Stale) if download fails.
+    4. Hardcoded Fallback.
+    """
+    tickers = fetch_cached_list(CACHE_FILE, NIFTY500_URL, parse_csv, "Nifty 500")
+    if tickers:
+        return tickers
+
     # 4. Fallback
     print("Web fetch failed and no cache. Using hardcoded fallback (Top 50).")
     return [
@@ -67,12 +142,34 @@ def get_nifty500_tickers():
         "DRREDDY.NS", "BRITANNIA.NS", "TATACONSUM.NS", "HEROMOTOCO.NS", "APOLLOHOSP.NS", "DIVISLAB.NS", "INDUSINDBK.NS", "BAJAJ-AUTO.NS", "UPL.NS"
     ]
 
+def get_total_market_tickers():
+    """Fetches Nifty Total Market tickers (cached like Nifty 500)."""
+    cache = os.path.join(CACHE_DIR, "niftytotalmarket.csv")
+    return fetch_cached_list(cache, TOTAL_MARKET_URL, parse_csv, "Nifty Total Market")
+
+def get_fno_tickers():
+    """Fetches stocks with F&O contracts from the NSE lot-size file (index contracts excluded)."""
+    cache = os.path.join(CACHE_DIR, "fo_mktlots.csv")
+    return fetch_cached_list(cache, FNO_URL, parse_fno_csv, "F&O")
+
+def load_watchlist(path):
+    """Reads a watchlist: one symbol per line, '#' comments. Bare symbols get the .NS suffix."""
+    tickers = []
+    with open(path, 'r') as f:
+        for line in f:
+            symbol = line.split('#', 1)[0].strip().upper()
+            if not symbol:
+                continue
+            tickers.append(symbol if '.' in symbol else f"{symbol}.NS")
+    return tickers
+
 def load_tickers_from_file(path):
     with open(path, 'r') as f:
         return parse_csv(f.read())
 
 def parse_csv(text):
     try:
+        import pandas as pd
         df = pd.read_csv(io.StringIO(text))
         if 'Symbol' in df.columns:
             return [f"{symbol}.NS" for symbol in df['Symbol'].tolist()]
@@ -84,6 +181,18 @@ def parse_csv(text):
     except:
         return []
 
+def parse_fno_csv(text):
+    try:
+        import pandas as pd
+        df = pd.read_csv(io.StringIO(text))
+        df.columns = [c.strip() for c in df.columns]
+        if 'SYMBOL' not in df.columns:
+            return []
+        symbols = [str(s).strip() for s in df['SYMBOL'].tolist()]
+        return [f"{s}.NS" for s in symbols if s and s != 'Symbol' and s not in FNO_INDEX_SYMBOLS]
+    except:
+        return []
+
 if __name__ == "__main__":
     t = get_nifty500_tickers()
     print(f"Fetched {len(t)} tickers.")
@@ -0,0 +1,188 @@
+import datetime
+import numpy as np
+import pandas as pd
+from telemetry import timed
+# The NSE calendar lives in a pandas-free module the dashboard can import at startup
+from nse_calendar import is_trading_day
+
+# Multi-timeframe aggregation kernel.
+#
+# Every timeframe is a mapping from bar timestamps to integer period keys
+# (nondecreasing for sorted bars). A date × ticker panel (see engine.align) is
+# aggregated to any coarser timeframe in one vectorized pass with reduceat
+# over the key boundaries: minute bars to 15m/60m candles or daily sessions,
+# daily bars to weeks or months. The result is itself a panel, so the same
+# indicator code runs on it, and it is cached on the source panel so pivots
+# on several timeframes never aggregate the same panel twice.
+
+SESSION_OPEN = datetime.time(9, 15)
+SESSION_CLOSE = datetime.time(15, 30)
+IST = "Asia/Kolkata"
+
+# Calendar timeframes look up the previous period by calendar (a month without
+# bars is NaN, like resample('ME')); session timeframes by the previous period
+# that traded.
+CALENDAR_TIMEFRAMES = ["weekly", "monthly"]
+SESSION_TIMEFRAMES = ["15m", "60m", "daily"]
+TIMEFRAMES = SESSION_TIMEFRAMES + CALENDAR_TIMEFRAMES
+
+# --- Period keys ---
+
+def _local(dates):
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_convert(IST).tz_localize(None)
+    return dates
+
+
+def _minutes(timeframe):
+    return int(timeframe[:-1]) if timeframe.endswith("m") else None
+
+
+def period_keys(dates, timeframe):
+    """Integer period key of each timestamp (intraday buckets are anchored at the 09:15 open)."""
+    dates = _local(dates)
+    days = dates.values.astype('datetime64[D]').astype(np.int64)
+    if timeframe == "monthly":
+        return np.asarray(dates.year * 12 + dates.month - 1, dtype=np.int64)
+    if timeframe == "weekly":
+        # 1970-01-01 was a Thursday; weeks start on Monday
+        return (days + 3) // 7
+    if timeframe == "daily":
+        return days
+    minutes = _minutes(timeframe)
+    if minutes:
+        since_open = dates.hour * 60 + dates.minute - (SESSION_OPEN.hour * 60 + SESSION_OPEN.minute)
+        return days * 1440 + np.asarray(since_open, dtype=np.int64) // minutes
+    raise ValueError(f"Unknown timeframe: {timeframe}")
+
+
+def session_mask(dates):
+    """Rows inside the NSE session (09:15 to 15:30 on trading days)."""
+    dates = _local(dates)
+    t = np.asarray(dates.hour * 60 + dates.minute)
+    days = dates.normalize()
+    unique = days.unique()
+    trading = pd.Series([is_trading_day(d) for d in unique], index=unique).reindex(days).to_numpy(dtype=bool)
+    return (t >= SESSION_OPEN.hour * 60 + SESSION_OPEN.minute) & (t < SESSION_CLOSE.hour * 60 + SESSION_CLOSE.minute) & trading
+
+
+# --- Kernel ---
+
+def take_rows(values, rows):
+    """values[rows[i, j], j], NaN where rows is -1."""
+    out = np.take_along_axis(values, np.clip(rows, 0, None), axis=0)
+    return np.where(rows >= 0, out, np.nan)
+
+
+@timed("resample")
+def aggregate(panel, timeframe):
+    """
+    Aggregates a panel to `timeframe`: one row per period present in the
+    panel, with the first open, highest high, lowest low, last close and
+    summed volume of each ticker's valid bars. Intraday timeframes drop bars
+    outside the NSE session. Returns a panel plus 'keys' (period keys) and
+    'last' (source row of each period's close, -1 if the ticker had none).
+    """
+    cache = panel.setdefault('aggregates', {})
+    if timeframe in cache:
+        return cache[timeframe]
+
+    valid = panel['valid']
+    n = valid.shape[0]
+    if n == 0:
+        empty = np.empty((0, valid.shape[1]))
+        out = {'dates': pd.DatetimeIndex([]), 'tickers': panel['tickers'], 'keys': np.empty(0, dtype=np.int64),
+               'open': empty, 'high': empty, 'low': empty, 'close': empty, 'volume': empty,
+               'valid': np.empty(valid.shape, dtype=bool), 'last': np.empty(valid.shape, dtype=np.int64)}
+        cache[timeframe] = out
+        return out
+
+    intraday = _is_intraday(panel['dates'])
+    if intraday:
+        valid = valid & session_mask(panel['dates'])[:, None]
+
+    keys = period_keys(panel['dates'], timeframe)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    rows = np.arange(n)[:, None]
+
+    first = np.minimum.reduceat(np.where(valid, rows, n), starts, axis=0)
+    first = np.where(first < n, first, -1)
+    last = np.maximum.reduceat(np.where(valid, rows, -1), starts, axis=0)
+    out = {
+        'tickers': panel['tickers'],
+        'keys': keys[starts],
+        'open': take_rows(panel['open'], first),
+        'high': np.fmax.reduceat(np.where(valid, panel['high'], np.nan), starts, axis=0),
+        'low': np.fmin.reduceat(np.where(valid, panel['low'], np.nan), starts, axis=0),
+        'close': take_rows(panel['close'], last),
+        'valid': last >= 0,
+        'last': last,
+    }
+    volume = panel.get('volume')
+    if volume is not None:
+        out['volume'] = np.where(out['valid'], np.add.reduceat(np.where(valid, volume, 0), starts, axis=0), np.nan)
+
+    dates = _local(panel['dates'])
+    if _minutes(timeframe):
+        # Label intraday candles by their start time
+        day = dates[starts].normalize()
+        bucket = out['keys'] - day.values.astype('datetime64[D]').astype(np.int64) * 1440
+        open_ = pd.Timedelta(hours=SESSION_OPEN.hour, minutes=SESSION_OPEN.minute)
+        out['dates'] = day + open_ + pd.to_timedelta(bucket * _minutes(timeframe), unit='m')
+    elif timeframe == "daily":
+        out['dates'] = dates[starts].normalize()
+    else:
+        # Weeks and months are labelled by their last bar
+        out['dates'] = dates[ends]
+
+    if intraday:
+        # Pre-open / post-close buckets and holidays carry no bars
+        keep = out['valid'].any(axis=1)
+        out = {k: v if k == 'tickers' else v[keep] for k, v in out.items()}
+    cache[timeframe] = out
+    return out
+
+
+def _is_intraday(dates):
+    dates = _local(dates)
+    return len(dates) > 0 and not (dates == dates.normalize()).all()
+
+
+def table(panel, timeframe):
+    """
+    Calendar table of a weekly/monthly aggregate: (first_key, high, low, close)
+    where row k of each array is period first_key + k; periods without bars are NaN.
+    """
+    agg = aggregate(panel, timeframe)
+    first_key = agg['keys'][0]
+    span = agg['keys'][-1] - first_key + 1
+    slot = agg['keys'] - first_key
+    out = []
+    for field in ('high', 'low', 'close'):
+        values = np.full((span, agg[field].shape[1]), np.nan)
+        values[slot] = agg[field]
+        out.append(values)
+    return first_key, out[0], out[1], out[2]
+
+
+def previous_period(panel, timeframe, offset=1):
+    """
+    (high, low, close) of the period `offset` periods before each row's own,
+    shaped like the panel. Calendar timeframes count calendar periods; session
+    timeframes count the sessions / candles present in the panel.
+    """
+    keys = period_keys(panel['dates'], timeframe)
+    valid = panel['valid']
+    if timeframe in CALENDAR_TIMEFRAMES:
+        first_key, high, low, close = table(panel, timeframe)
+        slot = np.broadcast_to((keys - first_key - offset)[:, None], valid.shape)
+    else:
+        agg = aggregate(panel, timeframe)
+        high, low, close = agg['high'], agg['low'], agg['close']
+        # Rows outside any aggregated period (pre-open, holidays) look back from where it would be
+        index = np.searchsorted(agg['keys'], keys, side='left')
+        slot = np.broadcast_to((index - offset)[:, None], valid.shape)
+    rows = np.where(slot >= 0, slot, -1)
+    return take_rows(high, rows), take_rows(low, rows), take_rows(close, rows)
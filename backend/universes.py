@@ -0,0 +1,57 @@
+import os
+from tickers import get_nifty500_tickers, get_total_market_tickers, get_fno_tickers, load_watchlist
+
+# Named universes; anything else passed to load_universes() is treated as a watchlist file
+UNIVERSES = {
+    "nifty500": get_nifty500_tickers,
+    "total_market": get_total_market_tickers,
+    "fno": get_fno_tickers,
+}
+DEFAULT_UNIVERSES = ["nifty500"]
+
+
+def load_universes(names):
+    """
+    Loads each universe once. Returns {name: [tickers]}; watchlist files are
+    keyed by their file name without extension.
+    """
+    universes = {}
+    for name in names:
+        if name in UNIVERSES:
+            tickers = UNIVERSES[name]()
+        elif os.path.exists(name):
+            tickers = load_watchlist(name)
+            name = os.path.splitext(os.path.basename(name))[0]
+        else:
+            print(f"Unknown universe or missing watchlist: {name}")
+            continue
+        print(f"Universe {name}: {len(tickers)} tickers.")
+        universes[name] = tickers
+    return universes
+
+
+def merge_universes(universes):
+    """
+    Deduplicates tickers across universes, keeping first-seen order.
+    Returns (tickers, membership) where membership maps each ticker to every
+    universe it belongs to.
+    """
+    membership = {}
+    for name, tickers in universes.items():
+        for ticker in tickers:
+            names = membership.setdefault(ticker, [])
+            if name not in names:
+                names.append(name)
+    return list(membership.keys()), membership
+
+
+def shard(tickers, n):
+    """Splits tickers into n contiguous, near-equal shards (empty shards dropped)."""
+    n = max(1, min(n, len(tickers)))
+    size, extra = divmod(len(tickers), n)
+    shards, start = [], 0
+    for k in range(n):
+        end = start + size + (1 if k < extra else 0)
+        shards.append(tickers[start:end])
+        start = end
+    return [s for s in shards if s]
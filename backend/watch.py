@@ -0,0 +1,287 @@
+import json
+import time
+import queue
+import argparse
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pandas as pd
+import engine
+import indicator_state
+import timeframes
+from scan import load_bars
+from rules import load_strategies, DEFAULT_STRATEGIES
+from pipeline import Downloader
+from bar_store import HISTORY_PERIOD
+from universes import load_universes, merge_universes, DEFAULT_UNIVERSES
+from providers import YFinanceProvider, SnapshotProvider, ReplayProvider, SyntheticProvider, period_start
+
+# Live watch mode: a long-running daemon that polls the provider during market
+# hours, re-evaluates only the tickers whose latest bar changed, and pushes
+# signal enter/exit events to subscribers over Server-Sent Events.
+#
+# Bars are held in memory and indicator state is advanced incrementally
+# (see indicator_state), so a poll costs one small download plus O(1) work
+# per changed ticker instead of a full rescan.
+
+POLL_SECONDS = 60
+# Recent bars re-requested on every poll (covers the partial bar and any late corrections)
+LIVE_PERIOD = "5d"
+HOST = "127.0.0.1"
+PORT = 8765
+# Idle SSE connections get a comment line this often so proxies keep them open
+KEEPALIVE_SECONDS = 15
+SUBSCRIBER_QUEUE = 1000
+
+
+class EventHub:
+    """Fans events out to subscriber queues; slow subscribers are dropped rather than blocking polls."""
+
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE)
+        with self.lock:
+            self.subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            if q in self.subscribers:
+                self.subscribers.remove(q)
+
+    def publish(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                print("Warning: Dropping slow subscriber.")
+                self.unsubscribe(q)
+
+
+def market_open(now=None):
+    """True during the NSE session on a trading day (IST)."""
+    now = now or datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=5, minutes=30)))
+    return timeframes.is_trading_day(now.date()) and timeframes.SESSION_OPEN <= now.time() < timeframes.SESSION_CLOSE
+
+
+def _signature(df):
+    """Identity of a ticker's latest bar, to tell whether a poll changed anything."""
+    last = df.iloc[-1]
+    return (df.index[-1], len(df)) + tuple(float(last.get(f, float('nan'))) for f in engine.FIELDS)
+
+
+class Watcher:
+    def __init__(self, provider, tickers, strategies=None, hub=None, membership=None):
+        self.provider = provider
+        self.tickers = list(tickers)
+        self.strategies = strategies
+        self.names = [s.name for s in strategies or DEFAULT_STRATEGIES]
+        self.hub = hub or EventHub()
+        self.membership = membership
+        self.frames = {}
+        self.signatures = {}
+        # Live data starts from the persisted state; replays compute their own
+        self.state = indicator_state.load_state() if provider.cacheable else indicator_state.empty_state()
+        # {ticker: record} for every ticker currently matching at least one strategy
+        self.signals = {}
+        self.polls = 0
+        self.lock = threading.Lock()
+
+    def _download(self, fetch):
+        frames = {}
+        for chunk, batch in Downloader(fetch).run(self.tickers):
+            frames.update(batch)
+        return frames
+
+    def bootstrap(self):
+        """Loads full history for the universe and evaluates it once (no events)."""
+        print(f"Loading {len(self.tickers)} tickers...")
+        self.frames = {t: df.dropna(how='all') for t, df in self._download(lambda c: load_bars(c, self.provider)).items()}
+        self.signatures = {t: _signature(df) for t, df in self.frames.items() if not df.empty}
+        self.evaluate(list(self.frames), publish=False)
+        print(f"Watching {len(self.frames)} tickers, {len(self.signals)} with signals.")
+
+    def poll(self):
+        """Fetches recent bars, updates changed tickers and publishes the resulting events."""
+        fresh = self._download(lambda c: self.provider.fetch(c, period=LIVE_PERIOD))
+        start = period_start(self.provider.now(), HISTORY_PERIOD)
+        changed = []
+        for ticker, df in fresh.items():
+            df = df.dropna(how='all')
+            if df.empty:
+                continue
+            old = self.frames.get(ticker)
+            merged = df if old is None else pd.concat([old[old.index < df.index[0]], df])
+            merged = merged[merged.index >= start]
+            signature = _signature(merged)
+            if signature != self.signatures.get(ticker):
+                self.frames[ticker] = merged
+                self.signatures[ticker] = signature
+                changed.append(ticker)
+        events = self.evaluate(changed)
+        self.polls += 1
+        self.hub.publish({
+            "event": "poll",
+            "time": self.provider.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "changed": len(changed),
+            "signals": len(self.signals),
+        })
+        return changed, events
+
+    def evaluate(self, tickers, publish=True):
+        """Re-evaluates `tickers` and returns (and publishes) their enter/exit events."""
+        if not tickers:
+            return []
+        scanned, hits, flags, values, committed = indicator_state.scan_frames(
+            self.frames, tickers, self.state, self.strategies)
+        hit_tickers = [scanned[j] for j in hits]
+        records = engine.unpack_records(hit_tickers, flags, values, self.strategies)
+        current = dict(zip(hit_tickers, records))
+        if self.membership is not None:
+            for ticker, record in current.items():
+                record["universes"] = self.membership[ticker]
+
+        now = self.provider.now().strftime("%Y-%m-%d %H:%M:%S")
+        events = []
+        with self.lock:
+            self.state = indicator_state.merge(self.state, committed)
+            for ticker in tickers:
+                before = set(self.signals[ticker]["strategies"]) if ticker in self.signals else set()
+                record = current.get(ticker)
+                after = set(record["strategies"]) if record else set()
+                for strategy in self.names:
+                    if strategy in after and strategy not in before:
+                        events.append({"event": "enter", "time": now, "strategy": strategy,
+                                       "ticker": record["ticker"], "record": record})
+                    elif strategy in before and strategy not in after:
+                        events.append({"event": "exit", "time": now, "strategy": strategy,
+                                       "ticker": self.signals[ticker]["ticker"]})
+                if record:
+                    self.signals[ticker] = record
+                else:
+                    self.signals.pop(ticker, None)
+        if publish:
+            for event in events:
+                self.hub.publish(event)
+        return events
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "last_updated": self.provider.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "total_scanned": len(self.frames),
+                "polls": self.polls,
+                "stocks": engine.rank_records([self.signals[t] for t in self.tickers if t in self.signals]),
+            }
+
+    def run(self, interval=POLL_SECONDS, market_hours=True, stop=None):
+        """Polls every `interval` seconds until `stop` is set (or a replay runs out)."""
+        stop = stop or threading.Event()
+        replay = isinstance(self.provider, ReplayProvider)
+        while not stop.is_set():
+            if replay and self.polls > 0 and not self.provider.advance():
+                print("Replay finished.")
+                return
+            if replay or not market_hours or market_open():
+                started = time.perf_counter()
+                try:
+                    changed, events = self.poll()
+                    print(f"Poll {self.polls}: {len(changed)} changed, {len(events)} events "
+                          f"({time.perf_counter() - started:.2f}s)")
+                except Exception as e:
+                    print(f"Warning: Poll failed: {e}")
+            stop.wait(interval)
+
+
+# --- HTTP (Server-Sent Events) ---
+
+def make_handler(watcher):
+    class Handler(BaseHTTPRequestHandler):
+        def _headers(self, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+
+        def _send_event(self, event):
+            data = json.dumps(event, default=float)
+            self.wfile.write(f"event: {event['event']}\ndata: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.split("?")[0] == "/signals":
+                self._headers("application/json")
+                self.wfile.write(json.dumps(watcher.snapshot(), default=float).encode("utf-8"))
+            elif self.path.split("?")[0] == "/events":
+                self._headers("text/event-stream")
+                q = watcher.hub.subscribe()
+                try:
+                    # Current signals first, then live enter/exit events
+                    self._send_event({"event": "snapshot", **watcher.snapshot()})
+                    while True:
+                        try:
+                            self._send_event(q.get(timeout=KEEPALIVE_SECONDS))
+                        except queue.Empty:
+                            self.wfile.write(b": keepalive\n\n")
+                            self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    watcher.hub.unsubscribe(q)
+            else:
+                self.send_error(404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(watcher, host=HOST, port=PORT):
+    """Starts the SSE server on a background thread and returns it."""
+    server = ThreadingHTTPServer((host, port), make_handler(watcher))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving events on http://{host}:{server.server_address[1]}/events")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live scanner: poll during market hours and stream signal events")
+    parser.add_argument("--provider", choices=["yfinance", "snapshot", "replay", "synthetic"], default="yfinance")
+    parser.add_argument("--snapshot-dir", help="Directory of recorded bars (snapshot / replay provider)")
+    parser.add_argument("--replay-start", help="First session to replay (default: the last 20)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic provider")
+    parser.add_argument("--universe", action="append", help="nifty500, total_market, fno or a watchlist file (repeatable)")
+    parser.add_argument("--strategies", help="JSON/YAML file of strategy rules (default: built-in strategies)")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS, help="Seconds between polls")
+    parser.add_argument("--always", action="store_true", help="Poll outside market hours too")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    membership = None
+    if args.provider in ("snapshot", "replay"):
+        if args.provider == "replay":
+            provider = ReplayProvider(args.snapshot_dir, start=args.replay_start)
+        else:
+            provider = SnapshotProvider(args.snapshot_dir)
+        universe = provider.tickers()
+    else:
+        provider = SyntheticProvider(seed=args.seed) if args.provider == "synthetic" else YFinanceProvider()
+        universe, membership = merge_universes(load_universes(args.universe or DEFAULT_UNIVERSES))
+
+    strategies = load_strategies(args.strategies) if args.strategies else None
+    watcher = Watcher(provider, universe, strategies, membership=membership)
+    watcher.bootstrap()
+    serve(watcher, args.host, args.port)
+    try:
+        watcher.run(args.interval, market_hours=not args.always)
+    except KeyboardInterrupt:
+        print("Stopped.")
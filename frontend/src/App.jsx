@@ -1,35 +1,128 @@
 import React, { useState, useEffect } from 'react';
 import { RefreshCw, TrendingUp, AlertCircle, Clock } from 'lucide-react';
 
+// Cards added per frame while a shard renders progressively
+const RENDER_CHUNK = 60;
+// Watch daemon (backend/watch.py) streaming live enter/exit events, if configured
+const WATCH_URL = import.meta.env.VITE_WATCH_URL;
+// Query API (backend/query_api.py); when set, tabs load a page at a time instead of whole shards
+const API_URL = import.meta.env.VITE_API_URL;
+
 function App() {
-    const [data, setData] = useState(null);
+    const [manifest, setManifest] = useState(null);
+    const [delta, setDelta] = useState(null);
+    const [active, setActive] = useState(null);
+    const [shards, setShards] = useState({});
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [live, setLive] = useState(null);
+    // Offset of the next page per strategy (API mode), null when everything is loaded
+    const [more, setMore] = useState({});
 
     useEffect(() => {
-        fetch('./data.json')
-            .then(response => {
-                if (!response.ok) throw new Error("Failed to load data");
+        // The API's summary, or the static manifest: the only file that changes between scans, shards are content-hashed
+        const source = API_URL
+            ? fetch(`${API_URL}/summary`).then(response => {
+                if (!response.ok) throw new Error("Failed to load summary");
                 return response.json();
-            })
+            }).then(summary => ({
+                last_updated: summary.last_updated,
+                shards: Object.fromEntries(Object.entries(summary.strategies).map(([name, count]) => [name, { count }])),
+            }))
+            : fetch('./scan/manifest.json', { cache: 'no-cache' })
+                .then(response => {
+                    if (!response.ok) throw new Error("Failed to load manifest");
+                    return response.json();
+                });
+        source
             .then(result => {
-                setData(result);
+                setManifest(result);
+                setActive(Object.keys(result.shards)[0] || null);
                 setLoading(false);
+                if (result.delta) {
+                    fetch(`./scan/${result.delta}`)
+                        .then(response => response.ok ? response.json() : null)
+                        .then(setDelta)
+                        .catch(() => setDelta(null));
+                }
             })
             .catch(err => {
-                console.error("Error loading data.json:", err);
+                console.error("Error loading manifest.json:", err);
                 // Fallback for demo purposes if file doesn't exist yet
                 setError("Waiting for first scan...");
                 setLoading(false);
             });
     }, []);
 
+    const loadPage = (strategy, offset) => {
+        fetch(`${API_URL}/stocks?strategy=${encodeURIComponent(strategy)}&limit=${RENDER_CHUNK}&offset=${offset}`)
+            .then(response => {
+                if (!response.ok) throw new Error("Failed to load page");
+                return response.json();
+            })
+            .then(page => {
+                setShards(prev => ({ ...prev, [strategy]: [...(offset ? prev[strategy] || [] : []), ...page.stocks] }));
+                setMore(prev => ({ ...prev, [strategy]: page.next }));
+            })
+            .catch(err => {
+                console.error(`Error loading ${strategy}:`, err);
+                setShards(prev => ({ ...prev, [strategy]: prev[strategy] || [] }));
+            });
+    };
+
+    useEffect(() => {
+        if (!manifest || !active || shards[active]) return;
+        if (API_URL) {
+            loadPage(active, 0);
+            return;
+        }
+        fetch(`./scan/${manifest.shards[active].file}`)
+            .then(response => {
+                if (!response.ok) throw new Error("Failed to load shard");
+                return response.json();
+            })
+            .then(stocks => setShards(prev => ({ ...prev, [active]: stocks })))
+            .catch(err => {
+                console.error(`Error loading shard ${active}:`, err);
+                setShards(prev => ({ ...prev, [active]: [] }));
+            });
+    }, [manifest, active]);
+
+    useEffect(() => {
+        if (!WATCH_URL) return;
+        const source = new EventSource(`${WATCH_URL}/events`);
+        // Live signals replace the static shards: the snapshot resets them, events patch them
+        source.addEventListener('snapshot', e => {
+            const snap = JSON.parse(e.data);
+            const byStrategy = {};
+            snap.stocks.forEach(stock => stock.strategies.forEach(s => {
+                (byStrategy[s] = byStrategy[s] || []).push(stock);
+            }));
+            setShards(prev => Object.fromEntries(Object.keys({ ...prev, ...byStrategy }).map(s => [s, byStrategy[s] || []])));
+            setLive(snap.last_updated);
+        });
+        source.addEventListener('enter', e => {
+            const ev = JSON.parse(e.data);
+            setShards(prev => ({ ...prev, [ev.strategy]: [ev.record, ...(prev[ev.strategy] || []).filter(s => s.ticker !== ev.ticker)] }));
+        });
+        source.addEventListener('exit', e => {
+            const ev = JSON.parse(e.data);
+            setShards(prev => ({ ...prev, [ev.strategy]: (prev[ev.strategy] || []).filter(s => s.ticker !== ev.ticker) }));
+        });
+        source.addEventListener('poll', e => setLive(JSON.parse(e.data).time));
+        source.onerror = () => setLive(null);
+        return () => source.close();
+    }, []);
+
     if (loading) return (
         <div className="container" style={{ height: '100vh', display: 'flex', alignItems: 'center', justifyContent: 'center' }}>
             <div className="loader"></div>
         </div>
     );
 
+    const stocks = active ? shards[active] : null;
+    const added = new Set(delta && active && delta.strategies[active] ? delta.strategies[active].added : []);
+
     return (
         <div className="container">
             <header>
@@ -39,28 +132,54 @@ function App() {
                 </div>
                 <div className="flex items-center gap-2 text-sm text-secondary card" style={{ padding: '8px 16px', margin: 0 }}>
                     <Clock size={16} />
-                    <span>Last Updated: {data ? data.last_updated : 'Never'}</span>
+                    <span>{live ? `Live: ${live}` : `Last Updated: ${manifest ? manifest.last_updated : 'Never'}`}</span>
                 </div>
             </header>
 
-            {error && !data && (
+            {error && !manifest && (
                 <div className="card flex items-center gap-2" style={{ borderColor: 'var(--accent-red)' }}>
                     <AlertCircle className="text-red" />
                     <p>No Data Available yet. Please wait for the daily scan to run.</p>
                 </div>
             )}
 
-            {data && data.stocks.length === 0 && (
+            {manifest && (
+                <div className="flex gap-2" style={{ marginBottom: '20px', flexWrap: 'wrap' }}>
+                    {Object.entries(manifest.shards).map(([name, shard]) => (
+                        <button
+                            key={name}
+                            className={`badge ${name === active ? 'badge-success' : ''}`}
+                            style={{ cursor: 'pointer', border: 'none' }}
+                            onClick={() => setActive(name)}
+                        >
+                            {name.replace(/_/g, ' ')} ({shards[name] ? shards[name].length : shard.count})
+                        </button>
+                    ))}
+                </div>
+            )}
+
+            {manifest && active && !stocks && (
+                <div className="card flex items-center justify-center gap-2 p-8">
+                    <RefreshCw size={16} className="text-secondary" />
+                    <p className="text-secondary">Loading {active.replace(/_/g, ' ')}...</p>
+                </div>
+            )}
+
+            {stocks && stocks.length === 0 && (
                 <div className="card flex items-center justify-center p-8">
                     <p className="text-secondary">No stocks matched the criteria today.</p>
                 </div>
             )}
 
-            <div className="grid">
-                {data && data.stocks.map(stock => (
-                    <StockCard key={stock.ticker} stock={stock} />
-                ))}
-            </div>
+            {stocks && <StockGrid key={active} stocks={stocks} added={added} />}
+
+            {stocks && more[active] != null && (
+                <div className="flex justify-center" style={{ marginTop: '20px' }}>
+                    <button className="badge" style={{ cursor: 'pointer', border: 'none' }} onClick={() => loadPage(active, more[active])}>
+                        Load more ({stocks.length} of {manifest.shards[active].count})
+                    </button>
+                </div>
+            )}
 
             <footer style={{ marginTop: '40px', textAlign: 'center', color: 'var(--text-secondary)', fontSize: '0.8rem' }}>
                 <p>Automated by GitHub Actions | Updates daily at 6 PM IST</p>
@@ -69,12 +188,31 @@ function App() {
     );
 }
 
-function StockCard({ stock }) {
+function StockGrid({ stocks, added }) {
+    // Render the first chunk immediately and the rest a chunk per frame
+    const [visible, setVisible] = useState(RENDER_CHUNK);
+
+    useEffect(() => {
+        if (visible >= stocks.length) return;
+        const frame = requestAnimationFrame(() => setVisible(v => v + RENDER_CHUNK));
+        return () => cancelAnimationFrame(frame);
+    }, [visible, stocks]);
+
+    return (
+        <div className="grid">
+            {stocks.slice(0, visible).map(stock => (
+                <StockCard key={stock.ticker} stock={stock} isNew={added.has(stock.ticker)} />
+            ))}
+        </div>
+    );
+}
+
+function StockCard({ stock, isNew }) {
     return (
         <div className="card">
             <div className="flex justify-between items-center" style={{ marginBottom: '16px' }}>
                 <h2 style={{ margin: 0, fontSize: '1.5rem' }}>{stock.ticker}</h2>
-                <span className="badge badge-success">Buy Ready</span>
+                <span className="badge badge-success">{isNew ? 'New' : 'Buy Ready'}</span>
             </div>
 
             <div style={{ fontSize: '2rem', fontWeight: 'bold', marginBottom: '8px' }}>
@@ -84,22 +222,28 @@ function StockCard({ stock }) {
             <div style={{ display: 'grid', gridTemplateColumns: '1fr 1fr', gap: '12px', marginTop: '20px' }}>
                 <div style={{ background: 'rgba(255,255,255,0.05)', padding: '10px', borderRadius: '8px' }}>
                     <div className="text-secondary text-sm">CPR Width</div>
-                    <div className="font-bold text-blue">{stock.cpr.width_pct}%</div>
+                    <div className="font-bold text-blue">{stock.daily.cpr_width}%</div>
                 </div>
                 <div style={{ background: 'rgba(255,255,255,0.05)', padding: '10px', borderRadius: '8px' }}>
                     <div className="text-secondary text-sm">Camarilla Center</div>
-                    <div className="font-bold text-green">{stock.camarilla.center}</div>
+                    <div className="font-bold text-green">{stock.daily.cam_center}</div>
                 </div>
             </div>
 
             <div style={{ marginTop: '16px', paddingTop: '16px', borderTop: '1px solid rgba(255,255,255,0.1)' }}>
                 <div className="flex justify-between text-sm" style={{ marginBottom: '4px' }}>
                     <span className="text-secondary">Monthly Pivot</span>
-                    <span>{stock.cpr.pivot}</span>
+                    <span>{stock.monthly.pivot}</span>
                 </div>
+                {stock.confluence && (
+                    <div className="flex justify-between text-sm" style={{ marginBottom: '4px' }}>
+                        <span className="text-secondary">Confluence</span>
+                        <span>{stock.confluence.score} levels{stock.confluence.nearest ? ` (nearest ${stock.confluence.nearest} ${stock.confluence.nearest_pct}%)` : ''}</span>
+                    </div>
+                )}
                 <div className="flex justify-between text-sm">
                     <span className="text-secondary">Daily Signal</span>
-                    <span className="text-green flex items-center gap-2"><TrendingUp size={14} /> {stock.signal}</span>
+                    <span className="text-green flex items-center gap-2"><TrendingUp size={14} /> {stock.strategies.join(', ').replace(/_/g, ' ')}</span>
                 </div>
             </div>
         </div>